@@ -11,6 +11,11 @@ import os
 from dotenv import load_dotenv
 from datetime import timedelta
 
+import db_profile
+import metrics
+import passwords
+import tracing
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -22,15 +27,59 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
     'sqlite:///quantum_advent.db'
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sizing for server databases (see db_profile.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_profile.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
 # JWT configuration
 app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=15)  # 15 minute access token
 app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=7)    # 7 day refresh token
 
+# Grading configuration
+# GRADING_MODE=async makes POST /api/submissions/ return a job id immediately
+app.config['GRADING_MODE'] = os.getenv('GRADING_MODE', 'sync')
+app.config['GRADING_QUEUE_WORKERS'] = int(os.getenv('GRADING_QUEUE_WORKERS', '2'))
+# Optional SQLite file for queued jobs so they survive a restart
+app.config['GRADING_JOB_STORE'] = os.getenv('GRADING_JOB_STORE', '')
+# SUBMISSION_GROUP_COMMIT=1 commits graded submissions in batches (write_behind.py)
+app.config['SUBMISSION_GROUP_COMMIT'] = os.getenv('SUBMISSION_GROUP_COMMIT', '0') == '1'
+app.config['SUBMISSION_GROUP_COMMIT_ROWS'] = int(os.getenv('SUBMISSION_GROUP_COMMIT_ROWS', '64'))
+app.config['SUBMISSION_GROUP_COMMIT_MS'] = int(os.getenv('SUBMISSION_GROUP_COMMIT_MS', '10'))
+
+# Users who may request profiled grading runs (comma-separated, see profiling.py)
+app.config['ADMIN_USERNAMES'] = {
+    name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()
+}
+
+# Requests slower than this are logged with their SQL statements (tracing.py)
+app.config['TRACE_SLOW_REQUEST_MS'] = int(os.getenv('TRACE_SLOW_REQUEST_MS', '1000'))
+
+# CHALLENGE_WATCH=1 makes `python app.py` reload a challenge when its days/
+# folder changes (watcher.py); multi-process servers run `python watcher.py`
+# once instead
+app.config['CHALLENGE_WATCH'] = os.getenv('CHALLENGE_WATCH', '0') == '1'
+app.config['CHALLENGE_DAYS_DIR'] = os.getenv('CHALLENGE_DAYS_DIR', '')
+
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
 
+# WAL, synchronous=NORMAL, mmap and busy_timeout on every SQLite connection;
+# per-request SQL counts and Server-Timing headers
+with app.app_context():
+    db_profile.configure_engine(db.engine)
+    tracing.init_app(app, db.engine)
+
+# Request latency histograms and GET /metrics (see metrics.py)
+metrics.init_app(app)
+
+def _collect_db_pool():
+    with app.app_context():
+        stats = db_profile.pool_stats(db.engine)
+    return {(state,): stats[state] for state in ('checkedout', 'checkedin', 'overflow') if state in stats}
+
+metrics.REGISTRY.collect('database_pool_connections', 'Database connections by pool state',
+                         _collect_db_pool, ('state',))
+
 # Define models inline to avoid circular imports
 class User(db.Model):
     __tablename__ = 'users'
@@ -44,14 +93,19 @@ class User(db.Model):
     submissions = db.relationship('Submission', backref='user', lazy=True)
     
     def set_password(self, password):
-        """Hash and set password"""
-        import bcrypt
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and set password (on the password hashing pool, see passwords.py)"""
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        """Verify password against hash"""
-        import bcrypt
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Verify password against hash
+        
+        Raises passwords.PasswordHasherBusy when the hashing pool is saturated.
+        """
+        return passwords.check_password(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash uses a different BCRYPT_ROUNDS"""
+        return passwords.needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -72,6 +126,7 @@ class Challenge(db.Model):
     test_code = db.Column(db.Text, nullable=False)
     difficulty = db.Column(db.Integer, default=1)  # 1-5 stars
     tags = db.Column(db.JSON, nullable=True)
+    content_hash = db.Column(db.String(64))  # of the seeded fields (see seed.py)
     created_at = db.Column(db.DateTime, default=db.func.now())
     
     submissions = db.relationship('Submission', backref='challenge', lazy=True)
@@ -87,6 +142,16 @@ class Challenge(db.Model):
             'tags': self.tags or [],
             'created_at': self.created_at.isoformat()
         }
+    
+    def to_summary_dict(self):
+        """Fields shown on the challenge grid (no markdown or code bodies)"""
+        return {
+            'id': self.id,
+            'day': self.day,
+            'title': self.title,
+            'difficulty': self.difficulty,
+            'tags': self.tags or []
+        }
 
 class Submission(db.Model):
     __tablename__ = 'submissions'
@@ -94,10 +159,50 @@ class Submission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False)
-    code = db.Column(db.Text, nullable=False)
     passed = db.Column(db.Boolean, default=False)
-    test_results = db.Column(db.JSON)  # Store detailed test results
     submitted_at = db.Column(db.DateTime, default=db.func.now())
+    # Code and detailed test results live in the blob store (see blobs.py)
+    code_sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'))
+    results_sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'))
+    # Inline columns used before the blob store; emptied by migrations.py
+    legacy_code = db.Column('code', db.Text, nullable=False, default='')
+    legacy_test_results = db.Column('test_results', db.JSON)
+    
+    # Added to existing databases by migrations.py
+    __table_args__ = (
+        # The days a user passed (stats rebuild)
+        db.Index('ix_submissions_user_passed_challenge', user_id, passed, challenge_id),
+        # A user's submission history, newest first (keyset pages)
+        db.Index('ix_submissions_user_submitted_at', user_id, submitted_at, id),
+        # Passing submissions of a challenge in time order
+        db.Index('ix_submissions_challenge_passed_submitted_at', challenge_id, passed, submitted_at),
+    )
+    
+    @property
+    def code(self):
+        import blobs
+        if self.code_sha256 is None:
+            return self.legacy_code
+        return blobs.get_text(self.code_sha256)
+    
+    @code.setter
+    def code(self, value):
+        import blobs
+        self.code_sha256 = blobs.put_text(value)
+        self.legacy_code = ''
+    
+    @property
+    def test_results(self):
+        import blobs
+        if self.results_sha256 is None:
+            return self.legacy_test_results
+        return blobs.get_json(self.results_sha256)
+    
+    @test_results.setter
+    def test_results(self, value):
+        import blobs
+        self.results_sha256 = None if value is None else blobs.put_json(value)
+        self.legacy_test_results = None
     
     def to_dict(self):
         return {
@@ -109,6 +214,65 @@ class Submission(db.Model):
             'submitted_at': self.submitted_at.isoformat()
         }
 
+class Blob(db.Model):
+    """Compressed, content-addressed payload (see blobs.py)"""
+    __tablename__ = 'blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)  # of the uncompressed payload
+    codec = db.Column(db.String(16), nullable=False)  # 'zlib' or 'none'
+    size = db.Column(db.Integer, nullable=False)  # uncompressed bytes
+    data = db.Column(db.LargeBinary, nullable=False)
+
+class ContentVersion(db.Model):
+    """Version counters for cached content (see http_cache.py)"""
+    __tablename__ = 'content_versions'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class FirstSolve(db.Model):
+    """The first passing submission of each user for each challenge"""
+    __tablename__ = 'first_solves'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'))
+    solved_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    
+    # Per-day leaderboard: first solvers of a challenge in order
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'challenge_id', name='uq_first_solves_user_challenge'),
+        db.Index('ix_first_solves_challenge_solved_at', 'challenge_id', 'solved_at'),
+    )
+
+class UserStats(db.Model):
+    """Per-user leaderboard counters, kept up to date by stats.py"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    solved = db.Column(db.Integer, nullable=False, default=0)  # distinct days solved
+    total_submissions = db.Column(db.Integer, nullable=False, default=0)
+    first_solve_at = db.Column(db.DateTime)  # first day ever solved
+    last_solve_at = db.Column(db.DateTime)   # when the latest new day was solved (tie-breaker)
+    
+    # Leaderboard order: most days solved, then who got there first
+    __table_args__ = (
+        db.Index('ix_user_stats_rank', solved.desc(), last_solve_at, user_id),
+    )
+    
+    user = db.relationship('User')
+
+class GradeResult(db.Model):
+    """Persistent tier of the grading result cache (see grade_cache.py)"""
+    __tablename__ = 'grade_results'
+    
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of code + tests + grader version
+    test_hash = db.Column(db.String(64), nullable=False, index=True)  # sha256 of test_code
+    passed = db.Column(db.Boolean, nullable=False)
+    test_results = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+
 # Import routes (models defined inline to avoid circular imports)
 from routes import challenge_bp, submission_bp, leaderboard_bp
 from auth import auth_bp
@@ -121,8 +285,8 @@ app.register_blueprint(leaderboard_bp)
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy'}), 200
+    """Health check endpoint, with database connection pool usage"""
+    return jsonify({'status': 'healthy', 'database': db_profile.pool_stats(db.engine)}), 200
 
 @app.errorhandler(404)
 def not_found(error):
@@ -132,7 +296,18 @@ def not_found(error):
 def server_error(error):
     return jsonify({'error': 'Server error'}), 500
 
+@app.errorhandler(passwords.PasswordHasherBusy)
+def password_hasher_busy(error):
+    response = jsonify({'error': 'Server busy, please retry'})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+    # Create or migrate the schema (see migrations.py)
+    from migrations import upgrade
+    upgrade()
+    # Only in the reloader's serving process, not in the parent restarting it
+    if app.config['CHALLENGE_WATCH'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from watcher import start_watcher
+        start_watcher(app.config['CHALLENGE_DAYS_DIR'] or None)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -3,9 +3,11 @@ Authentication routes for user registration, login, and token refresh
 """
 
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, current_user
 import re
 
+from passwords import PasswordHasherBusy
+
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 # Import after blueprint creation to avoid circular imports
@@ -79,6 +81,10 @@ def register():
             'user': user.to_dict()
         }), 201
     
+    except PasswordHasherBusy:
+        db.session.rollback()
+        raise  # 503 + Retry-After (see app.py)
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed'}), 500
@@ -86,7 +92,7 @@ def register():
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Login user and return access + refresh tokens"""
-    from app import User
+    from app import db, User
     
     data = request.get_json()
     
@@ -105,6 +111,14 @@ def login():
     if not user or not user.check_password(password):
         return jsonify({'error': 'Invalid username or password'}), 401
     
+    # Upgrade hashes made with an older BCRYPT_ROUNDS while we have the password
+    if user.password_needs_rehash():
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except PasswordHasherBusy:
+            pass  # try again on a later login
+    
     # Create tokens (identity must be a string for Flask-JWT-Extended)
     access_token = create_access_token(identity=str(user.id))
     refresh_token = create_refresh_token(identity=str(user.id))
@@ -120,16 +134,9 @@ def login():
 @jwt_required(refresh=True)
 def refresh():
     """Get new access token using refresh token"""
-    from app import User
-    
-    user_id = int(get_jwt_identity())  # Convert string identity back to int
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
+    # current_user is resolved from the token by identity.py (404 if the user is gone)
     # Create new access token (identity must be a string)
-    access_token = create_access_token(identity=str(user.id))
+    access_token = create_access_token(identity=str(current_user.id))
     
     return jsonify({
         'access_token': access_token
@@ -139,12 +146,5 @@ def refresh():
 @jwt_required()
 def get_current_user():
     """Get current authenticated user info"""
-    from app import User
-    
-    user_id = int(get_jwt_identity())  # Convert string identity back to int
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify(user.to_dict()), 200
+    # Cached record from identity.py; no query on a cache hit
+    return jsonify(current_user.to_dict()), 200
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Grader throughput and latency benchmark
+
+Replays every day's reference solution from `days/`, plus known-bad
+variants of each (a syntax error, a submission that raises on import and
+an empty one), through the same warm worker pool the backend grades with.
+For each concurrency level a pool with that many workers is fed the cases
+from as many client threads, and the run reports:
+
+ - latency percentiles (p50/p95/p99) per submission, as seen by the caller
+ - throughput in submissions per second
+ - peak resident memory of any worker
+ - the import-time share of a cold grade: how much of grading one
+   submission in a fresh interpreter is spent importing numpy/qiskit/Aer
+
+Run from backend/:
+
+    python benchmarks/grader_bench.py --concurrency 1,2,4 --rounds 5 \\
+        --output bench.json
+
+and compare a later run against a saved one (exits 1 if p95 latency or
+throughput regressed by more than --tolerance):
+
+    python benchmarks/grader_bench.py --concurrency 1,2,4 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from grader_pool import GraderPool, PRELOAD_MODULES
+
+DAYS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'days'))
+
+# Known-bad submissions derived from each reference solution
+BAD_VARIANTS = {
+    'syntax_error': lambda code: code + '\n\ndef broken(:\n    pass\n',
+    'raises': lambda code: 'raise RuntimeError("benchmark: bad submission")\n' + code,
+    'empty': lambda code: '',
+}
+
+# Grades one submission in a fresh interpreter, timing the imports apart
+_COLD_GRADE = '''
+import json, sys, time
+started = time.perf_counter()
+from grader import CodeGrader
+from grader_pool import _preload
+_preload(json.loads(sys.argv[1]))
+imported = time.perf_counter()
+CodeGrader.run_inline(sys.stdin.read(), open(sys.argv[2], encoding='utf-8').read())
+graded = time.perf_counter()
+print(json.dumps({'import_seconds': imported - started, 'total_seconds': graded - started}))
+'''
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def load_cases(days_root=DAYS_ROOT, variants=True):
+    """(name, user_code, test_code, test_path) for every day and bad variant."""
+    cases = []
+    for entry in sorted(os.listdir(days_root)):
+        solution_path = os.path.join(days_root, entry, 'solution.py')
+        test_path = os.path.join(days_root, entry, 'test.py')
+        if not (os.path.isfile(solution_path) and os.path.isfile(test_path)):
+            continue
+        solution, tests = _read(solution_path), _read(test_path)
+        cases.append((entry, solution, tests, test_path))
+        if variants:
+            for name, make in BAD_VARIANTS.items():
+                cases.append((f'{entry}:{name}', make(solution), tests, test_path))
+    return cases
+
+
+def percentile(values, pct):
+    """Linearly interpolated `pct` percentile of `values`."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies, elapsed):
+    return {
+        'submissions': len(latencies),
+        'seconds': round(elapsed, 3),
+        'throughput_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies, default=0.0) * 1000, 1),
+        },
+    }
+
+
+def run_level(cases, concurrency, rounds=3, timeout=30, preload=PRELOAD_MODULES):
+    """Grade `cases` `rounds` times on a pool of `concurrency` workers."""
+    pool = GraderPool(size=concurrency, preload=preload)
+    try:
+        # One job per worker first, so the measured runs start warm
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda case: pool.run(case[1], case[2], timeout=timeout),
+                              [cases[i % len(cases)] for i in range(concurrency)]))
+
+        def grade(case):
+            started = time.perf_counter()
+            results = pool.run(case[1], case[2], timeout=timeout)
+            return time.perf_counter() - started, results['passed']
+
+        jobs = [case for _ in range(rounds) for case in cases]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            graded = list(executor.map(grade, jobs))
+        elapsed = time.perf_counter() - started
+
+        report = summarize([latency for latency, _ in graded], elapsed)
+        report['concurrency'] = concurrency
+        report['passed'] = sum(passed for _, passed in graded)
+        stats = pool.stats()
+        report['peak_worker_rss_mb'] = stats['peak_rss_mb']
+        report['timeouts'] = stats['timeouts']
+        report['recycled'] = stats['recycled']
+        return report
+    finally:
+        pool.shutdown()
+
+
+def measure_cold_grade(case, preload=PRELOAD_MODULES, repeat=3):
+    """Import share of grading `case` in fresh interpreters (median of `repeat`)."""
+    backend = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', _COLD_GRADE, json.dumps(list(preload)), case[3]],
+            input=case[1], capture_output=True, text=True, cwd=backend, check=True
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    samples.sort(key=lambda s: s['total_seconds'])
+    median = samples[len(samples) // 2]
+    return {
+        'case': case[0],
+        'import_seconds': round(median['import_seconds'], 3),
+        'total_seconds': round(median['total_seconds'], 3),
+        'import_share': round(median['import_seconds'] / median['total_seconds'], 3),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of `current` against `baseline`, as printable strings."""
+    regressions = []
+    previous = {level['concurrency']: level for level in baseline.get('levels', [])}
+    for level in current['levels']:
+        old = previous.get(level['concurrency'])
+        if old is None:
+            continue
+        label = f"concurrency {level['concurrency']}"
+        p95, old_p95 = level['latency_ms']['p95'], old['latency_ms']['p95']
+        if old_p95 and p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old_p95}ms -> {p95}ms")
+        rate, old_rate = level['throughput_per_sec'], old['throughput_per_sec']
+        if old_rate and rate < old_rate * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old_rate}/s -> {rate}/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the grader worker pool')
+    parser.add_argument('--concurrency', default='1,2,4',
+                        help='comma-separated worker/client counts (default 1,2,4)')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='times every case is graded per level (default 3)')
+    parser.add_argument('--timeout', type=int, default=30, help='per-submission time limit')
+    parser.add_argument('--days', default=DAYS_ROOT, help='days/ folder to replay')
+    parser.add_argument('--no-variants', action='store_true',
+                        help='replay the reference solutions only')
+    parser.add_argument('--skip-cold', action='store_true',
+                        help='skip the cold-start import measurement')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare', help='JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression with --compare (default 0.2)')
+    args = parser.parse_args(argv)
+
+    cases = load_cases(args.days, variants=not args.no_variants)
+    if not cases:
+        print(f"No solution.py/test.py pairs found in {args.days}")
+        return 1
+    levels = [int(n) for n in args.concurrency.split(',') if n.strip()]
+
+    report = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'cases': [case[0] for case in cases],
+        'rounds': args.rounds,
+        'levels': [],
+    }
+    print(f"{len(cases)} cases x {args.rounds} rounds")
+    for concurrency in levels:
+        level = run_level(cases, concurrency, rounds=args.rounds, timeout=args.timeout)
+        report['levels'].append(level)
+        latency = level['latency_ms']
+        print(f"concurrency {concurrency:>3}: {level['throughput_per_sec']:>7.2f} subs/s"
+              f"  p50 {latency['p50']:>8.1f}ms  p95 {latency['p95']:>8.1f}ms"
+              f"  p99 {latency['p99']:>8.1f}ms  peak worker RSS {level['peak_worker_rss_mb']:.0f}MB")
+
+    if not args.skip_cold:
+        report['cold_grade'] = measure_cold_grade(cases[0])
+        cold = report['cold_grade']
+        print(f"cold grade of {cold['case']}: {cold['total_seconds']:.2f}s,"
+              f" {cold['import_share']:.0%} spent importing")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
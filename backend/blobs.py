@@ -0,0 +1,138 @@
+"""
+Content-addressed, compressed storage for submission code and results
+
+Submissions reference their code and test results by SHA-256 instead of
+storing the text inline. Each distinct payload is stored once in the
+`blobs` table, zlib-compressed, so resubmissions of the same code (and the
+identical results the grade cache hands back for them) cost one row.
+
+`Submission.code` and `Submission.test_results` read and write through this
+module, so callers keep using plain strings and dicts. Blobs are immutable:
+decompressed payloads up to BLOB_CACHE_MAX_BYTES are kept in an in-process
+LRU (BLOB_CACHE_SIZE entries, default 256).
+"""
+
+import hashlib
+import json
+import os
+import zlib
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db, Blob
+from lru import LRUCache
+
+CODEC_ZLIB = 'zlib'
+CODEC_NONE = 'none'
+
+COMPRESSION_LEVEL = 6
+BLOB_CACHE_MAX_BYTES = 64 * 1024
+
+_cache = LRUCache(maxsize=int(os.getenv('BLOB_CACHE_SIZE', '256')))
+
+
+def digest(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+
+def encode_json(value):
+    """Canonical JSON bytes, so equal dicts share a blob."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _compress(payload):
+    compressed = zlib.compress(payload, COMPRESSION_LEVEL)
+    if len(compressed) < len(payload):
+        return CODEC_ZLIB, compressed
+    return CODEC_NONE, payload
+
+
+def _decompress(codec, data):
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_NONE:
+        return bytes(data)
+    raise ValueError(f'Unknown blob codec {codec!r}')
+
+
+def _insert_ignore(rows):
+    """Insert blob rows, skipping digests that are already stored."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.session.execute(insert(Blob).values(rows).on_conflict_do_nothing(index_elements=['sha256']))
+        return
+
+    existing = {sha for (sha,) in db.session.query(Blob.sha256).filter(
+        Blob.sha256.in_([row['sha256'] for row in rows]))}
+    for row in rows:
+        if row['sha256'] in existing:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(Blob.__table__.insert().values(**row))
+        except IntegrityError:
+            pass
+
+
+def put_many(payloads):
+    """Store byte payloads; returns their digests in the same order."""
+    digests = [digest(p) for p in payloads]
+    rows = {}
+    for sha, payload in zip(digests, payloads):
+        if sha not in rows:
+            codec, data = _compress(payload)
+            rows[sha] = {'sha256': sha, 'codec': codec, 'size': len(payload), 'data': data}
+    if rows:
+        _insert_ignore(list(rows.values()))
+    return digests
+
+
+def put(payload):
+    return put_many([payload])[0]
+
+
+def get_many(digests):
+    """Map each digest in `digests` to its payload bytes."""
+    found = {}
+    missing = set()
+    for sha in digests:
+        payload = _cache.get(sha)
+        if payload is None:
+            missing.add(sha)
+        else:
+            found[sha] = payload
+    if missing:
+        for sha, codec, data in db.session.query(Blob.sha256, Blob.codec, Blob.data).filter(
+                Blob.sha256.in_(missing)):
+            payload = _decompress(codec, data)
+            if len(payload) <= BLOB_CACHE_MAX_BYTES:
+                _cache.set(sha, payload)
+            found[sha] = payload
+    return found
+
+
+def get(sha):
+    payload = get_many([sha]).get(sha)
+    if payload is None:
+        raise LookupError(f'Blob {sha} not found')
+    return payload
+
+
+def put_text(text):
+    return put(text.encode('utf-8'))
+
+
+def get_text(sha):
+    return get(sha).decode('utf-8')
+
+
+def put_json(value):
+    return put(encode_json(value))
+
+
+def get_json(sha):
+    return json.loads(get(sha))
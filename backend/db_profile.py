@@ -0,0 +1,102 @@
+"""
+Database engine profile: connection pool sizing and SQLite tuning
+
+With SQLite's defaults (rollback journal, synchronous=FULL, no busy
+timeout) a commit locks out every reader, and a second writer fails at
+once with "database is locked". Every new SQLite connection is therefore
+switched to WAL, so readers and the single writer no longer block each
+other, with a memory-mapped read path and a busy timeout that makes
+writers wait their turn instead of failing.
+
+It also runs with synchronous=NORMAL, which skips the fsync on every
+commit. In WAL mode that cannot corrupt the database, but commits made
+since the last checkpoint can be lost on a power failure or OS crash (not
+on an application crash). Set SQLITE_SYNCHRONOUS=FULL where every
+acknowledged commit must survive that.
+
+For server databases (PostgreSQL, MySQL) the connection pool is sized
+explicitly and connections are pinged before use, so ones dropped by the
+server are replaced transparently.
+
+Configuration (environment variables):
+ - DB_POOL_SIZE: pooled connections per process (default 10)
+ - DB_MAX_OVERFLOW: extra connections allowed under burst (default 20)
+ - DB_POOL_TIMEOUT: seconds to wait for a free connection (default 30)
+ - DB_POOL_RECYCLE: seconds before a connection is replaced (default 1800)
+ - DB_BUSY_TIMEOUT_MS: SQLite lock wait in milliseconds (default 5000)
+ - SQLITE_JOURNAL_MODE: default WAL
+ - SQLITE_SYNCHRONOUS: default NORMAL
+ - SQLITE_MMAP_SIZE: bytes of the file to memory-map (default 256MB)
+"""
+
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+
+
+def _is_memory(url):
+    return url.database in (None, '', ':memory:') or 'mode=memory' in str(url)
+
+
+def engine_options(database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for `database_uri`."""
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite':
+        # SQLite is tuned per connection instead (configure_engine)
+        return {}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas(memory=False):
+    """(pragma, value) pairs applied to every new SQLite connection."""
+    pragmas = [('busy_timeout', DB_BUSY_TIMEOUT_MS)]
+    if not memory:
+        pragmas += [
+            ('journal_mode', SQLITE_JOURNAL_MODE),
+            ('synchronous', SQLITE_SYNCHRONOUS),
+            ('mmap_size', SQLITE_MMAP_SIZE),
+        ]
+    return pragmas
+
+
+def configure_engine(engine):
+    """Apply the SQLite pragmas to every connection `engine` opens."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(memory=_is_memory(engine.url))
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def pool_stats(engine):
+    """Snapshot of the connection pool of `engine`."""
+    pool = engine.pool
+    stats = {'dialect': engine.dialect.name, 'pool': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            stats[name] = counter()
+    return stats
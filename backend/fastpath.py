@@ -0,0 +1,262 @@
+"""
+Exact-probability fast path for small grading circuits
+
+The day tests run a circuit on AerSimulator with a few hundred shots and
+then check that the observed frequencies fall inside a tolerance window.
+Sampling costs CPU and occasionally lands outside the window. While the
+fast path is enabled, `AerSimulator.run` is intercepted for small, ideal
+circuits (unitary gates followed by final measurements, no noise model):
+the measurement distribution is computed exactly from the statevector and
+turned into counts, either
+
+ - `exact`: the expected counts, apportioned so they sum to `shots`
+ - `sample`: a multinomial draw over the exact probabilities (seeded by
+   `seed_simulator` when the caller passes one)
+
+Anything else falls through to the real simulator. The returned result
+answers `get_counts()` directly; any other attribute runs the real
+simulation on demand and delegates to it, so unusual usage still works.
+
+Configuration (environment variables):
+ - GRADER_FAST_PATH_MAX_QUBITS: largest circuit handled (default 12, 0 disables)
+ - GRADER_FAST_PATH_MODE: `exact` (default) or `sample`
+"""
+
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+FAST_PATH_MAX_QUBITS = int(os.getenv('GRADER_FAST_PATH_MAX_QUBITS', '12'))
+FAST_PATH_MODE = os.getenv('GRADER_FAST_PATH_MODE', 'exact')
+
+# Run options the fast path understands; anything else uses the real simulator
+_SUPPORTED_RUN_OPTIONS = {'shots', 'seed_simulator'}
+
+_settings = contextvars.ContextVar('fast_path_settings', default=None)
+_install_lock = threading.Lock()
+_original_run = None
+
+
+def apportion_counts(probabilities, shots):
+    """Integer counts summing to `shots` that are closest to `probabilities * shots`.
+
+    Uses the largest-remainder method, ties broken by outcome order.
+    """
+    expected = np.asarray(probabilities, dtype=float) * shots
+    counts = np.floor(expected).astype(np.int64)
+    remainder = int(shots - counts.sum())
+    if remainder > 0:
+        order = np.argsort(-(expected - counts), kind='stable')
+        counts[order[:remainder]] += 1
+    return counts
+
+
+def sample_counts(probabilities, shots, seed=None):
+    """Multinomial draw of `shots` outcomes over `probabilities`."""
+    p = np.asarray(probabilities, dtype=float)
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(shots, p / p.sum())
+
+
+def _measurement_plan(circuit, max_qubits):
+    """Split a circuit into its unitary part and final measurements.
+
+    Returns (unitary_circuit, {clbit_index: qubit_index}) or None when the
+    circuit is outside what the fast path can reproduce exactly.
+    """
+    from qiskit import QuantumCircuit
+    from qiskit.circuit import Gate
+
+    if circuit.num_qubits == 0 or circuit.num_qubits > max_qubits:
+        return None
+    if circuit.parameters:
+        return None
+    # Every classical bit must belong to a register so counts can be formatted
+    if sum(creg.size for creg in circuit.cregs) != circuit.num_clbits:
+        return None
+
+    unitary = QuantumCircuit(circuit.num_qubits)
+    measured_qubits = set()
+    clbit_sources = {}
+    for instruction in circuit.data:
+        op = instruction.operation
+        qubits = [circuit.find_bit(q).index for q in instruction.qubits]
+        if getattr(op, 'condition', None) is not None:
+            return None
+        if op.name == 'barrier':
+            continue
+        if op.name == 'measure':
+            clbit = circuit.find_bit(instruction.clbits[0]).index
+            clbit_sources[clbit] = qubits[0]
+            measured_qubits.add(qubits[0])
+            continue
+        if not isinstance(op, Gate) or measured_qubits.intersection(qubits):
+            # Resets, control flow, saves, or gates after a measurement
+            return None
+        unitary.append(op, qubits)
+
+    if not clbit_sources:
+        # Aer reports no counts for circuits without measurements
+        return None
+    return unitary, clbit_sources
+
+
+def memory_distribution(probabilities, clbit_sources):
+    """Distribution over classical memory values after measuring
+
+    `probabilities` are those of the computational basis states and
+    `clbit_sources` maps each classical bit to the qubit measured into it.
+    Returns (memory_values, probabilities), without impossible outcomes.
+    """
+    basis = np.arange(len(probabilities))
+    memory = np.zeros(len(probabilities), dtype=np.int64)
+    for clbit, qubit in clbit_sources.items():
+        memory |= ((basis >> qubit) & 1) << clbit
+
+    values, inverse = np.unique(memory, return_inverse=True)
+    totals = np.bincount(inverse, weights=probabilities, minlength=len(values))
+    keep = totals > 1e-12
+    return values[keep], totals[keep]
+
+
+def outcome_counts(probabilities, shots, mode=None, seed=None):
+    """Counts for `shots` runs: apportioned (`exact`) or drawn (`sample`)."""
+    if (mode or FAST_PATH_MODE) == 'sample':
+        return sample_counts(probabilities, shots, seed)
+    return apportion_counts(probabilities, shots)
+
+
+def circuit_distribution(circuit, max_qubits):
+    """Exact distribution over classical memory values for `circuit`.
+
+    Returns (memory_values, probabilities) or None if unsupported.
+    """
+    from qiskit.quantum_info import Statevector
+
+    plan = _measurement_plan(circuit, max_qubits)
+    if plan is None:
+        return None
+    unitary, clbit_sources = plan
+
+    return memory_distribution(Statevector(unitary).probabilities(), clbit_sources)
+
+
+def _counts_for(circuit, max_qubits, mode, shots, seed):
+    from qiskit.result import Counts
+
+    distribution = circuit_distribution(circuit, max_qubits)
+    if distribution is None:
+        return None
+    values, probabilities = distribution
+    counts = outcome_counts(probabilities, shots, mode, seed)
+
+    data = {hex(int(v)): int(c) for v, c in zip(values, counts) if c}
+    return Counts(
+        data,
+        creg_sizes=[[creg.name, creg.size] for creg in circuit.cregs],
+        memory_slots=circuit.num_clbits
+    )
+
+
+class _FastPathResult:
+    """Result stand-in answering get_counts() from precomputed counts"""
+
+    def __init__(self, circuits, counts, real_job):
+        self._circuits = circuits
+        self._counts = counts
+        self._real_job = real_job
+
+    def get_counts(self, experiment=None):
+        if experiment is None:
+            return self._counts[0] if len(self._counts) == 1 else list(self._counts)
+        if isinstance(experiment, int):
+            return self._counts[experiment]
+        for i, circuit in enumerate(self._circuits):
+            if circuit is experiment or circuit.name == getattr(experiment, 'name', experiment):
+                return self._counts[i]
+        raise KeyError(f'No counts for experiment "{experiment}"')
+
+    def __getattr__(self, name):
+        # Anything beyond counts (memory, statevectors, metadata...) comes
+        # from a real simulation run on first use.
+        return getattr(self._real_job().result(), name)
+
+
+class _FastPathJob:
+    """Job stand-in for fast-path runs"""
+
+    def __init__(self, circuits, counts, real_job):
+        self._result = _FastPathResult(circuits, counts, real_job)
+        self._real_job = real_job
+
+    def result(self, *args, **kwargs):
+        return self._result
+
+    def status(self):
+        from qiskit.providers import JobStatus
+        return JobStatus.DONE
+
+    def done(self):
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self._real_job(), name)
+
+
+def _fast_run(self, circuits, parameter_binds=None, **run_options):
+    settings = _settings.get()
+    if (settings is None or parameter_binds is not None
+            or set(run_options) - _SUPPORTED_RUN_OPTIONS
+            or getattr(self.options, 'noise_model', None) is not None):
+        return _original_run(self, circuits, parameter_binds=parameter_binds, **run_options)
+
+    max_qubits, mode = settings
+    single = not isinstance(circuits, (list, tuple))
+    circuit_list = [circuits] if single else list(circuits)
+    shots = run_options.get('shots') or self.options.shots
+    seed = run_options.get('seed_simulator')
+
+    counts = []
+    for circuit in circuit_list:
+        c = _counts_for(circuit, max_qubits, mode, shots, seed)
+        if c is None:
+            return _original_run(self, circuits, **run_options)
+        counts.append(c)
+
+    real = []
+
+    def real_job():
+        if not real:
+            real.append(_original_run(self, circuits, **run_options))
+        return real[0]
+
+    return _FastPathJob(circuit_list, counts, real_job)
+
+
+def install():
+    """Patch AerSimulator.run once; the patch is inert unless enabled()."""
+    global _original_run
+    with _install_lock:
+        if _original_run is not None:
+            return
+        from qiskit_aer import AerSimulator
+        _original_run = AerSimulator.run
+        AerSimulator.run = _fast_run
+
+
+@contextmanager
+def enabled(max_qubits=None, mode=None):
+    """Serve AerSimulator.run from the fast path inside this block."""
+    max_qubits = FAST_PATH_MAX_QUBITS if max_qubits is None else max_qubits
+    if max_qubits <= 0:
+        yield
+        return
+    install()
+    token = _settings.set((max_qubits, mode or FAST_PATH_MODE))
+    try:
+        yield
+    finally:
+        _settings.reset(token)
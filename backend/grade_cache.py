@@ -0,0 +1,186 @@
+"""
+Content-addressed cache of grading results
+
+Results are keyed on a hash of the submission code (with line endings
+normalized), the challenge's test code, the grader version and the grader
+settings that change results (fast path mode and size, output cap), so an identical resubmission
+is answered without running the grader again. There are two tiers:
+
+ - an in-process LRU (GRADE_CACHE_SIZE entries, default 2048)
+ - the `grade_results` table, shared by every process using the database
+
+Because the test code is part of the key, editing a challenge's tests can
+never serve a stale result; the listener at the bottom of this module also
+deletes the persisted results for the old tests so they don't pile up.
+"""
+
+import hashlib
+import os
+
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+
+from app import db, Challenge, GradeResult
+import fastpath
+import grader
+from grader import CodeGrader, GRADER_VERSION, OUTCOME_COMPLETED
+from lru import LRUCache
+
+# Bump when the key derivation changes so keys made the old way are no
+# longer matched
+KEY_VERSION = '2'
+
+
+def grader_settings():
+    """The grader settings that change the result of an unchanged submission."""
+    return (f'fast_path={fastpath.FAST_PATH_MODE}:{fastpath.FAST_PATH_MAX_QUBITS};'
+            f'max_output={grader.MAX_OUTPUT_CHARS}')
+
+
+# Part of every key, so changing a setting doesn't serve grades made under
+# the old value
+GRADER_SETTINGS = grader_settings()
+
+
+def normalize_code(code):
+    """Normalize line endings, which Python also normalizes inside string literals.
+
+    Nothing else is touched: trailing whitespace can sit inside a
+    multi-line string, and leading blank lines shift traceback line numbers.
+    """
+    return code.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def test_hash(test_code):
+    return hashlib.sha256(test_code.encode('utf-8')).hexdigest()
+
+
+def cache_key(code, test_code):
+    """Key identifying the result of grading `code` against `test_code`."""
+    h = hashlib.sha256()
+    for part in (normalize_code(code), test_hash(test_code), GRADER_VERSION, KEY_VERSION, GRADER_SETTINGS):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def is_cacheable(results):
+    """Only deterministic outcomes are cached; limit breaches and crashes may
+    depend on load and are graded again next time."""
+    test_results = results.get('test_results')
+    if isinstance(test_results, dict):
+        return test_results.get('outcome', OUTCOME_COMPLETED) == OUTCOME_COMPLETED
+    return 'Grader worker exited' not in results.get('error', '')
+
+
+class GradeCache:
+    """Two-tier (memory + database) grading result cache"""
+
+    def __init__(self, maxsize=2048):
+        self._memory = LRUCache(maxsize)
+
+    def get(self, code, test_code):
+        """Return (passed, results) for a cached grading, or None."""
+        key = cache_key(code, test_code)
+        hit = self._memory.get(key)
+        if hit is not None:
+            return hit
+
+        row = db.session.get(GradeResult, key)
+        if row is None:
+            return None
+        hit = (row.passed, row.test_results)
+        self._memory.set(key, hit)
+        return hit
+
+    def put(self, code, test_code, passed, results):
+        """Store a grading result in both tiers.
+
+        The database row is added to the current session inside a
+        savepoint; it is committed with the caller's transaction.
+        """
+        if not is_cacheable(results):
+            return
+        key = cache_key(code, test_code)
+        self._memory.set(key, (passed, results))
+        try:
+            with db.session.begin_nested():
+                db.session.add(GradeResult(
+                    key=key,
+                    test_hash=test_hash(test_code),
+                    passed=passed,
+                    test_results=results
+                ))
+        except IntegrityError:
+            # A concurrent request cached the same result first
+            pass
+
+    def invalidate_tests(self, old_test_code, connection=None):
+        """Drop persisted results graded against `old_test_code`."""
+        stmt = GradeResult.__table__.delete().where(
+            GradeResult.test_hash == test_hash(old_test_code)
+        )
+        if connection is not None:
+            connection.execute(stmt)
+        else:
+            db.session.execute(stmt)
+        # Memory entries for the old tests can no longer be looked up (the
+        # key includes the test code) and age out of the LRU on their own.
+
+    def prune(self, current_test_codes):
+        """Drop persisted results for tests no challenge uses any more."""
+        current = [test_hash(t) for t in current_test_codes]
+        db.session.query(GradeResult).filter(
+            GradeResult.test_hash.notin_(current)
+        ).delete(synchronize_session=False)
+
+    def clear(self):
+        """Empty both tiers (the database delete joins the current transaction)."""
+        self._memory.clear()
+        db.session.query(GradeResult).delete()
+
+    def stats(self):
+        return {
+            'size': len(self._memory),
+            'hits': self._memory.hits,
+            'misses': self._memory.misses,
+        }
+
+
+grade_cache = GradeCache(maxsize=int(os.getenv('GRADE_CACHE_SIZE', '2048')))
+
+
+def cached_validate_solution(code, test_code):
+    """CodeGrader.validate_solution behind the result cache.
+
+    Returns:
+        Tuple of (passed: bool, results: dict, cached: bool)
+    """
+    hit = grade_cache.get(code, test_code)
+    if hit is not None:
+        passed, results = hit
+        return passed, results, True
+
+    passed, results = CodeGrader.validate_solution(code, test_code)
+    grade_cache.put(code, test_code, passed, results)
+    return passed, results, False
+
+
+@event.listens_for(Challenge.test_code, 'set', active_history=True, retval=True)
+def _load_old_test_code(target, value, oldvalue, initiator):
+    # active_history makes SQLAlchemy load the previous test_code before it
+    # is replaced, so the after_update hook below can see it in the history.
+    return value
+
+
+@event.listens_for(Challenge, 'after_update')
+def _challenge_tests_changed(mapper, connection, target):
+    history = inspect(target).attrs.test_code.history
+    for old_test_code in history.deleted or ():
+        if old_test_code is not None and old_test_code != target.test_code:
+            grade_cache.invalidate_tests(old_test_code, connection=connection)
+
+
+@event.listens_for(Challenge, 'after_delete')
+def _challenge_deleted(mapper, connection, target):
+    grade_cache.invalidate_tests(target.test_code, connection=connection)
@@ -3,28 +3,205 @@ Grader module for executing and testing quantum code submissions
 """
 
 import sys
+import builtins
 import io
+import os
+import re
+import time
 from contextlib import redirect_stdout, redirect_stderr
 import traceback
 import types
 import unittest
 
+import fastpath
+
+# Bump whenever a grader change can alter the result of an unchanged
+# submission; cached results from older versions are then ignored.
+GRADER_VERSION = '4'
+
+# Structured outcomes reported in results['test_results']['outcome']
+OUTCOME_COMPLETED = 'completed'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_MEMORY_EXCEEDED = 'memory_exceeded'
+
+# Captured stdout/stderr/unittest output is truncated beyond this many characters
+MAX_OUTPUT_CHARS = int(os.getenv('GRADER_MAX_OUTPUT_CHARS', '65536'))
+
+# Challenges opt into the NumPy simulator (npsim.py) with this line in test.py
+_NUMPY_SIMULATOR_PRAGMA = re.compile(r'^\s*#\s*grader:\s*simulator\s*=\s*numpy\s*$', re.MULTILINE)
+
+# Error text that means the submission ran out of memory
+_MEMORY_ERROR_MARKERS = ('MemoryError', 'std::bad_alloc', 'Insufficient memory')
+
+
+class _BoundedStringIO(io.StringIO):
+    """StringIO that silently drops writes past `limit` characters"""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.size = 0
+        self.truncated = False
+
+    def write(self, s):
+        remaining = self.limit - self.size
+        if remaining <= 0:
+            self.truncated = True
+            return len(s)
+        if len(s) > remaining:
+            self.truncated = True
+            s = s[:remaining]
+        self.size += len(s)
+        super().write(s)
+        return len(s)
+
+
+def _truncate(text, limit):
+    """Return (text, truncated) with text cut to `limit` characters."""
+    if len(text) <= limit:
+        return text, False
+    return text[:limit] + '\n... [output truncated]', True
+
+
+def uses_numpy_simulator(test_code):
+    """True if the challenge's tests opt into the NumPy simulator."""
+    return bool(_NUMPY_SIMULATOR_PRAGMA.search(test_code or ''))
+
+
+def _builtins_with_aliases(aliases):
+    """Builtins whose __import__ resolves `aliases` to stand-in modules."""
+    real_import = builtins.__import__
+
+    def _import(name, globals=None, locals=None, fromlist=(), level=0):
+        root = name.partition('.')[0]
+        if level == 0 and root in aliases:
+            if name != root:
+                raise ImportError(f"{name} is not available in the NumPy grading simulator")
+            return aliases[root]
+        return real_import(name, globals, locals, fromlist, level)
+
+    namespace = dict(vars(builtins))
+    namespace['__import__'] = _import
+    return namespace
+
+
+def _lap(timings, phase, since):
+    """Record the seconds elapsed since `since` as `phase`; returns now."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[phase] = now - since
+    return now
+
+
+def limit_exceeded_results(outcome, message, **details):
+    """Results for a submission stopped by a resource limit."""
+    test_results = {
+        'outcome': outcome,
+        'testsRun': 0,
+        'failures': 0,
+        'errors': 0,
+        'skipped': 0,
+        'failures_info': [],
+        'errors_info': [],
+    }
+    test_results.update(details)
+    return {
+        'passed': False,
+        'output': '',
+        'error': message,
+        'test_results': test_results
+    }
+
+
 class CodeGrader:
     """Executes and grades user-submitted quantum code"""
     
     @staticmethod
-    def execute_code(user_code, test_code, timeout=30):
+    def execute_code(user_code, test_code, timeout=30, profile=False, pstats_path=None):
         """
         Execute user code with test code and return results
         
+        Submissions are dispatched to the warm worker pool (see
+        grader_pool.py) so the Qiskit imports are paid once per worker
+        rather than once per submission. Pool workers enforce `timeout` as
+        both a wall-clock and CPU-time limit, and cap the address space of
+        the worker; a submission that breaks a limit gets a `timeout` or
+        `memory_exceeded` outcome in its test_results.
+        
+        With GRADER_POOL_SIZE=0 the code runs inline in the calling thread
+        instead, and only the output cap is enforced.
+        
+        Small ideal circuits run on AerSimulator get exact counts instead of
+        sampled ones (see fastpath.py). Challenges whose tests contain
+        `# grader: simulator=numpy` are graded on the NumPy simulator
+        (npsim.py) instead of qiskit/qiskit_aer.
+        
+        With `profile` the run executes under cProfile and tracemalloc and
+        test_results gets a `profile` section with the hotspots and peak
+        memory (see profiling.py). This is for admins and challenge
+        authors only: it slows grading down several times over.
+        
         Args:
             user_code: User's submitted solution code
             test_code: Test code to validate the solution
             timeout: Maximum execution time in seconds
-            
+            profile: Profile the run
+            pstats_path: Also save the raw profile to this file (implies
+                `profile`)
+        
         Returns:
             Dictionary with execution results and test outcomes
         """
+        from grader_pool import get_pool
+        import metrics
+        import profiling
+        
+        capture = {} if profile or pstats_path else None
+        pool = get_pool()
+        if pool is None:
+            timings = {}
+            results = CodeGrader.run_inline(user_code, test_code, timings=timings, profile=capture)
+            if capture is None:
+                metrics.observe_grader_phases(timings)
+        else:
+            results = pool.run(user_code, test_code, timeout=timeout, profile=capture)
+        if pstats_path and capture.get('pstats'):
+            profiling.write_pstats(capture, pstats_path)
+        return results
+    
+    @staticmethod
+    def run_inline(user_code, test_code, max_output=None, timings=None, profile=None):
+        """
+        Execute user code with test code in the current process
+        
+        This is the body of a grading run; pool workers call it for every
+        job they receive.
+        
+        Args:
+            user_code: User's submitted solution code
+            test_code: Test code to validate the solution
+            max_output: Character cap for each captured stream
+                (defaults to GRADER_MAX_OUTPUT_CHARS)
+            timings: Optional dict that receives the seconds spent in each
+                phase reached: 'exec', 'define_tests', 'run_tests' and
+                'serialize'
+            profile: Optional dict; when given, the run is profiled (see
+                profiling.profile_run) and the dict receives the raw profile
+        
+        Returns:
+            Dictionary with execution results and test outcomes
+        """
+        if profile is not None:
+            import profiling
+            timings = {} if timings is None else timings
+            return profiling.profile_run(
+                lambda: CodeGrader.run_inline(user_code, test_code, max_output, timings),
+                profile, phases=timings
+            )
+        
+        if max_output is None:
+            max_output = MAX_OUTPUT_CHARS
+        
         results = {
             'passed': False,
             'output': '',
@@ -32,11 +209,24 @@ class CodeGrader:
             'test_results': []
         }
         
+        # Everything the submission prints is captured (and capped)
+        output_buffer = _BoundedStringIO(max_output)
+        error_buffer = _BoundedStringIO(max_output)
+        
+        numpy_simulator = uses_numpy_simulator(test_code)
+        started = time.perf_counter()
+        
         try:
             # Create execution environment
             exec_globals = {
                 '__builtins__': __builtins__,
             }
+            aliases = {}
+            if numpy_simulator:
+                # `qiskit` / `qiskit_aer` imports resolve to the NumPy shims
+                import npsim
+                aliases.update(npsim.shim_modules())
+                exec_globals['__builtins__'] = _builtins_with_aliases(aliases)
             
             # Import necessary libraries
             import_statements = """
@@ -44,16 +234,17 @@ import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit_aer import AerSimulator
 """
-            
+
             # Combine code
             full_code = import_statements + "\n" + user_code
-            
+
             # Execute user code
-            exec(full_code, exec_globals)
-            
-            # Capture output and execute tests
-            output_buffer = io.StringIO()
-            error_buffer = io.StringIO()
+            # Small ideal circuits get exact counts (see fastpath.py)
+            fast_path_qubits = 0 if numpy_simulator else None
+            with fastpath.enabled(fast_path_qubits), redirect_stdout(output_buffer), redirect_stderr(error_buffer):
+                # Named so profiles and tracebacks tell submission frames apart
+                exec(compile(full_code, '<submission>', 'exec'), exec_globals)
+            started = _lap(timings, 'exec', started)
 
             # First, execute the test code in its own module namespace so
             # unittest can discover TestCase classes defined there.
@@ -61,53 +252,83 @@ from qiskit_aer import AerSimulator
 
             # Provide the same globals (including user code) to the test module
             test_module.__dict__.update(exec_globals)
+            
+            # Day tests written as `from solution import ...` get the
+            # submission's namespace as the `solution` module
+            solution_module = types.ModuleType("solution")
+            solution_module.__dict__.update(exec_globals)
+            test_module.__dict__['__builtins__'] = _builtins_with_aliases(dict(aliases, solution=solution_module))
 
             # Execute tests code to define TestCase classes / functions
             try:
-                exec(test_code, test_module.__dict__)
+                exec(compile(test_code, '<tests>', 'exec'), test_module.__dict__)
             except Exception as e:
                 # If tests themselves error during definition, capture and return
                 results['error'] = f"Test definition error: {type(e).__name__}: {e}\n{traceback.format_exc()}"
                 results['passed'] = False
+                _lap(timings, 'define_tests', started)
                 return results
 
             # Load tests from the test_module
             loader = unittest.TestLoader()
             suite = loader.loadTestsFromModule(test_module)
+            # Plain pytest-style `test_*` functions defined by the tests
+            for name, obj in list(test_module.__dict__.items()):
+                if (name.startswith('test') and isinstance(obj, types.FunctionType)
+                        and obj.__module__ == test_module.__name__):
+                    suite.addTest(unittest.FunctionTestCase(obj, description=name))
+            started = _lap(timings, 'define_tests', started)
 
             # Run the tests and capture their output
-            runner_stream = io.StringIO()
+            runner_stream = _BoundedStringIO(max_output)
             runner = unittest.TextTestRunner(stream=runner_stream, verbosity=2)
 
-            with redirect_stdout(output_buffer), redirect_stderr(error_buffer):
+            with fastpath.enabled(fast_path_qubits), redirect_stdout(output_buffer), redirect_stderr(error_buffer):
                 result = runner.run(suite)
+            started = _lap(timings, 'run_tests', started)
 
             # Aggregate results
             results['output'] = output_buffer.getvalue() + "\n" + runner_stream.getvalue()
             results['error'] = error_buffer.getvalue()
             results['test_results'] = {
+                'outcome': OUTCOME_COMPLETED,
                 'testsRun': result.testsRun,
                 'failures': len(result.failures),
                 'errors': len(result.errors),
                 'skipped': len(getattr(result, 'skipped', [])),
-                'failures_info': [ (str(case), tb) for case, tb in result.failures ],
-                'errors_info': [ (str(case), tb) for case, tb in result.errors ],
+                'failures_info': [ (str(case), _truncate(tb, max_output)[0]) for case, tb in result.failures ],
+                'errors_info': [ (str(case), _truncate(tb, max_output)[0]) for case, tb in result.errors ],
             }
-            results['passed'] = result.wasSuccessful()
-            
+            # A test file that defines no tests passes nothing
+            results['passed'] = result.wasSuccessful() and result.testsRun > 0
+
+            if output_buffer.truncated or error_buffer.truncated or runner_stream.truncated:
+                results['output'] += '\n... [output truncated]'
+                results['test_results']['output_truncated'] = True
+
+            if any(marker in tb for _, tb in result.errors for marker in _MEMORY_ERROR_MARKERS):
+                results['test_results']['outcome'] = OUTCOME_MEMORY_EXCEEDED
+            _lap(timings, 'serialize', started)
+
+        except MemoryError:
+            results = limit_exceeded_results(
+                OUTCOME_MEMORY_EXCEEDED,
+                'MemoryError: submission exceeded the grader memory limit'
+            )
         except Exception as e:
             results['error'] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
             results['passed'] = False
-        
+
+        results['error'], _ = _truncate(results['error'], max_output)
         return results
-    
+
     @staticmethod
-    def validate_solution(user_code, test_code):
+    def validate_solution(user_code, test_code, profile=False):
         """
         Validate a solution against test code
-        
+
         Returns:
             Tuple of (passed: bool, results: dict)
         """
-        results = CodeGrader.execute_code(user_code, test_code)
+        results = CodeGrader.execute_code(user_code, test_code, profile=profile)
         return results['passed'], results
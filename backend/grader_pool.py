@@ -0,0 +1,450 @@
+"""
+Pre-forked worker pool for grading submissions
+
+Each worker is a separate process that imports numpy, qiskit and the Aer
+simulator once at startup, then receives grading jobs over a pipe. This
+keeps import and interpreter warmup out of the request path.
+
+Configuration (environment variables):
+ - GRADER_POOL_SIZE: number of worker processes (0 grades inline, default 2)
+ - GRADER_MAX_JOBS_PER_WORKER: jobs a worker runs before it is recycled
+ - GRADER_MAX_RSS_MB: resident memory after a job above which the worker
+   is recycled
+ - GRADER_MEMORY_LIMIT_MB: address space a submission may allocate on top
+   of the warm worker (enforced with RLIMIT_AS, 0 disables)
+ - GRADER_PRELOAD: comma-separated modules workers import at startup
+   (default numpy,qiskit,qiskit_aer; use `numpy,npsim` for a fleet that only
+   grades challenges on the NumPy simulator)
+ - GRADER_START_METHOD: multiprocessing start method (default forkserver
+   where available, otherwise spawn)
+
+Every job also runs under a CPU-time rlimit and a wall-clock deadline equal
+to its timeout. A worker that overruns either is killed and replaced, and
+the job is reported with a `timeout` outcome.
+
+As with any forkserver/spawn pool, scripts that grade at import time must
+guard their entry point with `if __name__ == '__main__':`.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import metrics
+from grader import (
+    OUTCOME_MEMORY_EXCEEDED,
+    OUTCOME_TIMEOUT,
+    limit_exceeded_results,
+)
+
+# Modules every worker imports before accepting jobs
+PRELOAD_MODULES = ('numpy', 'qiskit', 'qiskit_aer')
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_JOBS_PER_WORKER = 50
+DEFAULT_MAX_RSS_MB = 1024
+DEFAULT_MEMORY_LIMIT_MB = 2048
+
+# Extra wall-clock time allowed on top of a job's timeout for pipe transfer
+WALL_CLOCK_GRACE_SECONDS = 2
+
+
+def _statm_mb(field):
+    """Read a field of /proc/self/statm in MB (Linux only)."""
+    with open('/proc/self/statm', 'r') as f:
+        pages = int(f.read().split()[field])
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _peak_rss_mb():
+    """Return the peak resident set size of this process in MB (best effort)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _current_rss_mb():
+    """Return the resident set size of this process in MB (best effort)."""
+    try:
+        return _statm_mb(1)
+    except (OSError, ValueError, IndexError):
+        # Not Linux: fall back to the peak RSS reported by getrusage
+        try:
+            return _peak_rss_mb()
+        except Exception:
+            return 0.0
+
+
+def _preload(modules):
+    """Import the heavy grading dependencies into this process."""
+    for name in modules:
+        __import__(name)
+    if 'qiskit_aer' in modules:
+        # Touch the simulator class so its extension module is fully loaded
+        from qiskit_aer import AerSimulator  # noqa: F401
+
+
+def _warm_up():
+    """Run a tiny circuit so Aer's thread pools exist before limits are set."""
+    from qiskit import QuantumCircuit
+    from qiskit_aer import AerSimulator
+
+    qc = QuantumCircuit(1, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    AerSimulator().run(qc, shots=1).result()
+
+
+def _limit_address_space(limit_mb):
+    """Cap this process's address space at its current size plus `limit_mb`."""
+    if resource is None or not limit_mb:
+        return
+    try:
+        limit = int((_statm_mb(0) + limit_mb) * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (OSError, ValueError, IndexError):
+        # No /proc or the platform rejects RLIMIT_AS (e.g. macOS)
+        pass
+
+
+def _limit_cpu_time(seconds):
+    """Allow `seconds` more CPU time; the kernel sends SIGXCPU past that."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, preload, memory_limit_mb):
+    """Worker loop: grade every job received on `conn` until told to stop."""
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None:
+        # A worker killed by SIGXCPU should not leave a core file behind
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    _preload(preload)
+    if 'qiskit_aer' in preload:
+        _warm_up()
+    _limit_address_space(memory_limit_mb)
+    from grader import CodeGrader
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        user_code, test_code, cpu_seconds, profiled = job
+        _limit_cpu_time(cpu_seconds)
+        timings = {}
+        profile = {} if profiled else None
+        results = CodeGrader.run_inline(user_code, test_code, timings=timings, profile=profile)
+        _limit_cpu_time(None)
+        conn.send({'results': results, 'timings': timings, 'profile': profile,
+                   'rss_mb': _current_rss_mb(), 'peak_rss_mb': _peak_rss_mb()})
+
+    conn.close()
+
+
+class _Worker:
+    """Handle on a single worker process and the parent end of its pipe"""
+
+    def __init__(self, ctx, preload, memory_limit_mb):
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, preload, memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs_done = 0
+
+    def stop(self, kill=False):
+        """Stop the worker, politely unless `kill` is set."""
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                kill = True
+        if kill and self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class GraderPool:
+    """Fixed-size pool of warm grading processes"""
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_jobs_per_worker=DEFAULT_MAX_JOBS_PER_WORKER,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+                 start_method=None, preload=PRELOAD_MODULES):
+        if size < 1:
+            raise ValueError('GraderPool needs at least one worker')
+
+        if start_method is None:
+            methods = multiprocessing.get_all_start_methods()
+            start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        self._ctx = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            # Import the grading stack once in the fork server so every
+            # worker (including recycled ones) starts warm.
+            self._ctx.set_forkserver_preload(['grader'] + list(preload))
+
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.memory_limit_mb = memory_limit_mb
+        self._preload = tuple(preload)
+
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._busy = 0
+        self._jobs_total = 0
+        self._recycled = 0
+        self._timeouts = 0
+        self._memory_exceeded = 0
+        self._peak_rss_mb = 0.0
+        self._closed = False
+
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        worker = _Worker(self._ctx, self._preload, self.memory_limit_mb)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker, kill=False):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.stop(kill=kill)
+
+    def _release(self, worker, recycle=False, kill=False):
+        """Return a worker to the idle queue, replacing it if needed."""
+        if recycle or self._closed:
+            self._retire(worker, kill=kill)
+            if self._closed:
+                return
+            with self._lock:
+                self._recycled += 1
+            worker = self._spawn()
+        self._idle.put(worker)
+
+    def run(self, user_code, test_code, timeout=30, profile=None):
+        """Grade one submission on an idle worker and return its results.
+
+        `timeout` bounds both the wall-clock time and the CPU time of the
+        job; None disables both limits. Passing a `profile` dict profiles
+        the run and fills the dict as profiling.profile_run does.
+        """
+        if self._closed:
+            raise RuntimeError('GraderPool has been shut down')
+
+        worker = self._idle.get()
+        with self._lock:
+            self._busy += 1
+        try:
+            try:
+                worker.conn.send((user_code, test_code, timeout, profile is not None))
+                wait = None if timeout is None else timeout + WALL_CLOCK_GRACE_SECONDS
+                if not worker.conn.poll(wait):
+                    self._release(worker, recycle=True, kill=True)
+                    with self._lock:
+                        self._timeouts += 1
+                    return limit_exceeded_results(
+                        OUTCOME_TIMEOUT,
+                        f"Submission exceeded the {timeout}s time limit",
+                        limit_seconds=timeout
+                    )
+                reply = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join(timeout=1)
+                self._release(worker, recycle=True, kill=True)
+                return self._crash_results(worker.process.exitcode, timeout)
+
+            worker.jobs_done += 1
+            with self._lock:
+                self._peak_rss_mb = max(self._peak_rss_mb, reply.get('peak_rss_mb', 0.0))
+            if profile is None:
+                metrics.observe_grader_phases(reply.get('timings'))
+            elif reply.get('profile'):
+                # Profiled timings are inflated; keep them out of the metrics
+                profile.update(reply['profile'])
+            test_results = reply['results'].get('test_results')
+            hit_memory_limit = (
+                isinstance(test_results, dict)
+                and test_results.get('outcome') == OUTCOME_MEMORY_EXCEEDED
+            )
+            if hit_memory_limit:
+                with self._lock:
+                    self._memory_exceeded += 1
+            # A worker that ran out of memory is replaced with a clean one
+            recycle = (
+                hit_memory_limit
+                or worker.jobs_done >= self.max_jobs_per_worker
+                or reply['rss_mb'] > self.max_rss_mb
+            )
+            self._release(worker, recycle=recycle)
+            return reply['results']
+        finally:
+            with self._lock:
+                self._busy -= 1
+                self._jobs_total += 1
+
+    def _crash_results(self, exitcode, timeout):
+        """Describe a worker that died while running a job."""
+        if exitcode == -getattr(signal, 'SIGXCPU', 0):
+            with self._lock:
+                self._timeouts += 1
+            return limit_exceeded_results(
+                OUTCOME_TIMEOUT,
+                f"Submission exceeded the {timeout}s CPU time limit",
+                limit_seconds=timeout
+            )
+        if exitcode == -signal.SIGKILL:
+            # Most likely the kernel OOM killer
+            with self._lock:
+                self._memory_exceeded += 1
+            return limit_exceeded_results(
+                OUTCOME_MEMORY_EXCEEDED,
+                "Submission was killed after exhausting grader memory",
+                limit_mb=self.memory_limit_mb
+            )
+        return {
+            'passed': False,
+            'output': '',
+            'error': f"Grader worker exited unexpectedly (exit code {exitcode})",
+            'test_results': [],
+        }
+
+    def stats(self):
+        """Return a snapshot of pool utilization counters."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'busy': self._busy,
+                'idle': self._idle.qsize(),
+                'jobs_total': self._jobs_total,
+                'recycled': self._recycled,
+                'timeouts': self._timeouts,
+                'memory_exceeded': self._memory_exceeded,
+                'peak_rss_mb': round(self._peak_rss_mb, 1),
+            }
+
+    def shutdown(self):
+        """Stop all workers. Jobs already running are allowed to finish."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(worker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _preload_from_env():
+    names = os.getenv('GRADER_PRELOAD')
+    if not names:
+        return PRELOAD_MODULES
+    return tuple(n.strip() for n in names.split(',') if n.strip())
+
+
+def get_pool():
+    """Return the process-wide grader pool, creating it on first use.
+
+    Returns None when GRADER_POOL_SIZE is 0 (inline grading).
+    """
+    global _pool
+    size = int(os.getenv('GRADER_POOL_SIZE', DEFAULT_POOL_SIZE))
+    if size <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = GraderPool(
+                size=size,
+                max_jobs_per_worker=int(os.getenv('GRADER_MAX_JOBS_PER_WORKER', DEFAULT_MAX_JOBS_PER_WORKER)),
+                max_rss_mb=int(os.getenv('GRADER_MAX_RSS_MB', DEFAULT_MAX_RSS_MB)),
+                memory_limit_mb=int(os.getenv('GRADER_MEMORY_LIMIT_MB', DEFAULT_MEMORY_LIMIT_MB)),
+                start_method=os.getenv('GRADER_START_METHOD') or None,
+                preload=_preload_from_env(),
+            )
+            atexit.register(shutdown_pool)
+        return _pool
+
+
+def shutdown_pool():
+    """Shut down the process-wide grader pool if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def pool_stats():
+    """stats() of the process-wide pool, or None if it hasn't started."""
+    with _pool_lock:
+        pool = _pool
+    return pool.stats() if pool is not None else None
+
+
+def _collect_stat(field, scale=1):
+    def collect():
+        stats = pool_stats()
+        return None if stats is None else stats[field] * scale
+    return collect
+
+
+def _collect_workers():
+    stats = pool_stats()
+    if stats is None:
+        return None
+    return {('busy',): stats['busy'], ('idle',): stats['idle']}
+
+
+metrics.REGISTRY.collect('grader_pool_workers', 'Grader worker processes by state',
+                         _collect_workers, ('state',))
+metrics.REGISTRY.collect('grader_pool_size', 'Configured grader worker processes', _collect_stat('size'))
+metrics.REGISTRY.collect('grader_pool_jobs_total', 'Jobs run by the grader pool',
+                         _collect_stat('jobs_total'), type='counter')
+metrics.REGISTRY.collect('grader_pool_recycled_total', 'Grader workers replaced',
+                         _collect_stat('recycled'), type='counter')
+metrics.REGISTRY.collect('grader_pool_timeouts_total', 'Jobs stopped at their time limit',
+                         _collect_stat('timeouts'), type='counter')
+metrics.REGISTRY.collect('grader_pool_memory_exceeded_total', 'Jobs stopped at the memory limit',
+                         _collect_stat('memory_exceeded'), type='counter')
+metrics.REGISTRY.collect('grader_pool_worker_peak_rss_bytes', 'Peak resident memory of any grader worker',
+                         _collect_stat('peak_rss_mb', 1024 * 1024))
@@ -0,0 +1,114 @@
+"""
+Serialized-response cache and conditional GET support for read-mostly data
+
+Challenge content only changes when seed.py runs, so the JSON bodies of the
+challenge endpoints are serialized once and kept in memory. Each cached
+body is tagged with a content version stored in the `content_versions`
+table; seed.py (or any ORM change to a Challenge) bumps the version in the
+same transaction, and every process rebuilds its copy on the next request.
+
+Responses carry a strong ETag (the SHA-256 of the body) and
+`Cache-Control: public, no-cache`, so browsers keep the body but revalidate
+with If-None-Match and get a 304 until the content changes. Set
+CHALLENGE_CACHE_MAX_AGE (seconds) to let clients skip revalidation.
+"""
+
+import hashlib
+import os
+import threading
+
+from flask import Response, request
+from sqlalchemy import event, text
+
+from app import app, db, Challenge
+
+CHALLENGES = 'challenges'
+
+CHALLENGE_CACHE_MAX_AGE = int(os.getenv('CHALLENGE_CACHE_MAX_AGE', '0'))
+
+
+def content_version(name):
+    """Current version of a named piece of content (0 if never bumped)."""
+    version = db.session.execute(
+        text('SELECT version FROM content_versions WHERE name = :name'), {'name': name}
+    ).scalar()
+    return version or 0
+
+
+def bump_content_version(name, connection=None):
+    """Invalidate cached responses for `name` in every process.
+
+    Runs in the caller's transaction (`connection` from an ORM event, or the
+    current session), so the bump commits together with the change.
+    """
+    execute = connection.execute if connection is not None else db.session.execute
+    updated = execute(
+        text('UPDATE content_versions SET version = version + 1 WHERE name = :name'),
+        {'name': name}
+    ).rowcount
+    if not updated:
+        execute(
+            text('INSERT INTO content_versions (name, version) VALUES (:name, 1)'),
+            {'name': name}
+        )
+
+
+class ResponseCache:
+    """Serialized JSON bodies keyed by name and variant, tagged with a version"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+        return None
+
+    def put(self, key, version, body):
+        etag = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            self._entries[key] = (version, body, etag)
+        return body, etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def cached_json_response(name, variant, build, max_age=None):
+    """Return a conditional JSON response for `build()`, cached per version.
+
+    `build` returns a JSON-serializable value; it only runs when the
+    content version changed since the body was last serialized. If it
+    returns None nothing is cached and None is returned (e.g. for a 404).
+    """
+    key = (name, variant)
+    version = content_version(name)
+    cached = response_cache.get(key, version)
+    if cached is None:
+        value = build()
+        if value is None:
+            return None
+        body = app.json.dumps(value).encode('utf-8') + b'\n'
+        cached = response_cache.put(key, version, body)
+    body, etag = cached
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    max_age = CHALLENGE_CACHE_MAX_AGE if max_age is None else max_age
+    response.headers['Cache-Control'] = f'public, max-age={max_age}' if max_age else 'public, no-cache'
+    # Answers If-None-Match with an empty 304
+    return response.make_conditional(request)
+
+
+@event.listens_for(Challenge, 'after_insert')
+@event.listens_for(Challenge, 'after_update')
+@event.listens_for(Challenge, 'after_delete')
+def _challenge_changed(mapper, connection, target):
+    bump_content_version(CHALLENGES, connection=connection)
@@ -0,0 +1,79 @@
+"""
+Cached user resolution for JWT-protected endpoints
+
+flask_jwt_extended calls the `user_lookup_loader` below for every request
+with a valid token, and exposes the result as
+`flask_jwt_extended.current_user`. Users are resolved through a TTL-bounded
+LRU of lightweight, read-only records, so an authenticated request
+normally costs no query just to learn who is calling.
+
+Entries are dropped when the User row is updated or deleted through the
+ORM in this process; other processes see changes within USER_CACHE_TTL
+seconds (default 60). USER_CACHE_SIZE bounds the number of entries
+(default 4096).
+"""
+
+import os
+from collections import namedtuple
+
+from flask import jsonify
+from sqlalchemy import event
+
+from app import app, db, jwt, User
+from lru import LRUCache
+
+_cache = LRUCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', '4096')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '60'))
+)
+
+
+class UserRecord(namedtuple('UserRecord', 'id username email created_at')):
+    """Detached, immutable view of a User row"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+def load_user(user_id):
+    """UserRecord for `user_id`, or None if there is no such user."""
+    record = _cache.get(user_id)
+    if record is None:
+        row = db.session.query(User.id, User.username, User.email, User.created_at).filter(
+            User.id == user_id
+        ).first()
+        if row is None:
+            return None
+        record = UserRecord(*row)
+        _cache.set(user_id, record)
+    return record
+
+
+def forget_user(user_id):
+    _cache.pop(user_id)
+
+
+def clear():
+    _cache.clear()
+
+
+@jwt.user_lookup_loader
+def _user_lookup(jwt_header, jwt_data):
+    return load_user(int(jwt_data[app.config['JWT_IDENTITY_CLAIM']]))
+
+
+@jwt.user_lookup_error_loader
+def _user_lookup_error(jwt_header, jwt_data):
+    return jsonify({'error': 'User not found'}), 404
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    forget_user(target.id)
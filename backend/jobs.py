@@ -0,0 +1,414 @@
+"""
+In-process grading job queue
+
+Submissions can be graded in the background instead of inside the HTTP
+request. A job is created with status `queued`, moves to `running` when a
+queue thread picks it up and finishes as `done` (with the handler's result)
+or `failed` (with an error message).
+
+Jobs live in memory by default. Pass a SQLite file path to use
+SQLiteJobStore instead, so queued jobs survive a restart and are picked up
+again when the queue starts.
+
+Several processes may share one SQLiteJobStore (gunicorn workers, or a
+restarted process next to a live one), so a queue thread claims a job
+atomically before running it, and only the claimant runs it. A claim is a
+lease of GRADING_JOB_LEASE_SECONDS (default 60) that the owning queue
+renews while the job runs. A `running` job is handed back to the queue
+only once its lease has expired or its owner process has died, so jobs a
+live process is grading are never run twice.
+
+Finished jobs are kept for GRADING_JOB_TTL seconds (default 3600) so
+clients can fetch their result; the memory store also keeps at most
+GRADING_JOB_HISTORY (default 10000) of them.
+"""
+
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from lru import LRUCache
+
+JOB_LEASE_SECONDS = float(os.getenv('GRADING_JOB_LEASE_SECONDS', '60'))
+JOB_TTL_SECONDS = float(os.getenv('GRADING_JOB_TTL', '3600'))
+JOB_HISTORY_SIZE = int(os.getenv('GRADING_JOB_HISTORY', '10000'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED_STATES = (DONE, FAILED)
+
+
+def _new_owner():
+    """Identity of a queue: host, process id and a per-queue token."""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def owner_is_dead(owner):
+    """True if `owner` is a queue of a process on this host that has exited."""
+    try:
+        host, pid, _ = owner.split(':')
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname() or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class MemoryJobStore:
+    """Job records kept in memory (lost on restart)
+
+    Unfinished jobs are kept in a dict; finished ones move to an LRU bounded
+    to `max_finished` entries and `ttl` seconds.
+    """
+
+    def __init__(self, ttl=JOB_TTL_SECONDS, max_finished=JOB_HISTORY_SIZE):
+        self._jobs = {}
+        self._finished = LRUCache(max_finished, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._finished.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if job['status'] in FINISHED_STATES:
+                self._finished.set(job_id, self._jobs.pop(job_id))
+
+    def claim(self, job_id, owner, lease_until, now):
+        """Mark a queued job running for `owner`; False if it isn't queued."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != QUEUED:
+                return False
+            job.update(status=RUNNING, owner=owner, lease_until=lease_until, updated_at=now)
+            return True
+
+    def renew(self, job_id, owner, lease_until):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] == RUNNING and job.get('owner') == owner:
+                job['lease_until'] = lease_until
+
+    def requeue(self, job_id, owner, now):
+        """Put a running job held by `owner` back in the queue; False if it moved on."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != RUNNING or job.get('owner') != owner:
+                return False
+            job.update(status=QUEUED, owner=None, lease_until=None, updated_at=now)
+            return True
+
+    def prune(self, finished_before):
+        """Finished jobs expire from the LRU on their own."""
+        return 0
+
+    def unfinished(self):
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values() if j['status'] not in FINISHED_STATES]
+        return sorted(jobs, key=lambda j: j['created_at'])
+
+
+class SQLiteJobStore:
+    """Job records persisted in a standalone SQLite file"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS grading_jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' status TEXT NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                ' result TEXT,'
+                ' error TEXT,'
+                ' created_at REAL NOT NULL,'
+                ' updated_at REAL NOT NULL,'
+                ' owner TEXT,'
+                ' lease_until REAL)'
+            )
+            # Files created before jobs were leased
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(grading_jobs)')}
+            for column, type_ in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+                if column not in columns:
+                    self._conn.execute(f'ALTER TABLE grading_jobs ADD COLUMN {column} {type_}')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_grading_jobs_status ON grading_jobs (status, created_at)'
+            )
+
+    @staticmethod
+    def _row_to_job(row):
+        job_id, status, payload, result, error, created_at, updated_at, owner, lease_until = row
+        return {
+            'id': job_id,
+            'status': status,
+            'payload': json.loads(payload),
+            'result': json.loads(result) if result is not None else None,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'owner': owner,
+            'lease_until': lease_until,
+        }
+
+    def put(self, job):
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO grading_jobs (id, status, payload, result, error, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job['id'], job['status'], json.dumps(job['payload']),
+                 json.dumps(job['result']) if job['result'] is not None else None,
+                 job['error'], job['created_at'], job['updated_at'])
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, status, payload, result, error, created_at, updated_at, owner, lease_until'
+                ' FROM grading_jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id, **fields):
+        if 'result' in fields and fields['result'] is not None:
+            fields['result'] = json.dumps(fields['result'])
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE grading_jobs SET {columns} WHERE id = ?',
+                (*fields.values(), job_id)
+            )
+
+    def claim(self, job_id, owner, lease_until, now):
+        """Mark a queued job running for `owner`; False if another queue got it first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE grading_jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ?'
+                ' WHERE id = ? AND status = ?',
+                (RUNNING, owner, lease_until, now, job_id, QUEUED)
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id, owner, lease_until):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE grading_jobs SET lease_until = ? WHERE id = ? AND status = ? AND owner = ?',
+                (lease_until, job_id, RUNNING, owner)
+            )
+
+    def requeue(self, job_id, owner, now):
+        """Put a running job held by `owner` back in the queue; False if it moved on."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE grading_jobs SET status = ?, owner = NULL, lease_until = NULL, updated_at = ?'
+                ' WHERE id = ? AND status = ? AND owner IS ?',
+                (QUEUED, now, job_id, RUNNING, owner)
+            )
+        return cursor.rowcount == 1
+
+    def prune(self, finished_before):
+        """Delete jobs that finished before `finished_before`; returns how many."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM grading_jobs WHERE status IN (?, ?) AND updated_at < ?',
+                (DONE, FAILED, finished_before)
+            )
+        return cursor.rowcount
+
+    def unfinished(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, status, payload, result, error, created_at, updated_at, owner, lease_until'
+                ' FROM grading_jobs WHERE status IN (?, ?) ORDER BY created_at',
+                (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+
+class GradingQueue:
+    """Background threads that run `handler(payload)` for each submitted job"""
+
+    def __init__(self, handler, store=None, workers=2, lease_seconds=JOB_LEASE_SECONDS,
+                 ttl=JOB_TTL_SECONDS):
+        self._handler = handler
+        self._store = store if store is not None else MemoryJobStore(ttl=ttl)
+        self._workers = workers
+        self.lease_seconds = lease_seconds
+        self.ttl = ttl
+        self.owner = _new_owner()
+        self._queue = queue.Queue()
+        self._changed = threading.Condition()
+        self._threads = []
+        self._maintainer = None
+        self._running = set()
+        self._stop = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the queue threads and pick up jobs left unfinished."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stop.clear()
+
+            # Queued jobs are claimed atomically, so another live queue
+            # sharing the store can't run them too
+            for job in self._store.unfinished():
+                if job['status'] == QUEUED:
+                    self._queue.put(job['id'])
+            self.recover()
+
+            for i in range(self._workers):
+                t = threading.Thread(target=self._run, name=f'grading-queue-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+            self._maintainer = threading.Thread(target=self._maintain, name='grading-queue-lease',
+                                                daemon=True)
+            self._maintainer.start()
+
+    def recover(self):
+        """Re-enqueue running jobs whose lease expired or whose owner died.
+
+        Returns the ids of the jobs taken back.
+        """
+        now = time.time()
+        recovered = []
+        for job in self._store.unfinished():
+            if job['status'] != RUNNING:
+                continue
+            lease_until = job.get('lease_until')
+            stale = lease_until is None or lease_until < now or owner_is_dead(job.get('owner'))
+            if stale and self._store.requeue(job['id'], job.get('owner'), now):
+                recovered.append(job['id'])
+                self._queue.put(job['id'])
+        return recovered
+
+    def _maintain(self):
+        """Renew the leases of running jobs, recover stale ones, drop old results."""
+        while not self._stop.wait(self.lease_seconds / 3):
+            lease_until = time.time() + self.lease_seconds
+            with self._lock:
+                running = list(self._running)
+            for job_id in running:
+                self._store.renew(job_id, self.owner, lease_until)
+            try:
+                self.recover()
+                self._store.prune(time.time() - self.ttl)
+            except Exception:
+                traceback.print_exc()
+
+    def submit(self, payload):
+        """Enqueue a job and return its record."""
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': QUEUED,
+            'payload': payload,
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._store.put(job)
+        self._queue.put(job['id'])
+        return job
+
+    def get(self, job_id):
+        return self._store.get(job_id)
+
+    def depth(self):
+        """Number of jobs waiting for a queue thread."""
+        return self._queue.qsize()
+
+    def wait(self, job_id, since=None, timeout=None):
+        """Block until the job's `updated_at` is newer than `since`.
+
+        Returns the current job record (possibly unchanged on timeout).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._store.get(job_id)
+                if job is None or since is None or job['updated_at'] > since:
+                    return job
+                if job['status'] in FINISHED_STATES:
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+
+    def _set(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        self._store.update(job_id, **fields)
+        with self._changed:
+            self._changed.notify_all()
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            now = time.time()
+            # Only the queue whose claim succeeds runs the job
+            if not self._store.claim(job_id, self.owner, now + self.lease_seconds, now):
+                continue
+            with self._changed:
+                self._changed.notify_all()
+            job = self._store.get(job_id)
+            with self._lock:
+                self._running.add(job_id)
+            try:
+                result = self._handler(job['payload'])
+            except Exception as e:
+                traceback.print_exc()
+                self._set(job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+            else:
+                self._set(job_id, status=DONE, result=result)
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+
+    def shutdown(self):
+        """Stop the queue threads after the jobs already queued have run."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self._stop.set()
+        if self._maintainer is not None:
+            self._maintainer.join()
+            self._maintainer = None
+        self._started = False
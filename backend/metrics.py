@@ -0,0 +1,229 @@
+"""
+Process metrics in the Prometheus text format
+
+`GET /metrics` returns every metric registered here, in the text
+exposition format Prometheus scrapes; nothing else needs to run. Included:
+
+ - http_request_duration_seconds: latency histogram per endpoint (the
+   route rule, not the raw path), method and status
+ - grader_phase_duration_seconds: time spent in each grading phase (user
+   code exec, test definition, test run, result serialization), reported
+   by pool workers with every job
+ - submissions_graded_total: graded submissions per day and outcome
+   (pass, fail or error)
+ - grader pool utilization, grading queue depth, pending group-commit rows
+   and database connection pool usage, read when scraped
+
+Values are kept per process; with several server processes, scrape each
+one. This module has no Flask or database imports so the grader pool can
+record into it; `init_app` wires up the request hooks and the route.
+"""
+
+import math
+import threading
+import time
+
+# Request latency buckets (seconds)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Grader phase buckets (seconds): exact-count circuits take a millisecond,
+# sampled ones up to the submission timeout
+GRADER_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name + _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination"""
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=HTTP_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            entry = self._values.get(tuple(str(labels[n]) for n in self.labelnames))
+            return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        names = self.labelnames + ('le',)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (f'{self.name}_bucket' + _format_labels(names, key + (_format_value(float(bound)),)),
+                       cumulative)
+            yield f'{self.name}_sum' + _format_labels(self.labelnames, key), total
+            yield f'{self.name}_count' + _format_labels(self.labelnames, key), cumulative
+
+
+class Collected:
+    """Values read from a callback at scrape time
+
+    `collect()` returns a number, a dict mapping label-value tuples to
+    numbers, or None when there is nothing to report.
+    """
+
+    def __init__(self, name, help, collect, labelnames=(), type='gauge'):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+
+    def samples(self):
+        values = self._collect()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            yield self.name + _format_labels(self.labelnames, key), value
+
+
+class Registry:
+    """Named metrics rendered together by `render()`"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=HTTP_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collect(self, name, help, collect, labelnames=(), type='gauge'):
+        return self.register(Collected(name, help, collect, labelnames, type))
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # A failing collector must not break the whole scrape
+                continue
+            lines.append(f'# HELP {metric.name} {_escape(metric.help)}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(f'{sample} {_format_value(value)}' for sample, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ('method', 'endpoint', 'status')
+)
+GRADER_PHASE_SECONDS = REGISTRY.histogram(
+    'grader_phase_duration_seconds', 'Time spent in each grading phase',
+    ('phase',), buckets=GRADER_BUCKETS
+)
+SUBMISSIONS_GRADED = REGISTRY.counter(
+    'submissions_graded_total', 'Graded submissions by day and outcome',
+    ('day', 'outcome')
+)
+
+
+def observe_grader_phases(timings):
+    """Record a grading run's {phase: seconds} timings."""
+    for phase, seconds in (timings or {}).items():
+        GRADER_PHASE_SECONDS.observe(seconds, phase=phase)
+
+
+def record_grading_result(day, outcome):
+    SUBMISSIONS_GRADED.inc(day=day, outcome=outcome)
+
+
+def init_app(app):
+    """Time every request and serve GET /metrics."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # The route rule keeps the label set bounded
+            endpoint = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                         endpoint=endpoint, status=response.status_code)
+        return response
+
+    def metrics_endpoint():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
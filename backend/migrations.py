@@ -0,0 +1,202 @@
+"""
+Lightweight schema migrations.
+
+`db.create_all()` only creates missing tables; it never adds an index or a
+column to a table that already exists. Schema changes are therefore listed
+here as numbered migrations, and the ones already applied to a database are
+recorded in its `schema_migrations` table:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied / pending migrations
+
+seed.py and `python app.py` run `upgrade()` on start-up, so a deployment is
+migrated before it serves requests.
+
+Adding a migration: declare the change on the model in app.py (so new
+databases get it from the baseline) and append a function to MIGRATIONS that
+applies it to an existing database idempotently (`checkfirst=True`,
+`IF NOT EXISTS`). Never edit or reorder migrations that have shipped.
+"""
+
+import argparse
+import sys
+
+from flask import has_app_context
+from sqlalchemy import bindparam, inspect, null, select, text, update
+
+from app import app, db, Submission, Blob, ContentVersion
+
+
+def _baseline(connection):
+    """Create missing tables; a new database gets the current schema here."""
+    db.metadata.create_all(connection, checkfirst=True)
+
+
+def _create_index(connection, model, name):
+    """Create an index declared on `model` unless it already exists."""
+    index = next(ix for ix in model.__table__.indexes if ix.name == name)
+    index.create(connection, checkfirst=True)
+
+
+def _add_column(connection, table, name, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists."""
+    columns = {c['name'] for c in inspect(connection).get_columns(table)}
+    if name not in columns:
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+
+
+def _submission_indexes(connection):
+    """Indexes behind the submissions, progress and leaderboard queries."""
+    _create_index(connection, Submission, 'ix_submissions_user_passed_challenge')
+    _create_index(connection, Submission, 'ix_submissions_challenge_passed_submitted_at')
+
+
+def _backfill_leaderboard_stats(connection):
+    """Fill user_stats / first_solves for submissions made before they existed."""
+    from stats import rebuild_user_stats
+
+    rebuild_user_stats()
+    db.session.flush()
+
+
+def _submission_history_index(connection):
+    """Keyset pagination of a user's submission history."""
+    _create_index(connection, Submission, 'ix_submissions_user_submitted_at')
+
+
+def _blob_store(connection, chunk_size=500):
+    """Move submission code and test results into the blob store."""
+    import blobs
+
+    Blob.__table__.create(connection, checkfirst=True)
+    for name in ('code_sha256', 'results_sha256'):
+        _add_column(connection, 'submissions', name, 'VARCHAR(64) REFERENCES blobs (sha256)')
+
+    table = Submission.__table__
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.code, table.c.test_results)
+            .where(table.c.id > last_id, table.c.code_sha256.is_(None))
+            .order_by(table.c.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        code_digests = blobs.put_many([(r.code or '').encode('utf-8') for r in rows])
+        with_results = [r for r in rows if r.test_results is not None]
+        result_digests = dict(zip(
+            [r.id for r in with_results],
+            blobs.put_many([blobs.encode_json(r.test_results) for r in with_results])
+        ))
+        connection.execute(
+            update(table).where(table.c.id == bindparam('row_id')).values(
+                code_sha256=bindparam('code_digest'),
+                results_sha256=bindparam('results_digest'),
+                code='',
+                test_results=null()
+            ),
+            [
+                {'row_id': r.id, 'code_digest': digest, 'results_digest': result_digests.get(r.id)}
+                for r, digest in zip(rows, code_digests)
+            ]
+        )
+        last_id = rows[-1].id
+
+
+def _content_versions(connection):
+    """Version counters behind the challenge response cache."""
+    ContentVersion.__table__.create(connection, checkfirst=True)
+
+
+def _challenge_content_hash(connection):
+    """Lets seed.py skip challenges whose content has not changed."""
+    _add_column(connection, 'challenges', 'content_hash', 'VARCHAR(64)')
+
+
+# (version, migration) in the order they are applied
+MIGRATIONS = [
+    ('0001_baseline', _baseline),
+    ('0002_submission_indexes', _submission_indexes),
+    ('0003_backfill_leaderboard_stats', _backfill_leaderboard_stats),
+    ('0004_submission_history_index', _submission_history_index),
+    ('0005_blob_store', _blob_store),
+    ('0006_content_versions', _content_versions),
+    ('0007_challenge_content_hash', _challenge_content_hash),
+]
+
+
+def _ensure_version_table():
+    db.session.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        ' version VARCHAR(100) PRIMARY KEY,'
+        ' applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+    ))
+
+
+def applied_versions():
+    """Versions recorded in schema_migrations (empty for a new database)."""
+    if not inspect(db.engine).has_table('schema_migrations'):
+        return set()
+    rows = db.session.execute(text('SELECT version FROM schema_migrations'))
+    return {row[0] for row in rows}
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade(log=None):
+    """Apply pending migrations in order; returns the versions applied.
+
+    Each migration commits together with its schema_migrations row. An
+    application context is pushed if none is active.
+    """
+    if not has_app_context():
+        with app.app_context():
+            return upgrade(log)
+
+    _ensure_version_table()
+    db.session.commit()
+
+    applied = applied_versions()
+    done = []
+    for version, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        if log:
+            log(f"Applying migration {version}")
+        try:
+            migration(db.session.connection())
+            db.session.execute(
+                text('INSERT INTO schema_migrations (version) VALUES (:version)'),
+                {'version': version}
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        done.append(version)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply database schema migrations')
+    parser.add_argument('--status', action='store_true',
+                        help='list applied and pending migrations without applying them')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        if args.status:
+            applied = applied_versions()
+            for version, _ in MIGRATIONS:
+                print(f"{'applied' if version in applied else 'pending'}  {version}")
+            return 0
+
+        done = upgrade(log=print)
+        print(f"Applied {len(done)} migration(s)" if done else 'Database is up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
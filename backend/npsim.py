@@ -0,0 +1,486 @@
+"""
+Pure-NumPy statevector simulator for lightweight grading
+
+The calendar circuits use a handful of gates on one to a few qubits, yet
+grading them through qiskit and qiskit_aer costs hundreds of MB and seconds
+of import time per worker. This module implements the subset of the
+QuantumCircuit API the challenges use, plus an `AerSimulator` stand-in, on
+top of NumPy alone.
+
+Gates are applied to the state held as a rank-n tensor (one axis of size 2
+per qubit, optionally with leading batch axes) by contracting the gate's
+(2,)*2k tensor with the target axes via einsum; no 2^n x 2^n matrix is ever
+built. Measurements must come at the end of the circuit; the counts are
+derived from the exact distribution the same way as fastpath.py.
+
+Challenges opt in with a `# grader: simulator=numpy` line in their test
+code. The grader then resolves `qiskit` and `qiskit_aer` imports in the
+submission to the shim modules returned by `shim_modules()`.
+"""
+
+import types
+
+import numpy as np
+
+from fastpath import memory_distribution, outcome_counts
+
+# einsum subscripts are single letters, which bounds n + k at 52; statevectors
+# beyond this size are far outside what grading should ever allocate anyway.
+MAX_QUBITS = 24
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+_SQRT1_2 = 1 / np.sqrt(2)
+
+# Fixed gates; multi-qubit matrices are in argument order (first qubit is
+# the most significant index), which is how apply_gate lays out the tensor.
+GATES = {
+    'id': np.eye(2, dtype=complex),
+    'x': np.array([[0, 1], [1, 0]], dtype=complex),
+    'y': np.array([[0, -1j], [1j, 0]], dtype=complex),
+    'z': np.array([[1, 0], [0, -1]], dtype=complex),
+    'h': _SQRT1_2 * np.array([[1, 1], [1, -1]], dtype=complex),
+    's': np.diag([1, 1j]).astype(complex),
+    'sdg': np.diag([1, -1j]).astype(complex),
+    't': np.diag([1, np.exp(1j * np.pi / 4)]),
+    'tdg': np.diag([1, np.exp(-1j * np.pi / 4)]),
+    'sx': 0.5 * np.array([[1 + 1j, 1 - 1j], [1 - 1j, 1 + 1j]], dtype=complex),
+    'swap': np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], dtype=complex),
+}
+
+
+def _controlled(u, controls=1):
+    """Matrix of `u` controlled on `controls` leading qubits."""
+    dim = 2 ** controls * u.shape[0]
+    m = np.eye(dim, dtype=complex)
+    m[-u.shape[0]:, -u.shape[0]:] = u
+    return m
+
+
+GATES['cx'] = _controlled(GATES['x'])
+GATES['cy'] = _controlled(GATES['y'])
+GATES['cz'] = _controlled(GATES['z'])
+GATES['ch'] = _controlled(GATES['h'])
+GATES['ccx'] = _controlled(GATES['x'], controls=2)
+
+
+def _rx(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -1j * s], [-1j * s, c]], dtype=complex)
+
+
+def _ry(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -s], [s, c]], dtype=complex)
+
+
+def _rz(theta):
+    return np.diag([np.exp(-1j * theta / 2), np.exp(1j * theta / 2)])
+
+
+def _p(lam):
+    return np.diag([1, np.exp(1j * lam)])
+
+
+PARAMETRIC_GATES = {
+    'rx': _rx,
+    'ry': _ry,
+    'rz': _rz,
+    'p': _p,
+    'cp': lambda lam: _controlled(_p(lam)),
+    'crz': lambda theta: _controlled(_rz(theta)),
+}
+
+
+def apply_gate(state, matrix, qubits, num_qubits=None):
+    """Apply a k-qubit gate to `qubits` of a statevector tensor.
+
+    Args:
+        state: array of shape batch + (2,) * num_qubits, or a flat
+            statevector of length 2**num_qubits
+        matrix: 2**k x 2**k unitary in argument order
+        qubits: target qubit indices (qubit 0 is the least significant bit)
+        num_qubits: width of the register (inferred from a flat state)
+
+    Returns:
+        numpy.ndarray with the same shape as `state`
+    """
+    state = np.asarray(state, dtype=complex)
+    flat_shape = None
+    if num_qubits is None:
+        num_qubits = int(np.log2(state.shape[-1]))
+        flat_shape = state.shape
+        state = state.reshape(state.shape[:-1] + (2,) * num_qubits)
+
+    k = len(qubits)
+    gate = np.asarray(matrix, dtype=complex).reshape((2,) * (2 * k))
+    # Qubit q lives on tensor axis num_qubits-1-q so the flattened state
+    # uses Qiskit's little-endian index order.
+    state_sub = _LETTERS[:num_qubits]
+    in_sub = ''.join(state_sub[num_qubits - 1 - q] for q in qubits)
+    out_sub = _LETTERS[num_qubits:num_qubits + k]
+    result_sub = state_sub
+    for q, letter in zip(qubits, out_sub):
+        axis = num_qubits - 1 - q
+        result_sub = result_sub[:axis] + letter + result_sub[axis + 1:]
+
+    out = np.einsum(f'{out_sub}{in_sub},...{state_sub}->...{result_sub}', gate, state)
+    return out.reshape(flat_shape) if flat_shape is not None else out
+
+
+class Register:
+    """Base class of quantum and classical registers"""
+
+    prefix = 'r'
+
+    def __init__(self, size, name=None):
+        self.size = int(size)
+        self.name = name or self.prefix
+        self._bits = [self.bit_type(self, i) for i in range(self.size)]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        return self._bits[key]
+
+    def __iter__(self):
+        return iter(self._bits)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.size}, '{self.name}')"
+
+
+class Bit:
+    def __init__(self, register, index):
+        self.register = register
+        self.index = index
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.register!r}, {self.index})"
+
+
+class Qubit(Bit):
+    pass
+
+
+class Clbit(Bit):
+    pass
+
+
+class QuantumRegister(Register):
+    prefix = 'q'
+    bit_type = Qubit
+
+
+class ClassicalRegister(Register):
+    prefix = 'c'
+    bit_type = Clbit
+
+
+class Instruction:
+    """One circuit operation: gate name, parameters and bit indices"""
+
+    def __init__(self, name, qubits, clbits=(), params=()):
+        self.name = name
+        self.qubits = tuple(qubits)
+        self.clbits = tuple(clbits)
+        self.params = tuple(params)
+
+    @property
+    def operation(self):
+        # qiskit CircuitInstruction compatibility
+        return self
+
+    def __repr__(self):
+        return f"Instruction({self.name!r}, qubits={self.qubits}, clbits={self.clbits})"
+
+
+class QuantumCircuit:
+    """Subset of qiskit.QuantumCircuit backed by the NumPy simulator"""
+
+    def __init__(self, *regs, name=None):
+        self.qregs = []
+        self.cregs = []
+        self._qubits = []
+        self._clbits = []
+        self.data = []
+        self.name = name or f'circuit-{id(self)}'
+
+        if regs and all(isinstance(r, (int, np.integer)) for r in regs):
+            if len(regs) > 2:
+                raise TypeError('QuantumCircuit(num_qubits, num_clbits) takes at most two sizes')
+            regs = [QuantumRegister(regs[0], 'q')] + ([ClassicalRegister(regs[1], 'c')] if len(regs) > 1 and regs[1] else [])
+        for reg in regs:
+            self.add_register(reg)
+
+    def add_register(self, reg):
+        if isinstance(reg, QuantumRegister):
+            self.qregs.append(reg)
+            self._qubits.extend(reg)
+        elif isinstance(reg, ClassicalRegister):
+            self.cregs.append(reg)
+            self._clbits.extend(reg)
+        else:
+            raise TypeError(f'Unsupported register: {reg!r}')
+
+    @property
+    def qubits(self):
+        return list(self._qubits)
+
+    @property
+    def clbits(self):
+        return list(self._clbits)
+
+    @property
+    def num_qubits(self):
+        return len(self._qubits)
+
+    @property
+    def num_clbits(self):
+        return len(self._clbits)
+
+    def __len__(self):
+        return len(self.data)
+
+    def _indices(self, spec, bits):
+        """Resolve an int, bit, register, range or list to bit indices."""
+        if isinstance(spec, Bit):
+            return [bits.index(spec)]
+        if isinstance(spec, Register):
+            return [bits.index(b) for b in spec]
+        if isinstance(spec, (int, np.integer)):
+            if not -len(bits) <= spec < len(bits):
+                raise IndexError(f'Index {spec} out of range for {len(bits)} bits')
+            return [int(spec) % len(bits)]
+        return [i for item in spec for i in self._indices(item, bits)]
+
+    def _append(self, name, qargs, params=()):
+        resolved = [self._indices(q, self._qubits) for q in qargs]
+        # Broadcast single-qubit gates over lists of targets like Qiskit does
+        width = max(len(r) for r in resolved)
+        for i in range(width):
+            qubits = [r[i] if len(r) > 1 else r[0] for r in resolved]
+            if len(set(qubits)) != len(qubits):
+                raise ValueError(f'Duplicate qubit arguments for {name}')
+            self.data.append(Instruction(name, qubits, params=params))
+        return self
+
+    # Single-qubit gates
+    def id(self, q): return self._append('id', [q])
+    def x(self, q): return self._append('x', [q])
+    def y(self, q): return self._append('y', [q])
+    def z(self, q): return self._append('z', [q])
+    def h(self, q): return self._append('h', [q])
+    def s(self, q): return self._append('s', [q])
+    def sdg(self, q): return self._append('sdg', [q])
+    def t(self, q): return self._append('t', [q])
+    def tdg(self, q): return self._append('tdg', [q])
+    def sx(self, q): return self._append('sx', [q])
+    def rx(self, theta, q): return self._append('rx', [q], (theta,))
+    def ry(self, theta, q): return self._append('ry', [q], (theta,))
+    def rz(self, phi, q): return self._append('rz', [q], (phi,))
+    def p(self, lam, q): return self._append('p', [q], (lam,))
+
+    # Multi-qubit gates
+    def cx(self, c, t): return self._append('cx', [c, t])
+    def cy(self, c, t): return self._append('cy', [c, t])
+    def cz(self, c, t): return self._append('cz', [c, t])
+    def ch(self, c, t): return self._append('ch', [c, t])
+    def cp(self, lam, c, t): return self._append('cp', [c, t], (lam,))
+    def crz(self, theta, c, t): return self._append('crz', [c, t], (theta,))
+    def swap(self, a, b): return self._append('swap', [a, b])
+    def ccx(self, c1, c2, t): return self._append('ccx', [c1, c2, t])
+
+    cnot = cx
+    toffoli = ccx
+
+    def barrier(self, *qargs):
+        qubits = self._indices(qargs, self._qubits) if qargs else range(self.num_qubits)
+        self.data.append(Instruction('barrier', qubits))
+        return self
+
+    def measure(self, qubit, clbit):
+        qubits = self._indices(qubit, self._qubits)
+        clbits = self._indices(clbit, self._clbits)
+        if len(qubits) != len(clbits):
+            raise ValueError('measure needs as many classical bits as qubits')
+        for q, c in zip(qubits, clbits):
+            self.data.append(Instruction('measure', [q], [c]))
+        return self
+
+    def measure_all(self):
+        creg = ClassicalRegister(self.num_qubits, 'meas')
+        self.add_register(creg)
+        self.barrier()
+        return self.measure(range(self.num_qubits), creg)
+
+    def count_ops(self):
+        ops = {}
+        for inst in self.data:
+            ops[inst.name] = ops.get(inst.name, 0) + 1
+        return ops
+
+    def copy(self, name=None):
+        import copy
+        new = copy.copy(self)
+        new.qregs, new.cregs = list(self.qregs), list(self.cregs)
+        new._qubits, new._clbits = list(self._qubits), list(self._clbits)
+        new.data = list(self.data)
+        new.name = name or self.name
+        return new
+
+    def draw(self, *args, **kwargs):
+        return str(self)
+
+    def __str__(self):
+        lines = [f'{self.name}: {self.num_qubits} qubits, {self.num_clbits} clbits']
+        for inst in self.data:
+            params = f"({', '.join(f'{p:.4g}' for p in inst.params)})" if inst.params else ''
+            clbits = f' -> c{list(inst.clbits)}' if inst.clbits else ''
+            lines.append(f'  {inst.name}{params} q{list(inst.qubits)}{clbits}')
+        return '\n'.join(lines)
+
+
+def _gate_matrix(inst):
+    if inst.name in GATES:
+        return GATES[inst.name]
+    if inst.name in PARAMETRIC_GATES:
+        return PARAMETRIC_GATES[inst.name](*inst.params)
+    raise NotImplementedError(f"Gate '{inst.name}' is not supported by the NumPy simulator")
+
+
+def simulate(circuit, initial_states=None):
+    """Evolve a circuit's unitary part and return (states, clbit_sources).
+
+    `initial_states` may be a batch of flat statevectors (shape B x 2**n) that
+    are evolved together; by default the circuit starts in |0...0>. The
+    returned states are flat, with the batch axis kept when one was given.
+    `clbit_sources` maps each measured clbit to the qubit it reads.
+    """
+    n = circuit.num_qubits
+    if n > MAX_QUBITS:
+        raise MemoryError(f'{n} qubits exceeds the NumPy simulator limit of {MAX_QUBITS}')
+
+    if initial_states is None:
+        batch_shape = ()
+        state = np.zeros((2,) * n, dtype=complex)
+        state[(0,) * n] = 1
+    else:
+        initial_states = np.asarray(initial_states, dtype=complex)
+        batch_shape = initial_states.shape[:-1]
+        state = initial_states.reshape(batch_shape + (2,) * n)
+
+    measured = set()
+    clbit_sources = {}
+    for inst in circuit.data:
+        if inst.name == 'barrier':
+            continue
+        if inst.name == 'measure':
+            clbit_sources[inst.clbits[0]] = inst.qubits[0]
+            measured.add(inst.qubits[0])
+            continue
+        if measured.intersection(inst.qubits):
+            raise NotImplementedError('The NumPy simulator only supports measurements at the end of a circuit')
+        state = apply_gate(state, _gate_matrix(inst), inst.qubits, n)
+
+    return state.reshape(batch_shape + (2 ** n,)), clbit_sources
+
+
+def statevector(circuit):
+    """Final statevector of a circuit (measurements ignored)."""
+    return simulate(circuit)[0]
+
+
+def _format_counts(circuit, values, counts):
+    """Format memory values like Aer: registers joined by spaces, last first."""
+    formatted = {}
+    for value, count in zip(values, counts):
+        if not count:
+            continue
+        parts = []
+        offset = 0
+        for creg in circuit.cregs:
+            bits = (int(value) >> offset) & ((1 << creg.size) - 1)
+            parts.append(format(bits, f'0{creg.size}b'))
+            offset += creg.size
+        formatted[' '.join(reversed(parts))] = int(count)
+    return formatted
+
+
+def run_counts(circuit, shots=1024, seed=None, mode=None):
+    """Measurement counts for `shots` runs of a circuit."""
+    state, clbit_sources = simulate(circuit)
+    if not clbit_sources:
+        raise RuntimeError(f'No counts for experiment "{circuit.name}": the circuit has no measurements')
+
+    values, probabilities = memory_distribution(np.abs(state) ** 2, clbit_sources)
+    return _format_counts(circuit, values, outcome_counts(probabilities, shots, mode, seed))
+
+
+class Result:
+    def __init__(self, circuits, counts):
+        self._circuits = circuits
+        self._counts = counts
+        self.success = True
+
+    def get_counts(self, experiment=None):
+        if experiment is None:
+            return self._counts[0] if len(self._counts) == 1 else list(self._counts)
+        if isinstance(experiment, int):
+            return self._counts[experiment]
+        for i, circuit in enumerate(self._circuits):
+            if circuit is experiment or circuit.name == getattr(experiment, 'name', experiment):
+                return self._counts[i]
+        raise KeyError(f'No counts for experiment "{experiment}"')
+
+
+class Job:
+    def __init__(self, result):
+        self._result = result
+
+    def result(self, *args, **kwargs):
+        return self._result
+
+    def done(self):
+        return True
+
+
+class AerSimulator:
+    """Drop-in for qiskit_aer.AerSimulator covering run()/get_counts()"""
+
+    def __init__(self, method='statevector', **options):
+        self.method = method
+        self.options = types.SimpleNamespace(shots=1024, **options)
+
+    def run(self, circuits, shots=None, seed_simulator=None, **run_options):
+        single = not isinstance(circuits, (list, tuple))
+        circuit_list = [circuits] if single else list(circuits)
+        shots = shots or self.options.shots
+        counts = [run_counts(c, shots=shots, seed=seed_simulator) for c in circuit_list]
+        return Job(Result(circuit_list, counts))
+
+    def name(self):
+        return 'numpy_statevector'
+
+
+def transpile(circuits, *args, **kwargs):
+    """No-op: the NumPy simulator runs every supported gate directly."""
+    return circuits
+
+
+_shims = None
+
+
+def shim_modules():
+    """Stand-in `qiskit` and `qiskit_aer` modules for submissions."""
+    global _shims
+    if _shims is None:
+        qiskit = types.ModuleType('qiskit')
+        qiskit.QuantumCircuit = QuantumCircuit
+        qiskit.QuantumRegister = QuantumRegister
+        qiskit.ClassicalRegister = ClassicalRegister
+        qiskit.transpile = transpile
+        aer = types.ModuleType('qiskit_aer')
+        aer.AerSimulator = AerSimulator
+        _shims = {'qiskit': qiskit, 'qiskit_aer': aer}
+    return _shims
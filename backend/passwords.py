@@ -0,0 +1,107 @@
+"""
+Password hashing on a dedicated, bounded thread pool
+
+bcrypt is deliberately expensive. Hashing inside request threads lets a
+burst of logins (everyone arriving when a new day opens) occupy every
+worker on CPU and stall grading and challenge reads. Instead, hashes are
+computed on a small pool (bcrypt releases the GIL, so threads run in
+parallel) with a cap on the jobs running or waiting. When the cap is
+reached new requests fail fast with PasswordHasherBusy, which the app turns
+into 503 + Retry-After.
+
+Configuration (environment variables):
+ - BCRYPT_ROUNDS: work factor for new hashes (default 12). Hashes made with
+   another cost are upgraded on the user's next successful login.
+ - PASSWORD_HASH_WORKERS: hashing threads (default: half the cores, min 1)
+ - PASSWORD_HASH_MAX_PENDING: jobs running or queued before rejecting
+   (default 4 per worker)
+ - PASSWORD_HASH_RETRY_AFTER: seconds suggested to rejected clients (default 1)
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0')) or max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '0')) or PASSWORD_HASH_WORKERS * 4
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '1'))
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+
+    def __init__(self, retry_after=PASSWORD_HASH_RETRY_AFTER):
+        super().__init__('Password hashing is busy, retry shortly')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs bcrypt on `workers` threads with at most `max_pending` jobs in flight"""
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING,
+                 rounds=BCRYPT_ROUNDS):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """bcrypt hash of `password` at the configured work factor."""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def check(self, password, password_hash):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different work factor."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """The process-wide PasswordHasher, created on first use."""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def check_password(password, password_hash):
+    return get_hasher().check(password, password_hash)
+
+
+def needs_rehash(password_hash):
+    return get_hasher().needs_rehash(password_hash)
@@ -0,0 +1,116 @@
+"""
+Profiling of a single grading run
+
+When a day grades slowly, a profiled run shows whether the submission, the
+simulator or the test harness is responsible. The whole run executes under
+cProfile, with tracemalloc tracking Python allocations (NumPy arrays
+included; memory allocated inside Aer's C++ simulator is not seen). The
+run's test_results gain a `profile` section:
+
+ - hotspots: the PROFILE_TOP_N (default 20) functions with the most self
+   time, with their call count and self/cumulative seconds
+ - peak_memory_mb: tracemalloc's peak during the run
+ - seconds: wall time of the profiled run
+ - phases: seconds spent in each grading phase (see CodeGrader.run_inline)
+
+Submission code shows up as `<submission>` and test code as `<tests>`, so
+their frames are easy to tell apart from qiskit's and unittest's. The raw
+profile is also returned in pstats format (`python -m pstats`, snakeviz).
+
+Profiling slows the run down several times over, so it is opt-in: admins
+ask for it per submission, and challenge authors use
+`scripts/validate_days.py --run --profile DIR`.
+"""
+
+import cProfile
+import marshal
+import os
+import sysconfig
+import time
+import tracemalloc
+
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '20'))
+
+# Library path prefixes trimmed from hotspot labels, longest first
+_LIBRARY_PREFIXES = sorted(
+    {sysconfig.get_paths()[name] + os.sep for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')},
+    key=len, reverse=True
+)
+
+
+def _short_path(filename):
+    for prefix in _LIBRARY_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def function_label(func):
+    """Readable name of a pstats (filename, lineno, name) key."""
+    filename, lineno, name = func
+    if filename == '~':
+        # Built-in functions have no source location
+        return name
+    return f'{_short_path(filename)}:{lineno}({name})'
+
+
+def hotspots(stats, top_n=None):
+    """The `top_n` entries of a pstats dict with the most self time."""
+    if top_n is None:
+        top_n = PROFILE_TOP_N
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+    return [
+        {
+            'function': function_label(func),
+            'calls': calls,
+            'self_seconds': round(self_seconds, 6),
+            'cumulative_seconds': round(cumulative_seconds, 6),
+        }
+        for func, (_, calls, self_seconds, cumulative_seconds, _) in ranked
+    ]
+
+
+def profile_run(run, profile, phases=None, top_n=None):
+    """Call `run()`, a grading run returning results, under the profilers
+
+    The summary is attached as test_results['profile'] (test_results
+    becomes a dict holding only the profile if the tests never ran). The
+    `profile` dict receives the summary as 'summary' and the raw profile
+    in pstats format as 'pstats'. `phases` is the timings dict `run` fills.
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        results = run()
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+
+    profiler.create_stats()
+    summary = {
+        'seconds': round(seconds, 6),
+        'peak_memory_mb': round(peak / (1024 * 1024), 3),
+        'phases': {phase: round(s, 6) for phase, s in (phases or {}).items()},
+        'hotspots': hotspots(profiler.stats, top_n),
+    }
+    profile['summary'] = summary
+    profile['pstats'] = marshal.dumps(profiler.stats)
+
+    if not isinstance(results.get('test_results'), dict):
+        results['test_results'] = {}
+    results['test_results']['profile'] = summary
+    return results
+
+
+def write_pstats(profile, path):
+    """Save the raw profile of a profiled run to `path` (pstats format)."""
+    with open(path, 'wb') as f:
+        f.write(profile['pstats'])
@@ -0,0 +1,220 @@
+"""
+Regrade stored submissions against the current challenge tests.
+
+Run this after fixing a day's `test.py` and reseeding, so `Submission.passed`
+and `Submission.test_results` reflect the new tests:
+
+    python regrade.py                 # every submission
+    python regrade.py --day 3         # only Day 3
+    python regrade.py --dry-run       # report what would change
+
+Submissions are streamed out of the `submissions` table in chunks ordered by
+id. Within a chunk identical code for the same challenge is graded once, the
+distinct programs are graded in parallel on a grader worker pool (one worker
+per core by default), and the updated rows are written back with one bulk
+update per chunk.
+
+Progress is saved to a state file after every chunk; running the command
+again resumes after the last committed chunk. Use --restart to start over.
+When the run finishes the leaderboard stats (stats.py) are rebuilt.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import blobs
+from app import app, db, Challenge, Submission
+from grade_cache import cache_key
+from grader_pool import GraderPool
+from lru import LRUCache
+from stats import rebuild_user_stats
+
+DEFAULT_STATE_FILE = 'regrade_state.json'
+
+_Row = namedtuple('_Row', 'id challenge_id code passed')
+
+
+def _load_state(path, day, restart):
+    if restart or not path or not os.path.isfile(path):
+        return {'day': day, 'last_id': 0, 'processed': 0, 'changed': 0, 'graded': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('day') != day:
+        raise SystemExit(
+            f"State file {path} belongs to a run with --day {state.get('day')}; "
+            f"pass --restart to discard it"
+        )
+    return state
+
+
+def _save_state(path, state):
+    if not path:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _submission_chunks(challenge_ids, last_id, chunk_size):
+    """Yield lists of (id, challenge_id, code, passed) ordered by id."""
+    while True:
+        rows = db.session.query(
+            Submission.id, Submission.challenge_id, Submission.code_sha256,
+            Submission.legacy_code, Submission.passed
+        ).filter(
+            Submission.id > last_id,
+            Submission.challenge_id.in_(challenge_ids)
+        ).order_by(Submission.id).limit(chunk_size).all()
+        if not rows:
+            return
+        # Code comes from the blob store in one query per chunk
+        code = blobs.get_many({r.code_sha256 for r in rows if r.code_sha256})
+        yield [
+            _Row(r.id, r.challenge_id,
+                 code[r.code_sha256].decode('utf-8') if r.code_sha256 else r.legacy_code,
+                 r.passed)
+            for r in rows
+        ]
+        last_id = rows[-1].id
+
+
+def regrade(day=None, chunk_size=500, workers=None, state_file=DEFAULT_STATE_FILE,
+            restart=False, dry_run=False, timeout=30, log=print):
+    """Regrade submissions and return a summary dict.
+
+    Must be called inside an application context.
+    """
+    workers = workers or os.cpu_count() or 1
+    state = _load_state(state_file, day, restart)
+
+    query = Challenge.query
+    if day is not None:
+        query = query.filter_by(day=day)
+    tests = {c.id: c.test_code for c in query.all()}
+    if not tests:
+        log('No matching challenges found')
+        return state
+
+    total = Submission.query.filter(
+        Submission.challenge_id.in_(list(tests)),
+        Submission.id > state['last_id']
+    ).count()
+    log(f"Regrading {total} submissions with {workers} workers"
+        + (f" (resuming after id {state['last_id']})" if state['last_id'] else ''))
+
+    # Results for programs already graded in this run, shared across chunks
+    seen = LRUCache(maxsize=10000)
+    pool = GraderPool(size=workers)
+    started = time.monotonic()
+    done = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for rows in _submission_chunks(list(tests), state['last_id'], chunk_size):
+                # Dedupe identical code per challenge before grading
+                chunk_results = {}
+                pending = {}
+                for row in rows:
+                    key = cache_key(row.code, tests[row.challenge_id])
+                    if key in chunk_results or key in pending:
+                        continue
+                    previous = seen.get(key)
+                    if previous is not None:
+                        chunk_results[key] = previous
+                    else:
+                        pending[key] = executor.submit(pool.run, row.code, tests[row.challenge_id], timeout)
+
+                for key, future in pending.items():
+                    chunk_results[key] = future.result()
+                    seen.set(key, chunk_results[key])
+
+                # Each distinct result is stored once; rows reference it by digest
+                payloads = {key: blobs.encode_json(r) for key, r in chunk_results.items()}
+                digests = {key: blobs.digest(p) for key, p in payloads.items()}
+
+                updates = []
+                changed = 0
+                for row in rows:
+                    key = cache_key(row.code, tests[row.challenge_id])
+                    if chunk_results[key]['passed'] != row.passed:
+                        changed += 1
+                    updates.append({
+                        'id': row.id,
+                        'passed': chunk_results[key]['passed'],
+                        'results_sha256': digests[key],
+                        'legacy_test_results': None
+                    })
+
+                if not dry_run:
+                    blobs.put_many(list(payloads.values()))
+                    db.session.bulk_update_mappings(Submission, updates)
+                    db.session.commit()
+
+                done += len(rows)
+                state['last_id'] = rows[-1].id
+                state['processed'] += len(rows)
+                state['changed'] += changed
+                state['graded'] += len(pending)
+                if not dry_run:
+                    _save_state(state_file, state)
+
+                elapsed = time.monotonic() - started
+                rate = done / elapsed if elapsed else 0.0
+                eta = (total - done) / rate if rate else 0.0
+                log(f"  {done}/{total} submissions, {state['changed']} changed, "
+                    f"{state['graded']} graded, {rate:.1f}/s, ETA {eta:.0f}s")
+    finally:
+        pool.shutdown()
+
+    if not dry_run:
+        # `passed` changed underneath the leaderboard counters
+        rebuild_user_stats()
+        db.session.commit()
+
+    if not dry_run and state_file and os.path.isfile(state_file):
+        # Finished: the next run starts from the beginning
+        os.remove(state_file)
+
+    log(f"Done: {state['processed']} submissions regraded, {state['changed']} changed"
+        + (' (dry run, nothing written)' if dry_run else ''))
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Regrade stored submissions')
+    parser.add_argument('--day', type=int, help='only regrade this day')
+    parser.add_argument('--chunk-size', type=int, default=500,
+                        help='submissions read and written per batch (default 500)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='grader processes (default: one per core)')
+    parser.add_argument('--timeout', type=int, default=30,
+                        help='per-submission time limit in seconds (default 30)')
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE,
+                        help=f'progress file used to resume (default {DEFAULT_STATE_FILE})')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore any saved progress and start over')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='grade and report, but do not write results')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        regrade(
+            day=args.day,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            state_file=args.state_file,
+            restart=args.restart,
+            dry_run=args.dry_run,
+            timeout=args.timeout,
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,44 +2,199 @@
 API Routes for Quantum Advent Calendar
 """
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func
+from flask import Blueprint, Response, request, jsonify, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
+from sqlalchemy import or_, and_
+from datetime import datetime
+import base64
 import json
+import threading
 
 # Import models and db from app
-from app import db, User, Challenge, Submission
-from grader import CodeGrader
+from app import app, db, User, Challenge, Submission, FirstSolve, UserStats
+from grade_cache import cached_validate_solution
+from grader import CodeGrader, OUTCOME_COMPLETED
+import metrics
+import tracing
+from stats import record_submission_stats
+from write_behind import get_submission_batcher
+from http_cache import cached_json_response, CHALLENGES
+import identity  # noqa: F401  (registers the cached JWT user lookup loaders)
+import blobs
+from jobs import GradingQueue, SQLiteJobStore, FINISHED_STATES
 
 # Challenge routes
 challenge_bp = Blueprint('challenges', __name__, url_prefix='/api/challenges')
 
 @challenge_bp.route('/', methods=['GET'])
 def get_all_challenges():
-    """Get all challenges"""
-    challenges = Challenge.query.order_by(Challenge.day).all()
-    return jsonify([c.to_dict() for c in challenges]), 200
+    """Get all challenges
+    
+    `?view=summary` leaves out the description and starter code. Bodies are
+    served from the response cache with an ETag (see http_cache.py).
+    """
+    summary = request.args.get('view') == 'summary'
+    
+    def build():
+        challenges = Challenge.query.order_by(Challenge.day).all()
+        if summary:
+            return [c.to_summary_dict() for c in challenges]
+        return [c.to_dict() for c in challenges]
+    
+    return cached_json_response(CHALLENGES, 'summary' if summary else 'full', build)
 
 @challenge_bp.route('/<int:day>', methods=['GET'])
 def get_challenge(day):
     """Get specific challenge by day"""
-    challenge = Challenge.query.filter_by(day=day).first()
-    if not challenge:
+    def build():
+        challenge = Challenge.query.filter_by(day=day).first()
+        return challenge.to_dict() if challenge else None
+    
+    response = cached_json_response(CHALLENGES, ('day', day), build)
+    if response is None:
         return jsonify({'error': 'Challenge not found'}), 404
-    return jsonify(challenge.to_dict()), 200
+    return response
 
 # Submission routes
 submission_bp = Blueprint('submissions', __name__, url_prefix='/api/submissions')
 
+def _grading_outcome(passed, results):
+    """'pass', 'fail' (tests ran and failed) or 'error' (they couldn't run)"""
+    if passed:
+        return 'pass'
+    test_results = results.get('test_results')
+    if (not isinstance(test_results, dict)
+            or test_results.get('outcome', OUTCOME_COMPLETED) != OUTCOME_COMPLETED
+            or test_results.get('errors') or not test_results.get('testsRun')):
+        return 'error'
+    return 'fail'
+
+def grade_and_record(user_id, username, challenge, code, profile=False):
+    """Grade a submission, store it and return the API response body
+    
+    Identical resubmissions are answered from the grading result cache.
+    With SUBMISSION_GROUP_COMMIT on, the row is committed by the batch
+    writer; either way the id is returned once its row is committed.
+    
+    A `profile` run is a diagnostic, not an attempt: it is graded afresh,
+    its results carry the profile (see profiling.py), and nothing is
+    stored, so submission_id is None and the leaderboards are untouched.
+    """
+    if profile:
+        with tracing.timed('grade'):
+            passed, results = CodeGrader.validate_solution(code, challenge.test_code, profile=True)
+        return {
+            'submission_id': None,
+            'passed': passed,
+            'results': results,
+            'day': challenge.day,
+            'username': username,
+            'cached': False
+        }
+    
+    with tracing.timed('grade'):
+        passed, results, cached = cached_validate_solution(code, challenge.test_code)
+    metrics.record_grading_result(challenge.day, _grading_outcome(passed, results))
+    
+    batcher = get_submission_batcher()
+    if batcher is not None:
+        challenge_id, day = challenge.id, challenge.day
+        # Commit the grade cache row and return the connection to the pool
+        # before waiting, so the batch writer gets both the write lock and a
+        # connection
+        db.session.commit()
+        # Committed together with concurrent submissions (see write_behind.py)
+        submission_id = batcher.write(user_id, challenge_id, code, passed, results)
+    else:
+        # Save submission
+        submission = Submission(
+            user_id=user_id,
+            challenge_id=challenge.id,
+            code=code,
+            passed=passed,
+            test_results=results
+        )
+        db.session.add(submission)
+        # Leaderboard counters are updated in the same transaction
+        record_submission_stats(submission)
+        # Read before the commit expires them, saving two reloads
+        submission_id, day = submission.id, challenge.day
+        db.session.commit()
+    
+    return {
+        'submission_id': submission_id,
+        'passed': passed,
+        'results': results,
+        'day': day,
+        'username': username,
+        'cached': cached
+    }
+
+def _run_grading_job(payload):
+    """Grading queue handler: runs in a queue thread with its own app context"""
+    with app.app_context():
+        challenge = db.session.get(Challenge, payload['challenge_id'])
+        if not challenge:
+            raise LookupError(f"Challenge {payload['challenge_id']} no longer exists")
+        return grade_and_record(payload['user_id'], payload['username'], challenge, payload['code'],
+                                profile=payload.get('profile', False))
+
+_grading_queue = None
+_grading_queue_lock = threading.Lock()
+
+def get_grading_queue():
+    """Return the background grading queue, starting it on first use"""
+    global _grading_queue
+    with _grading_queue_lock:
+        if _grading_queue is None:
+            store_path = app.config.get('GRADING_JOB_STORE')
+            _grading_queue = GradingQueue(
+                _run_grading_job,
+                store=SQLiteJobStore(store_path) if store_path else None,
+                workers=app.config.get('GRADING_QUEUE_WORKERS', 2)
+            )
+            _grading_queue.start()
+        return _grading_queue
+
+def _grading_queue_depth():
+    queue = _grading_queue
+    return None if queue is None else queue.depth()
+
+metrics.REGISTRY.collect('grading_queue_depth', 'Async grading jobs waiting for a queue thread',
+                         _grading_queue_depth)
+
+def _wants_async(data):
+    """Async grading is on for GRADING_MODE=async or when requested per call"""
+    flag = data.get('async', request.args.get('async'))
+    if flag is None:
+        return app.config.get('GRADING_MODE') == 'async'
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+def _job_to_dict(job):
+    """Public view of a grading job (the submitted code is left out)"""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'day': job['payload']['day'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+
 @submission_bp.route('/', methods=['POST'])
 @jwt_required()
 def submit_solution():
-    """Submit and grade a solution"""
-    user_id = int(get_jwt_identity())  # Convert string identity back to int
-    user = User.query.get(user_id)
+    """Submit and grade a solution
     
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    In async mode the submission is queued and a job id is returned with
+    status 202; poll /jobs/<job_id> or stream /jobs/<job_id>/events for the
+    result. Users in ADMIN_USERNAMES may send `"profile": true` to get a
+    hotspot table and peak memory in test_results; such runs are not
+    recorded as submissions.
+    """
+    # Resolved from the token by identity.py (404 if the user is gone)
+    user = current_user
     
     data = request.get_json()
     
@@ -49,6 +204,9 @@ def submit_solution():
     
     day = data['day']
     code = data['code']
+    profile = bool(data.get('profile'))
+    if profile and user.username not in app.config['ADMIN_USERNAMES']:
+        return jsonify({'error': 'Profiling is restricted to admins'}), 403
     
     # Validate submission size (max 10MB)
     max_size_mb = 10
@@ -60,58 +218,189 @@ def submit_solution():
     if not challenge:
         return jsonify({'error': 'Challenge not found'}), 404
     
-    # Grade submission
-    passed, results = CodeGrader.validate_solution(code, challenge.test_code)
+    if _wants_async(data):
+        job = get_grading_queue().submit({
+            'user_id': user.id,
+            'username': user.username,
+            'challenge_id': challenge.id,
+            'day': challenge.day,
+            'code': code,
+            'profile': profile
+        })
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': url_for('submissions.get_job', job_id=job['id']),
+            'events_url': url_for('submissions.stream_job', job_id=job['id'])
+        }), 202
     
-    # Save submission
-    submission = Submission(
-        user_id=user.id,
-        challenge_id=challenge.id,
-        code=code,
-        passed=passed,
-        test_results=results
-    )
-    db.session.add(submission)
-    db.session.commit()
+    return jsonify(grade_and_record(user.id, user.username, challenge, code, profile=profile)), 200
+
+def _get_own_job(job_id):
+    """Look up a job belonging to the current user, or None"""
+    job = get_grading_queue().get(job_id)
+    if not job or job['payload']['user_id'] != int(get_jwt_identity()):
+        return None
+    return job
+
+@submission_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Get the status (and result, once finished) of a grading job"""
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_to_dict(job)), 200
+
+@submission_bp.route('/jobs/<job_id>/events', methods=['GET'])
+@jwt_required()
+def stream_job(job_id):
+    """Stream status changes of a grading job as server-sent events"""
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
     
-    return jsonify({
-        'submission_id': submission.id,
-        'passed': passed,
-        'results': results,
-        'day': day,
-        'username': user.username
-    }), 200
+    grading_queue = get_grading_queue()
+    
+    def events():
+        current = job
+        yield f"event: {current['status']}\ndata: {json.dumps(_job_to_dict(current))}\n\n"
+        while current['status'] not in FINISHED_STATES:
+            updated = grading_queue.wait(job_id, since=current['updated_at'], timeout=15)
+            if updated['updated_at'] == current['updated_at']:
+                # Keep idle connections open through proxies
+                yield ": keep-alive\n\n"
+                continue
+            current = updated
+            yield f"event: {current['status']}\ndata: {json.dumps(_job_to_dict(current))}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+# Columns a submission list can be projected to with ?fields=
+SUBMISSION_FIELDS = ('id', 'user_id', 'challenge_id', 'passed', 'test_results', 'submitted_at')
+# List views skip test_results unless asked for
+DEFAULT_LIST_FIELDS = ('id', 'challenge_id', 'passed', 'submitted_at')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def _encode_cursor(submitted_at, submission_id):
+    """Opaque cursor for the keyset (submitted_at, id)"""
+    raw = json.dumps([submitted_at.isoformat(), submission_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        submitted_at, submission_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(submitted_at), int(submission_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def _serialize_field(name, value):
+    if name == 'submitted_at' and value is not None:
+        return value.isoformat()
+    return value
 
 @submission_bp.route('/user/<username>', methods=['GET'])
 def get_user_submissions(username):
-    """Get all submissions for a user"""
+    """Get a page of a user's submissions, newest first
+    
+    Query parameters:
+        limit: page size (default 50, max 200)
+        cursor: `next_cursor` from the previous page
+        fields: comma-separated columns to return (default
+            id,challenge_id,passed,submitted_at; add test_results for the
+            full grading output)
+    
+    Pages are keyed on (submitted_at, id), so each page costs the same
+    however long the history is. Only the selected columns are loaded.
+    """
     user = User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    submissions = Submission.query.filter_by(user_id=user.id).all()
-    return jsonify([s.to_dict() for s in submissions]), 200
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(DEFAULT_LIST_FIELDS)
+    unknown = [f for f in fields if f not in SUBMISSION_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    # id and submitted_at are always loaded to build the next cursor;
+    # test_results is loaded by blob reference and fetched for the page at once
+    columns = list(dict.fromkeys(['id', 'submitted_at'] + fields))
+    if 'test_results' in columns:
+        columns.remove('test_results')
+        columns += ['results_sha256', 'legacy_test_results']
+    query = db.session.query(*[getattr(Submission, c) for c in columns]).filter(
+        Submission.user_id == user.id
+    )
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_at, cursor_id = _decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(or_(
+            Submission.submitted_at < cursor_at,
+            and_(Submission.submitted_at == cursor_at, Submission.id < cursor_id)
+        ))
+    
+    # One extra row tells whether there is a next page
+    rows = query.order_by(Submission.submitted_at.desc(), Submission.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    results = {}
+    if 'test_results' in fields:
+        results = blobs.get_many({r.results_sha256 for r in rows if r.results_sha256})
+    
+    def _value(row, field):
+        if field == 'test_results':
+            if row.results_sha256 is None:
+                return row.legacy_test_results
+            return json.loads(results[row.results_sha256])
+        return _serialize_field(field, getattr(row, field))
+    
+    return jsonify({
+        'submissions': [
+            {f: _value(row, f) for f in fields}
+            for row in rows
+        ],
+        'next_cursor': _encode_cursor(rows[-1].submitted_at, rows[-1].id) if has_more else None
+    }), 200
+
+@submission_bp.route('/<int:submission_id>', methods=['GET'])
+def get_submission(submission_id):
+    """Get one submission with its full test results"""
+    submission = db.session.get(Submission, submission_id)
+    if not submission:
+        return jsonify({'error': 'Submission not found'}), 404
+    return jsonify(submission.to_dict()), 200
 
 @submission_bp.route('/user/<username>/progress', methods=['GET'])
 @jwt_required()
 def get_user_progress(username):
     """Get user's progress across all days"""
     current_user_id = int(get_jwt_identity())  # Convert string identity back to int
-    current_user = User.query.get(current_user_id)
     
     # Users can only view their own progress, or admins can view others
     if current_user.id != current_user_id and username != current_user.username:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    user = User.query.filter_by(username=username).first()
+    # The caller's own record is already resolved from the token
+    user = current_user if username == current_user.username else User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Get completed challenges
-    completed = db.session.query(Submission.challenge_id).filter(
-        Submission.user_id == user.id,
-        Submission.passed == True
-    ).distinct().count()
+    # Distinct days solved, maintained by stats.record_submission_stats
+    stats = db.session.get(UserStats, user.id)
+    completed = stats.solved if stats else 0
     
     return jsonify({
         'username': username,
@@ -125,14 +414,19 @@ leaderboard_bp = Blueprint('leaderboard', __name__, url_prefix='/api/leaderboard
 
 @leaderboard_bp.route('/', methods=['GET'])
 def get_leaderboard():
-    """Get global leaderboard sorted by completed challenges"""
-    # Get top users by completed challenges
+    """Get global leaderboard sorted by completed challenges
+    
+    Reads the materialized user_stats table through its rank index; ties on
+    days solved go to whoever reached that count first.
+    """
     top_users = db.session.query(
         User.username,
-        func.count(Submission.id).label('total_submissions'),
-        func.sum(func.cast(Submission.passed, db.Integer)).label('completed')
-    ).join(Submission).group_by(User.id).order_by(
-        func.sum(func.cast(Submission.passed, db.Integer)).desc()
+        UserStats.total_submissions,
+        UserStats.solved
+    ).join(User, User.id == UserStats.user_id).order_by(
+        UserStats.solved.desc(),
+        UserStats.last_solve_at,
+        UserStats.user_id
     ).limit(100).all()
     
     leaderboard = []
@@ -148,15 +442,22 @@ def get_leaderboard():
 
 @leaderboard_bp.route('/by-day/<int:day>', methods=['GET'])
 def get_day_leaderboard(day):
-    """Get leaderboard for a specific day challenge"""
-    # Get users who completed this day, sorted by submission time
+    """Get leaderboard for a specific day challenge
+    
+    Each user appears once, at their first passing submission. Rows come
+    from first_solves in (challenge_id, solved_at) index order, so the cost
+    depends on the limit rather than on the number of submissions.
+    """
+    challenge = Challenge.query.filter_by(day=day).first()
+    if not challenge:
+        return jsonify([]), 200
+    
     top_users = db.session.query(
         User.username,
-        Submission.submitted_at
-    ).join(Submission).join(Challenge).filter(
-        Challenge.day == day,
-        Submission.passed == True
-    ).order_by(Submission.submitted_at).limit(100).all()
+        FirstSolve.solved_at
+    ).join(User, User.id == FirstSolve.user_id).filter(
+        FirstSolve.challenge_id == challenge.id
+    ).order_by(FirstSolve.solved_at, FirstSolve.id).limit(100).all()
     
     leaderboard = []
     for rank, (username, submitted_at) in enumerate(top_users, 1):
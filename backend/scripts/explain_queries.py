@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Print the query plan of the hot read paths.
+
+Run from backend/ against the database in DATABASE_URL (or the default
+SQLite file) after `python migrations.py`:
+
+    python scripts/explain_queries.py
+
+On SQLite each query is shown with its `EXPLAIN QUERY PLAN`; a line marked
+`<-- full scan` means no index serves the query. Other databases get their
+plain `EXPLAIN` output.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+
+from app import app, db, User, Challenge, Submission, FirstSolve, UserStats
+
+
+def hot_queries(user_id=1, challenge_id=1):
+    """(label, query) pairs mirroring the queries in routes.py and stats.py"""
+    return [
+        ('GET /api/submissions/user/<username>',
+         db.session.query(Submission.id, Submission.submitted_at, Submission.challenge_id, Submission.passed)
+         .filter(Submission.user_id == user_id)
+         .order_by(Submission.submitted_at.desc(), Submission.id.desc())
+         .limit(51)),
+        ('GET /api/submissions/user/<username>/progress',
+         UserStats.query.filter(UserStats.user_id == user_id)),
+        ('Days passed by a user (stats rebuild)',
+         db.session.query(Submission.challenge_id).filter(
+             Submission.user_id == user_id,
+             Submission.passed == True
+         ).distinct()),
+        ('GET /api/leaderboard/',
+         db.session.query(User.username, UserStats.total_submissions, UserStats.solved)
+         .join(User, User.id == UserStats.user_id)
+         .order_by(UserStats.solved.desc(), UserStats.last_solve_at, UserStats.user_id)
+         .limit(100)),
+        ('GET /api/leaderboard/by-day/<day>',
+         db.session.query(User.username, FirstSolve.solved_at)
+         .join(User, User.id == FirstSolve.user_id)
+         .filter(FirstSolve.challenge_id == challenge_id)
+         .order_by(FirstSolve.solved_at, FirstSolve.id)
+         .limit(100)),
+        ('Passing submissions of a challenge in time order',
+         db.session.query(Submission.user_id, Submission.submitted_at).filter(
+             Submission.challenge_id == challenge_id,
+             Submission.passed == True
+         ).order_by(Submission.submitted_at).limit(100)),
+        ('Challenge by day',
+         Challenge.query.filter_by(day=1)),
+    ]
+
+
+def explain(query):
+    """Return the plan lines for a query on the current database."""
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'sqlite':
+        rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in db.session.execute(text('EXPLAIN ' + sql)).all()]
+
+
+def _is_full_scan(line):
+    # SQLite: "SCAN submissions" vs "SCAN submissions USING INDEX ..."
+    return line.startswith('SCAN ') and 'USING' not in line
+
+
+def main():
+    full_scans = 0
+    with app.app_context():
+        print('Using database:', db.engine.url.render_as_string(hide_password=True))
+        for label, query in hot_queries():
+            print(f'\n-- {label}')
+            for line in explain(query):
+                flag = _is_full_scan(line)
+                full_scans += flag
+                print('   ' + line + ('   <-- full scan' if flag else ''))
+    print(f'\n{full_scans} full table scan(s)')
+    return 1 if full_scans else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Concurrent end-to-end load generator for the HTTP API
+
+Each virtual user registers, logs in, and then loops over a weighted mix of
+what players do: browse /api/challenges/, open a day, submit a solution
+(the day's reference solution, or a wrong one) and look at leaderboards and
+their progress. Requests are timed per endpoint; the report shows a latency
+histogram, percentiles and the error rate of each one.
+
+By default a throwaway server is started on a free local port with a
+temporary SQLite database seeded from days/, so nothing touches the
+developer database. Run from backend/:
+
+    python scripts/loadgen.py --users 20 --duration 60 --json loadgen.json
+
+Use --url to drive a server that is already running (e.g. under gunicorn)
+instead; that server must be seeded. Server settings such as BCRYPT_ROUNDS,
+GRADER_POOL_SIZE or GRADING_MODE are inherited from the environment.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DAYS_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, '..', 'days'))
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Relative weights of the actions a logged-in user takes
+ACTIONS = (
+    ('browse', 30),
+    ('open_day', 20),
+    ('submit', 15),
+    ('leaderboard', 15),
+    ('leaderboard_day', 10),
+    ('progress', 10),
+)
+
+WRONG_SOLUTION = 'def unused():\n    return None\n'
+
+_SERVER = '''
+import sys
+from seed import seed_database
+seed_database(sys.argv[2])
+from app import app
+app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True, debug=False)
+'''
+
+
+class Recorder:
+    """Thread-safe per-endpoint latencies and status codes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed):
+        with self._lock:
+            endpoints = {}
+            for endpoint in sorted(self.latencies):
+                latencies = sorted(self.latencies[endpoint])
+                statuses = dict(self.statuses[endpoint])
+                errors = sum(n for status, n in statuses.items() if not _ok(status))
+                histogram = [0] * (len(BUCKETS_MS) + 1)
+                for seconds in latencies:
+                    histogram[_bucket(seconds * 1000)] += 1
+                endpoints[endpoint] = {
+                    'requests': len(latencies),
+                    'errors': errors,
+                    'error_rate': round(errors / len(latencies), 4),
+                    'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+                    'latency_ms': {
+                        'p50': _percentile_ms(latencies, 50),
+                        'p95': _percentile_ms(latencies, 95),
+                        'p99': _percentile_ms(latencies, 99),
+                        'max': round(latencies[-1] * 1000, 1),
+                    },
+                    'histogram': [
+                        {'le_ms': bound, 'count': count}
+                        for bound, count in zip(list(BUCKETS_MS) + [None], histogram)
+                    ],
+                }
+        total = sum(e['requests'] for e in endpoints.values())
+        return {
+            'seconds': round(elapsed, 3),
+            'requests': total,
+            'requests_per_sec': round(total / elapsed, 2) if elapsed else 0.0,
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'endpoints': endpoints,
+        }
+
+
+def _ok(status):
+    return isinstance(status, int) and (200 <= status < 400)
+
+
+def _bucket(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS)
+
+
+def _percentile_ms(ordered, pct):
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[index] * 1000, 1)
+
+
+def load_solutions(days_root=DAYS_ROOT):
+    """Reference solution code keyed by day number."""
+    solutions = {}
+    for entry in sorted(os.listdir(days_root)):
+        path = os.path.join(days_root, entry, 'solution.py')
+        digits = ''.join(ch for ch in entry[3:5] if ch.isdigit())
+        if entry.lower().startswith('day') and digits and os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                solutions[int(digits)] = f.read()
+    return solutions
+
+
+class VirtualUser:
+    """One simulated player with its own connection pool and token"""
+
+    def __init__(self, base_url, recorder, index, run_id, solutions, rng, wrong_ratio=0.3, timeout=60):
+        self.api = base_url.rstrip('/') + '/api'
+        self.recorder = recorder
+        self.username = f'load_{run_id}_{index}'
+        self.solutions = solutions
+        self.days = sorted(solutions)
+        self.rng = rng
+        self.wrong_ratio = wrong_ratio
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, endpoint, method, path, **kwargs):
+        """Send a request, timing it under the `endpoint` label."""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.api + path, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        return response
+
+    def sign_up(self):
+        password = 'loadtest-password'
+        self.request('POST /api/auth/register', 'POST', '/auth/register', json={
+            'username': self.username,
+            'email': f'{self.username}@example.com',
+            'password': password,
+        })
+        response = self.request('POST /api/auth/login', 'POST', '/auth/login', json={
+            'username': self.username,
+            'password': password,
+        })
+        if response is None or response.status_code != 200:
+            return False
+        self.session.headers['Authorization'] = f"Bearer {response.json()['access_token']}"
+        return True
+
+    def browse(self):
+        self.request('GET /api/challenges/', 'GET', '/challenges/', params={'view': 'summary'})
+
+    def open_day(self):
+        self.request('GET /api/challenges/<day>', 'GET', f'/challenges/{self.rng.choice(self.days)}')
+
+    def submit(self):
+        day = self.rng.choice(self.days)
+        code = WRONG_SOLUTION if self.rng.random() < self.wrong_ratio else self.solutions[day]
+        self.request('POST /api/submissions/', 'POST', '/submissions/', json={'day': day, 'code': code})
+
+    def leaderboard(self):
+        self.request('GET /api/leaderboard/', 'GET', '/leaderboard/')
+
+    def leaderboard_day(self):
+        self.request('GET /api/leaderboard/by-day/<day>', 'GET',
+                     f'/leaderboard/by-day/{self.rng.choice(self.days)}')
+
+    def progress(self):
+        self.request('GET /api/submissions/user/<username>/progress', 'GET',
+                     f'/submissions/user/{self.username}/progress')
+
+    def run(self, deadline, max_actions=None, think_time=0.0):
+        if not self.sign_up():
+            return
+        names = [name for name, _ in ACTIONS]
+        weights = [weight for _, weight in ACTIONS]
+        done = 0
+        while time.monotonic() < deadline and (max_actions is None or done < max_actions):
+            getattr(self, self.rng.choices(names, weights)[0])()
+            done += 1
+            if think_time:
+                time.sleep(self.rng.uniform(0, 2 * think_time))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(db_path, port, days_root=DAYS_ROOT, startup_timeout=120):
+    """Seed a SQLite database at `db_path` from `days_root` and serve it on `port`."""
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+    process = subprocess.Popen([sys.executable, '-c', _SERVER, str(port), days_root], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited during startup (exit code {process.returncode})')
+        try:
+            if requests.get(url + '/api/challenges/', timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'Server did not answer within {startup_timeout}s')
+
+
+def run_load(base_url, users=10, duration=30.0, max_actions=None, think_time=0.0,
+             wrong_ratio=0.3, seed=None, solutions=None):
+    """Drive `users` virtual users against `base_url`; returns the report."""
+    solutions = solutions or load_solutions()
+    rng = random.Random(seed)
+    run_id = f'{int(time.time()) % 100000}{rng.randrange(100):02d}'
+    recorder = Recorder()
+
+    started = time.perf_counter()
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        futures = [
+            executor.submit(
+                VirtualUser(base_url, recorder, i, run_id, solutions, random.Random(rng.random()),
+                            wrong_ratio=wrong_ratio).run,
+                deadline, max_actions, think_time
+            )
+            for i in range(users)
+        ]
+        for future in futures:
+            future.result()
+    report = recorder.report(time.perf_counter() - started)
+    report['users'] = users
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['seconds']:.1f}s"
+          f" ({report['requests_per_sec']:.1f}/s) from {report['users']} users,"
+          f" {report['errors']} errors")
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats['latency_ms']
+        print(f"\n{endpoint}")
+        print(f"  {stats['requests']} requests, {stats['error_rate']:.1%} errors"
+              f" ({', '.join(f'{s}: {n}' for s, n in stats['statuses'].items())})")
+        print(f"  p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+        peak = max(bucket['count'] for bucket in stats['histogram'])
+        for bucket in stats['histogram']:
+            if bucket['count']:
+                label = f"<= {bucket['le_ms']}ms" if bucket['le_ms'] is not None else f"> {BUCKETS_MS[-1]}ms"
+                bar = '#' * max(1, round(40 * bucket['count'] / peak))
+                print(f"  {label:>11} {bucket['count']:>7} {bar}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the HTTP API with concurrent users')
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users (default 10)')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run (default 30)')
+    parser.add_argument('--actions', type=int, default=None,
+                        help='stop each user after this many actions')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='mean pause between a user\'s actions in seconds')
+    parser.add_argument('--wrong-ratio', type=float, default=0.3,
+                        help='share of submissions that fail their tests (default 0.3)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for the action mix')
+    parser.add_argument('--url', help='target a running server instead of starting one')
+    parser.add_argument('--json', help='write the report as JSON')
+    args = parser.parse_args(argv)
+
+    server = None
+    tmpdir = None
+    url = args.url
+    try:
+        if url is None:
+            tmpdir = tempfile.TemporaryDirectory(prefix='loadgen-')
+            server, url = start_local_server(os.path.join(tmpdir.name, 'loadgen.db'), _free_port())
+            print(f"Started a local server at {url}")
+        report = run_load(url, users=args.users, duration=args.duration, max_actions=args.actions,
+                          think_time=args.think_time, wrong_ratio=args.wrong_ratio, seed=args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
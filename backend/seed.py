@@ -6,9 +6,15 @@ This script discovers each `days/dayNN_*` folder and reads:
  - `starter_code.py` or `solution.py` -> starter_code
  - `test.py` -> test_code
 
-It then clears and populates the `challenges` table.
+It then brings the `challenges` table in line with the folders, matching
+rows by day. Each challenge carries a hash of its content: unchanged days
+are skipped, changed days are updated in place (so challenge ids, and the
+submissions pointing at them, stay valid) and new days are inserted, all in
+one transaction. Days whose folder has gone are reported but kept, since
+submissions may still reference them.
 """
 
+import hashlib
 import os
 import re
 import json
@@ -18,6 +24,92 @@ except Exception:
     yaml = None
 
 from app import app, db, Challenge
+from grade_cache import grade_cache
+from migrations import upgrade
+
+# Challenge columns populated from the day folders
+CHALLENGE_FIELDS = ('day', 'title', 'description', 'starter_code', 'test_code', 'difficulty', 'tags')
+
+
+def content_hash(challenge):
+    """SHA-256 over the seeded fields of a discovered challenge."""
+    payload = json.dumps({f: challenge[f] for f in CHALLENGE_FIELDS}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+DEFAULT_DAYS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), 'days'))
+
+
+def read_challenge(entry_path):
+    """Parse one `dayNN_*` folder into a dict matching the Challenge model
+    fields, or None if it is not a challenge folder.
+    """
+    if not os.path.isdir(entry_path):
+        return None
+
+    m = re.match(r'day(\d+)_?(.*)', os.path.basename(os.path.normpath(entry_path)), re.IGNORECASE)
+    if not m:
+        return None
+
+    day_num = int(m.group(1))
+
+    desc_path = os.path.join(entry_path, 'challenge.md')
+    if not os.path.isfile(desc_path):
+        # skip folders without a challenge.md
+        return None
+
+    with open(desc_path, 'r', encoding='utf-8') as f:
+        description = f.read().strip()
+
+    # Title: first Markdown H1 or fallback
+    title = None
+    for line in description.splitlines():
+        line = line.strip()
+        if line.startswith('# '):
+            title = line.lstrip('# ').strip()
+            break
+    if not title:
+        title = f"Day {day_num}"
+
+    # Read optional metadata from meta.yaml (title, difficulty, tags)
+    meta = {}
+    meta_path = os.path.join(entry_path, 'meta.yaml')
+    if os.path.isfile(meta_path) and yaml is not None:
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as mf:
+                meta = yaml.safe_load(mf) or {}
+        except Exception:
+            # ignore metadata parsing errors and carry on
+            meta = {}
+
+    # Starter code
+    starter_code = ''
+    for fname in ('starter_code.py', 'solution.py'):
+        p = os.path.join(entry_path, fname)
+        if os.path.isfile(p):
+            with open(p, 'r', encoding='utf-8') as f:
+                starter_code = f.read()
+            break
+
+    # Test code
+    test_code = ''
+    test_path = os.path.join(entry_path, 'test.py')
+    if os.path.isfile(test_path):
+        with open(test_path, 'r', encoding='utf-8') as f:
+            test_code = f.read()
+
+    # Use tags provided in meta.yaml when present; default to empty list
+    challenge = {
+        'day': day_num,
+        'title': meta.get('title') or title,
+        'description': description,
+        'starter_code': starter_code or meta.get('starter_code') or '"""Starter code not provided."""',
+        'test_code': test_code or '',
+        'difficulty': int(meta.get('difficulty', 1)),
+        'tags': meta.get('tags', []),
+    }
+    challenge['content_hash'] = content_hash(challenge)
+    return challenge
 
 
 def discover_challenges(days_root=None):
@@ -27,7 +119,7 @@ def discover_challenges(days_root=None):
     """
     if days_root is None:
         # In the container the backend code is mounted to /app, and days live at /app/days
-        days_root = os.path.abspath(os.path.join(os.path.dirname(__file__), 'days'))
+        days_root = DEFAULT_DAYS_ROOT
 
     challenges = []
     if not os.path.isdir(days_root):
@@ -35,91 +127,61 @@ def discover_challenges(days_root=None):
         return challenges
 
     for entry in sorted(os.listdir(days_root)):
-        entry_path = os.path.join(days_root, entry)
-        if not os.path.isdir(entry_path):
-            continue
-
-        m = re.match(r'day(\d+)_?(.*)', entry, re.IGNORECASE)
-        if not m:
-            continue
-
-        day_num = int(m.group(1))
-
-        desc_path = os.path.join(entry_path, 'challenge.md')
-        if not os.path.isfile(desc_path):
-            # skip folders without a challenge.md
-            continue
-
-        with open(desc_path, 'r', encoding='utf-8') as f:
-            description = f.read().strip()
-
-        # Title: first Markdown H1 or fallback
-        title = None
-        for line in description.splitlines():
-            line = line.strip()
-            if line.startswith('# '):
-                title = line.lstrip('# ').strip()
-                break
-        if not title:
-            title = f"Day {day_num}"
-
-        # Read optional metadata from meta.yaml (title, difficulty, tags)
-        meta = {}
-        meta_path = os.path.join(entry_path, 'meta.yaml')
-        if os.path.isfile(meta_path) and yaml is not None:
-            try:
-                with open(meta_path, 'r', encoding='utf-8') as mf:
-                    meta = yaml.safe_load(mf) or {}
-            except Exception:
-                # ignore metadata parsing errors and continue
-                meta = {}
-
-        # Starter code
-        starter_code = ''
-        for fname in ('starter_code.py', 'solution.py'):
-            p = os.path.join(entry_path, fname)
-            if os.path.isfile(p):
-                with open(p, 'r', encoding='utf-8') as f:
-                    starter_code = f.read()
-                break
-
-        # Test code
-        test_code = ''
-        test_path = os.path.join(entry_path, 'test.py')
-        if os.path.isfile(test_path):
-            with open(test_path, 'r', encoding='utf-8') as f:
-                test_code = f.read()
-
-        # Use tags provided in meta.yaml when present; default to empty list
-        challenge = {
-            'day': day_num,
-            'title': meta.get('title') or title,
-            'description': description,
-            'starter_code': starter_code or meta.get('starter_code') or '"""Starter code not provided."""',
-            'test_code': test_code or '',
-            'difficulty': int(meta.get('difficulty', 1)),
-            'tags': meta.get('tags', []),
-        }
-
-        challenges.append(challenge)
+        challenge = read_challenge(os.path.join(days_root, entry))
+        if challenge is not None:
+            challenges.append(challenge)
 
     return challenges
 
 
-def seed_database():
-    with app.app_context():
-        db.create_all()
-
-        # Clear existing challenges
-        Challenge.query.delete()
+def sync_challenges(challenges, partial=False):
+    """Upsert discovered challenges by day; the caller commits.
 
-        challenges = discover_challenges()
-        for c in challenges:
-            challenge = Challenge(**c)
-            db.session.add(challenge)
+    Returns a report dict with the days that were added, updated, left
+    unchanged, or are in the database but no longer on disk. Pass
+    `partial=True` when `challenges` is only some of the days/ folders;
+    nothing is reported missing then.
+    """
+    existing = {c.day: c for c in Challenge.query.all()}
+    report = {'added': [], 'updated': [], 'unchanged': [], 'missing': []}
+
+    for c in challenges:
+        challenge = existing.pop(c['day'], None)
+        if challenge is None:
+            db.session.add(Challenge(**c))
+            report['added'].append(c['day'])
+        elif challenge.content_hash == c['content_hash']:
+            report['unchanged'].append(c['day'])
+        else:
+            for field, value in c.items():
+                setattr(challenge, field, value)
+            report['updated'].append(c['day'])
+
+    if not partial:
+        report['missing'] = sorted(existing)
+
+    if report['added'] or report['updated']:
+        # Cached grading results for tests that changed are no longer useful.
+        # Inserting or updating a Challenge also bumps the content version
+        # behind the cached challenge responses (see http_cache.py).
+        grade_cache.prune([c['test_code'] for c in challenges] +
+                          [c.test_code for c in existing.values()])
+    return report
+
+
+def seed_database(days_root=None):
+    with app.app_context():
+        upgrade()
 
+        report = sync_challenges(discover_challenges(days_root))
         db.session.commit()
-        print(f"Seeded {len(challenges)} challenges from {os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'days'))}")
+
+        for label in ('added', 'updated', 'missing'):
+            if report[label]:
+                print(f"{label.capitalize()}: days {', '.join(str(d) for d in report[label])}")
+        print(f"Seed complete: {len(report['added'])} added, {len(report['updated'])} updated, "
+              f"{len(report['unchanged'])} unchanged, {len(report['missing'])} missing from disk")
+        return report
 
 
 if __name__ == '__main__':
@@ -0,0 +1,155 @@
+"""
+Materialized per-user leaderboard statistics.
+
+The `first_solves` table records, once, when each user first passed each
+challenge; the per-day leaderboard reads it in index order. The `user_stats`
+table holds, for every user with at least one submission, the number of
+distinct days solved, the total number of submissions and when days were
+first solved. `record_submission_stats` updates both in the same
+transaction that inserts a Submission, so neither leaderboard has to
+aggregate the submissions table.
+
+If the tables drift (for example after regrade.py rewrites `passed`), or
+after upgrading a database that already has submissions, rebuild them from
+the submissions table:
+
+    python stats.py
+"""
+
+from datetime import datetime
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import app, db, Submission, FirstSolve, UserStats
+
+
+def _record_first_solve(submission):
+    """Insert the first-solve row for a passing submission.
+
+    Returns False if the user had already solved this challenge.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(FirstSolve(
+                user_id=submission.user_id,
+                challenge_id=submission.challenge_id,
+                submission_id=submission.id,
+                solved_at=submission.submitted_at
+            ))
+    except IntegrityError:
+        return False
+    return True
+
+
+def record_submission_stats(submission):
+    """Update first_solves and user_stats for a submission added to the
+    current session.
+
+    The caller commits; the submission and the counters are written in the
+    same transaction. Returns True if the submission solved a new day.
+    Solve times are the submission's submitted_at, as in
+    `rebuild_user_stats`, so a rebuild reproduces them exactly.
+    """
+    if submission.submitted_at is None:
+        # Stamped here rather than by the column default so it is known
+        # without reading the row back
+        submission.submitted_at = datetime.utcnow()
+    db.session.flush()
+    newly_solved = bool(submission.passed) and _record_first_solve(submission)
+
+    values = {UserStats.total_submissions: UserStats.total_submissions + 1}
+    if newly_solved:
+        solved_at = submission.submitted_at
+        values[UserStats.solved] = UserStats.solved + 1
+        # min/max, as in the rebuild, whatever order concurrent commits land in
+        values[UserStats.first_solve_at] = case(
+            (or_(UserStats.first_solve_at.is_(None), UserStats.first_solve_at > solved_at), solved_at),
+            else_=UserStats.first_solve_at
+        )
+        values[UserStats.last_solve_at] = case(
+            (or_(UserStats.last_solve_at.is_(None), UserStats.last_solve_at < solved_at), solved_at),
+            else_=UserStats.last_solve_at
+        )
+
+    # Counters are incremented in SQL so concurrent submissions can't lose updates
+    updated = db.session.query(UserStats).filter(
+        UserStats.user_id == submission.user_id
+    ).update(values, synchronize_session=False)
+    if updated:
+        return newly_solved
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(UserStats(
+                user_id=submission.user_id,
+                solved=1 if newly_solved else 0,
+                total_submissions=1,
+                first_solve_at=submission.submitted_at if newly_solved else None,
+                last_solve_at=submission.submitted_at if newly_solved else None
+            ))
+    except IntegrityError:
+        # Another transaction created the row first; increment it instead
+        db.session.query(UserStats).filter(
+            UserStats.user_id == submission.user_id
+        ).update(values, synchronize_session=False)
+    return newly_solved
+
+
+def rebuild_user_stats():
+    """Recompute first_solves and user_stats from the submissions table.
+
+    Returns the number of users with stats; the caller commits.
+    """
+    first_ids = db.session.query(
+        func.min(Submission.id)
+    ).filter(Submission.passed == True).group_by(
+        Submission.user_id, Submission.challenge_id
+    )
+    first_solves = db.session.query(
+        Submission.user_id, Submission.challenge_id, Submission.id, Submission.submitted_at
+    ).filter(Submission.id.in_(first_ids)).order_by(Submission.id).all()
+
+    db.session.query(FirstSolve).delete()
+    db.session.bulk_insert_mappings(FirstSolve, [
+        {
+            'user_id': user_id,
+            'challenge_id': challenge_id,
+            'submission_id': submission_id,
+            'solved_at': submitted_at,
+        }
+        for user_id, challenge_id, submission_id, submitted_at in first_solves
+    ])
+
+    solved = {
+        user_id: (count, first, last)
+        for user_id, count, first, last in db.session.query(
+            FirstSolve.user_id,
+            func.count(),
+            func.min(FirstSolve.solved_at),
+            func.max(FirstSolve.solved_at)
+        ).group_by(FirstSolve.user_id)
+    }
+    totals = db.session.query(
+        Submission.user_id, func.count(Submission.id)
+    ).group_by(Submission.user_id).all()
+
+    db.session.query(UserStats).delete()
+    db.session.bulk_insert_mappings(UserStats, [
+        {
+            'user_id': user_id,
+            'total_submissions': total,
+            'solved': solved.get(user_id, (0, None, None))[0],
+            'first_solve_at': solved.get(user_id, (0, None, None))[1],
+            'last_solve_at': solved.get(user_id, (0, None, None))[2],
+        }
+        for user_id, total in totals
+    ])
+    return len(totals)
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        count = rebuild_user_stats()
+        db.session.commit()
+        print(f"Rebuilt leaderboard stats for {count} users")
@@ -7,6 +7,8 @@ autouse fixture that creates and drops the schema around each test.
 
 import sys
 import os
+from contextlib import contextmanager
+
 import pytest
 
 # Add backend directory to path so imports work
@@ -15,6 +17,10 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 # Ensure tests use an ephemeral in-memory database. This must be set before
 # importing the Flask app so SQLAlchemy binds to the in-memory URL.
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+# Minimum bcrypt cost keeps password hashing fast in tests
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
+from sqlalchemy import event
 
 from app import app, db
 
@@ -27,3 +33,53 @@ def session_db():
 		yield
 		db.session.remove()
 		db.drop_all()
+	# User ids are reused by the next test's database
+	import identity
+	identity.clear()
+
+
+@pytest.fixture
+def client():
+	"""Flask test client bound to the ephemeral database."""
+	app.config['TESTING'] = True
+	return app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+	"""Create a user and return Authorization headers carrying their token."""
+	from flask_jwt_extended import create_access_token
+	from app import User
+
+	user = User(username='alice', email='alice@example.com')
+	user.set_password('quantum123456')
+	db.session.add(user)
+	db.session.commit()
+	token = create_access_token(identity=str(user.id))
+	return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def max_queries():
+	"""Context manager that fails the test if its block runs more than
+	`limit` SQL statements, to catch N+1 regressions:
+
+	    with max_queries(3):
+	        client.get('/api/leaderboard/')
+	"""
+	@contextmanager
+	def check(limit):
+		statements = []
+
+		def count(conn, cursor, statement, parameters, context, executemany):
+			statements.append(statement)
+
+		event.listen(db.engine, 'before_cursor_execute', count)
+		try:
+			yield statements
+		finally:
+			event.remove(db.engine, 'before_cursor_execute', count)
+		assert len(statements) <= limit, (
+			f"{len(statements)} SQL statements, expected at most {limit}:\n" + "\n".join(statements)
+		)
+	return check
@@ -0,0 +1,204 @@
+"""
+Tests for asynchronous grading through the in-process job queue.
+"""
+import threading
+import time
+
+from app import db, Challenge, User
+from jobs import GradingQueue, MemoryJobStore, SQLiteJobStore, QUEUED, RUNNING, DONE, FAILED
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+SOLUTION = '''
+def answer():
+    return 42
+'''
+
+
+def _add_challenge():
+    challenge = Challenge(day=1, title='Day 1', description='# Day 1',
+                          starter_code='', test_code=TEST_CODE)
+    db.session.add(challenge)
+    db.session.commit()
+    return challenge
+
+
+def _wait_finished(queue, job, timeout=5):
+    finished = queue.wait(job['id'], since=job['updated_at'], timeout=timeout)
+    while finished['status'] not in (DONE, FAILED):
+        finished = queue.wait(job['id'], since=finished['updated_at'], timeout=timeout)
+    return finished
+
+
+def _poll(client, url, headers, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(url, headers=headers).get_json()
+        if body['status'] in (DONE, FAILED):
+            return body
+        time.sleep(0.05)
+    raise AssertionError('job did not finish in time')
+
+
+class TestAsyncSubmission:
+    """Test suite for POST /api/submissions/ in async mode"""
+
+    def test_submit_returns_job_and_result_is_polled(self, client, auth_headers):
+        """Async submissions return 202 with a job id; the status endpoint has the result"""
+        _add_challenge()
+
+        response = client.post('/api/submissions/?async=1', headers=auth_headers,
+                               json={'day': 1, 'code': SOLUTION})
+        assert response.status_code == 202
+        body = response.get_json()
+        assert body['status'] == QUEUED
+
+        job = _poll(client, body['status_url'], auth_headers)
+        assert job['status'] == DONE
+        assert job['result']['passed'] is True
+        assert job['result']['submission_id'] is not None
+
+    def test_job_not_visible_to_other_users(self, client, auth_headers):
+        """Only the submitting user can read a job"""
+        from flask_jwt_extended import create_access_token
+
+        _add_challenge()
+        bob = User(username='bob', email='bob@example.com')
+        bob.set_password('quantum123456')
+        db.session.add(bob)
+        db.session.commit()
+        body = client.post('/api/submissions/', headers=auth_headers,
+                           json={'day': 1, 'code': SOLUTION, 'async': True}).get_json()
+
+        other = {'Authorization': f'Bearer {create_access_token(identity=str(bob.id))}'}
+        response = client.get(body['status_url'], headers=other)
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'Job not found'}
+        assert client.get('/api/auth/me', headers=other).status_code == 200
+        # Let the job finish before the test database is dropped
+        _poll(client, body['status_url'], auth_headers)
+
+
+class TestSQLiteJobStore:
+    """Test suite for the restart-safe job store"""
+
+    def test_unfinished_jobs_resume_after_restart(self, tmp_path):
+        """Jobs left queued in the store are run when a new queue starts"""
+        path = str(tmp_path / 'jobs.db')
+
+        # Never started, so the job stays queued in the store
+        first = GradingQueue(lambda payload: payload, store=SQLiteJobStore(path))
+        job = first.submit({'value': 1})
+
+        second = GradingQueue(lambda payload: {'doubled': payload['value'] * 2},
+                              store=SQLiteJobStore(path))
+        second.start()
+        finished = _wait_finished(second, job)
+        second.shutdown()
+
+        assert finished['status'] == DONE
+        assert finished['result'] == {'doubled': 2}
+
+    def test_job_is_claimed_once(self, tmp_path):
+        """Two stores on one file can't both claim a queued job"""
+        path = str(tmp_path / 'jobs.db')
+        job = GradingQueue(lambda payload: payload, store=SQLiteJobStore(path)).submit({})
+        first, second = SQLiteJobStore(path), SQLiteJobStore(path)
+
+        assert first.claim(job['id'], 'a', time.time() + 60, time.time()) is True
+        assert second.claim(job['id'], 'b', time.time() + 60, time.time()) is False
+        assert second.get(job['id'])['owner'] == 'a'
+
+    def test_queues_sharing_a_store_run_each_job_once(self, tmp_path):
+        """Jobs picked up by several queues at start are handled exactly once"""
+        path = str(tmp_path / 'jobs.db')
+        producer = GradingQueue(lambda payload: payload, store=SQLiteJobStore(path))
+        jobs = [producer.submit({'n': n}) for n in range(20)]
+        handled = []
+        lock = threading.Lock()
+
+        def handler(payload):
+            with lock:
+                handled.append(payload['n'])
+            return payload
+
+        queues = [GradingQueue(handler, store=SQLiteJobStore(path), workers=2) for _ in range(3)]
+        for q in queues:
+            q.start()
+        for job in jobs:
+            assert _wait_finished(queues[0], job)['status'] == DONE
+        for q in queues:
+            q.shutdown()
+
+        assert sorted(handled) == list(range(20))
+
+    def test_running_job_with_live_lease_is_left_alone(self, tmp_path):
+        """A restart doesn't take over a job another process is running"""
+        path = str(tmp_path / 'jobs.db')
+        store = SQLiteJobStore(path)
+        job = GradingQueue(lambda payload: payload, store=store).submit({})
+        store.claim(job['id'], 'otherhost:1:live', time.time() + 60, time.time())
+        handled = []
+
+        restarted = GradingQueue(handled.append, store=SQLiteJobStore(path))
+        restarted.start()
+        restarted.shutdown()
+
+        assert handled == []
+        assert store.get(job['id'])['status'] == RUNNING
+
+    def test_running_job_with_expired_lease_is_recovered(self, tmp_path):
+        """A job whose owner stopped renewing its lease is run again"""
+        path = str(tmp_path / 'jobs.db')
+        store = SQLiteJobStore(path)
+        job = GradingQueue(lambda payload: payload, store=store).submit({'value': 1})
+        store.claim(job['id'], 'otherhost:1:gone', time.time() - 1, time.time() - 61)
+
+        restarted = GradingQueue(lambda payload: {'ok': True}, store=SQLiteJobStore(path))
+        restarted.start()
+        finished = _wait_finished(restarted, store.get(job['id']))
+        restarted.shutdown()
+
+        assert finished['result'] == {'ok': True}
+
+    def test_old_finished_jobs_are_pruned(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / 'jobs.db'))
+        queue = GradingQueue(lambda payload: payload, store=store)
+        old, recent, pending = (queue.submit({}) for _ in range(3))
+        store.update(old['id'], status=DONE, updated_at=100.0)
+        store.update(recent['id'], status=FAILED, updated_at=300.0)
+
+        assert store.prune(200.0) == 1
+        assert store.get(old['id']) is None
+        assert store.get(recent['id'])['status'] == FAILED
+        assert store.get(pending['id'])['status'] == QUEUED
+
+
+class TestMemoryJobStore:
+    """Test suite for the default in-memory job store"""
+
+    def test_finished_jobs_are_bounded(self):
+        store = MemoryJobStore(max_finished=2)
+        queue = GradingQueue(lambda payload: payload, store=store)
+        jobs = [queue.submit({'n': n}) for n in range(4)]
+        for job in jobs[:3]:
+            store.update(job['id'], status=DONE, result={'big': 'x' * 100})
+
+        assert store.get(jobs[0]['id']) is None
+        assert store.get(jobs[2]['id'])['status'] == DONE
+        assert store.get(jobs[3]['id'])['status'] == QUEUED
+
+    def test_finished_jobs_expire(self, monkeypatch):
+        store = MemoryJobStore(ttl=10)
+        job = GradingQueue(lambda payload: payload, store=store).submit({})
+        store.update(job['id'], status=DONE, result={})
+        later = time.monotonic() + 11
+        monkeypatch.setattr(time, 'monotonic', lambda: later)
+
+        assert store.get(job['id']) is None
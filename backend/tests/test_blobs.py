@@ -0,0 +1,41 @@
+"""
+Tests for the content-addressed blob store.
+"""
+import blobs
+from app import db, User, Challenge, Submission, Blob
+
+
+class TestBlobStore:
+    """Test suite for blobs.py"""
+
+    def test_roundtrip_and_dedupe(self):
+        """Equal payloads are stored once and read back unchanged"""
+        payload = ('from qiskit import QuantumCircuit\n' * 200).encode('utf-8')
+        first, second = blobs.put_many([payload, payload])
+        assert first == second == blobs.digest(payload)
+        assert blobs.put(payload) == first
+        assert Blob.query.count() == 1
+
+        stored = db.session.get(Blob, first)
+        assert stored.codec == blobs.CODEC_ZLIB
+        assert len(stored.data) < len(payload)
+        assert blobs.get(first) == payload
+
+    def test_json_is_canonical(self):
+        assert blobs.put_json({'a': 1, 'b': 2}) == blobs.put_json({'b': 2, 'a': 1})
+
+    def test_submission_reads_and_writes_through_store(self):
+        """Submission.code / test_results are transparent"""
+        user = User(username='alice', email='alice@example.com', password_hash='x')
+        challenge = Challenge(day=1, title='Day 1', description='', starter_code='', test_code='')
+        db.session.add_all([user, challenge])
+        db.session.flush()
+        for _ in range(2):
+            db.session.add(Submission(user_id=user.id, challenge_id=challenge.id, code='x = 1',
+                                      passed=True, test_results={'testsRun': 1}))
+        db.session.commit()
+
+        submissions = Submission.query.all()
+        assert [s.code for s in submissions] == ['x = 1', 'x = 1']
+        assert submissions[0].to_dict()['test_results'] == {'testsRun': 1}
+        assert Blob.query.count() == 2
@@ -0,0 +1,67 @@
+"""
+Tests for the database engine profile (db_profile.py).
+"""
+from sqlalchemy import create_engine, text
+
+import db_profile
+
+
+def _file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    db_profile.configure_engine(engine)
+    return engine
+
+
+def test_server_databases_get_a_sized_pre_pinged_pool():
+    options = db_profile.engine_options('postgresql://user:pw@db/quantum')
+
+    assert options['pool_pre_ping'] is True
+    assert options['pool_size'] == db_profile.DB_POOL_SIZE
+    assert options['max_overflow'] == db_profile.DB_MAX_OVERFLOW
+
+
+def test_sqlite_has_no_pool_options():
+    assert db_profile.engine_options('sqlite:///quantum_advent.db') == {}
+    assert db_profile.engine_options('sqlite:///:memory:') == {}
+
+
+def test_sqlite_connections_are_tuned(tmp_path):
+    engine = _file_engine(tmp_path)
+
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        # NORMAL
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == db_profile.DB_BUSY_TIMEOUT_MS
+
+
+def test_readers_are_not_blocked_by_an_open_write(tmp_path):
+    engine = _file_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE t (x INTEGER)'))
+        conn.execute(text('INSERT INTO t VALUES (1)'))
+
+    with engine.connect() as writer, engine.connect() as reader:
+        writer.begin()
+        writer.execute(text('INSERT INTO t VALUES (2)'))
+
+        # The uncommitted row is invisible, but the read does not wait
+        assert reader.execute(text('SELECT count(*) FROM t')).scalar() == 1
+        writer.commit()
+
+
+def test_pool_stats(tmp_path):
+    engine = _file_engine(tmp_path)
+
+    with engine.connect():
+        stats = db_profile.pool_stats(engine)
+
+    assert stats['dialect'] == 'sqlite'
+    assert stats['checkedout'] == 1
+
+
+def test_health_reports_pool(client):
+    response = client.get('/health')
+
+    assert response.status_code == 200
+    assert response.get_json()['database']['dialect'] == 'sqlite'
@@ -0,0 +1,80 @@
+"""
+Tests for the exact-probability AerSimulator fast path.
+"""
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit_aer import AerSimulator
+
+import fastpath
+
+
+def _hadamard():
+    qc = QuantumCircuit(1, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    return qc
+
+
+class TestFastPath:
+    """Test suite for fastpath.enabled()"""
+
+    def test_exact_counts_for_hadamard(self):
+        """A Hadamard circuit yields an exact 50/50 split"""
+        with fastpath.enabled(max_qubits=5, mode='exact'):
+            counts = AerSimulator().run(_hadamard(), shots=1000).result().get_counts()
+
+        assert counts == {'0': 500, '1': 500}
+
+    def test_counts_format_matches_aer(self):
+        """Keys use Aer's register formatting for multiple classical registers"""
+        q = QuantumRegister(3, 'q')
+        a = ClassicalRegister(1, 'a')
+        b = ClassicalRegister(2, 'b')
+        qc = QuantumCircuit(q, a, b)
+        qc.x(0)
+        qc.h(1)
+        qc.cx(1, 2)
+        qc.measure(q[0], a[0])
+        qc.measure(q[1], b[0])
+        qc.measure(q[2], b[1])
+
+        real = AerSimulator().run(qc, shots=200).result().get_counts()
+        with fastpath.enabled(max_qubits=5):
+            fast = AerSimulator().run(qc, shots=200).result().get_counts()
+
+        assert set(fast) == set(real) == {'00 1', '11 1'}
+        assert fast == {'00 1': 100, '11 1': 100}
+
+    def test_sample_mode_is_reproducible_with_seed(self):
+        """Sample mode draws from exact probabilities, seeded by seed_simulator"""
+        with fastpath.enabled(max_qubits=5, mode='sample'):
+            first = AerSimulator().run(_hadamard(), shots=1000, seed_simulator=7).result().get_counts()
+            second = AerSimulator().run(_hadamard(), shots=1000, seed_simulator=7).result().get_counts()
+
+        assert first == second
+        assert sum(first.values()) == 1000
+
+    def test_unsupported_circuits_use_real_simulator(self):
+        """Gates after a measurement fall back to Aer"""
+        qc = QuantumCircuit(1, 1)
+        qc.h(0)
+        qc.measure(0, 0)
+        qc.x(0)
+
+        with fastpath.enabled(max_qubits=5):
+            job = AerSimulator().run(qc, shots=100)
+
+        assert not isinstance(job, fastpath._FastPathJob)
+
+    def test_other_result_attributes_delegate_to_aer(self):
+        """Attributes other than get_counts come from a real run"""
+        with fastpath.enabled(max_qubits=5):
+            result = AerSimulator().run(_hadamard(), shots=10).result()
+
+        assert result.success is True
+
+    def test_inactive_outside_context(self):
+        """The patch is inert unless enabled"""
+        fastpath.install()
+        job = AerSimulator().run(_hadamard(), shots=10)
+
+        assert not isinstance(job, fastpath._FastPathJob)
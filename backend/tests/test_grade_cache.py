@@ -0,0 +1,107 @@
+"""
+Tests for the content-addressed grading result cache.
+"""
+import pytest
+
+from app import db, Challenge, GradeResult
+from grader import CodeGrader
+import grade_cache as gc
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+SOLUTION = 'def answer():\n    return 42\n'
+
+
+@pytest.fixture
+def grader_calls(monkeypatch):
+    """Count real grader runs and start from an empty memory tier."""
+    calls = []
+    real = CodeGrader.validate_solution
+
+    def counting(code, test_code):
+        calls.append(code)
+        return real(code, test_code)
+
+    monkeypatch.setattr(CodeGrader, 'validate_solution', staticmethod(counting))
+    gc.grade_cache._memory.clear()
+    yield calls
+    gc.grade_cache._memory.clear()
+
+
+class TestGradeCache:
+    """Test suite for cached_validate_solution"""
+
+    def test_line_ending_variants_share_a_key(self):
+        """CRLF and CR line endings don't change the key"""
+        assert gc.cache_key(SOLUTION, TEST_CODE) == gc.cache_key(SOLUTION.replace('\n', '\r\n'), TEST_CODE)
+        assert gc.cache_key(SOLUTION, TEST_CODE) == gc.cache_key(SOLUTION.replace('\n', '\r'), TEST_CODE)
+        assert gc.cache_key(SOLUTION, TEST_CODE) != gc.cache_key(SOLUTION, TEST_CODE + '\n# changed')
+
+    def test_grader_settings_change_the_key(self, monkeypatch):
+        """Changing the fast path mode or output cap doesn't reuse old grades"""
+        import fastpath
+        import grader
+
+        keys = set()
+        for name, module, value in [(None, None, None), ('FAST_PATH_MODE', fastpath, 'sample'),
+                                    ('MAX_OUTPUT_CHARS', grader, 1000)]:
+            if module is not None:
+                monkeypatch.setattr(module, name, value)
+            monkeypatch.setattr(gc, 'GRADER_SETTINGS', gc.grader_settings())
+            keys.add(gc.cache_key(SOLUTION, TEST_CODE))
+
+        assert len(keys) == 3
+
+    def test_whitespace_inside_strings_changes_the_key(self, grader_calls):
+        """Trailing spaces inside a string literal are part of the program"""
+        padded = 's = \"\"\"x   \n\"\"\"\ndef answer():\n    return 40 + len(s)\n'
+        plain = 's = \"\"\"x\n\"\"\"\ndef answer():\n    return 40 + len(s)\n'
+
+        assert gc.cache_key(padded, TEST_CODE) != gc.cache_key(plain, TEST_CODE)
+        assert gc.cached_validate_solution(plain, TEST_CODE)[0] is True
+        passed, _, cached = gc.cached_validate_solution(padded, TEST_CODE)
+        assert passed is False and cached is False
+        assert len(grader_calls) == 2
+
+    def test_resubmission_served_from_cache(self, grader_calls):
+        """The second identical submission doesn't run the grader"""
+        first = gc.cached_validate_solution(SOLUTION, TEST_CODE)
+        second = gc.cached_validate_solution(SOLUTION, TEST_CODE)
+
+        assert first[0] is True and first[2] is False
+        assert second[0] is True and second[2] is True
+        assert len(grader_calls) == 1
+
+    def test_database_tier_survives_memory_eviction(self, grader_calls):
+        """A result persisted in the database is found after the LRU is cleared"""
+        gc.cached_validate_solution(SOLUTION, TEST_CODE)
+        db.session.commit()
+        gc.grade_cache._memory.clear()
+
+        passed, _, cached = gc.cached_validate_solution(SOLUTION, TEST_CODE)
+
+        assert passed is True and cached is True
+        assert len(grader_calls) == 1
+
+    def test_changing_tests_invalidates_persisted_results(self, grader_calls):
+        """Updating a challenge's test_code drops results for the old tests"""
+        challenge = Challenge(day=1, title='Day 1', description='# Day 1',
+                              starter_code='', test_code=TEST_CODE)
+        db.session.add(challenge)
+        gc.cached_validate_solution(SOLUTION, TEST_CODE)
+        db.session.commit()
+        assert GradeResult.query.count() == 1
+
+        challenge.test_code = TEST_CODE.replace('42', '43')
+        db.session.commit()
+
+        assert GradeResult.query.count() == 0
+        passed, _, cached = gc.cached_validate_solution(SOLUTION, challenge.test_code)
+        assert passed is False and cached is False
+        assert len(grader_calls) == 2
@@ -117,3 +117,43 @@ class TestCodeGrader:
         assert 'testsRun' in results['test_results']
         assert 'failures' in results['test_results']
         assert 'errors' in results['test_results']
+
+    def test_tests_can_import_solution_module(self):
+        """Day tests written as `from solution import ...` see the submission"""
+        test_code = '''
+import unittest
+from solution import create_hadamard_circuit
+
+class TestImport(unittest.TestCase):
+    def test_circuit(self):
+        self.assertEqual(create_hadamard_circuit().num_qubits, 1)
+'''
+        passed, results = CodeGrader.validate_solution(CORRECT_SOLUTION, test_code)
+
+        assert passed is True, results
+        assert results['test_results']['testsRun'] == 1
+
+    def test_plain_test_functions_are_collected(self):
+        """Module-level test_* functions run alongside TestCase classes"""
+        test_code = '''
+from solution import run_circuit
+
+def test_both_outcomes():
+    counts = run_circuit()
+    assert set(counts) == {'0', '1'}
+
+def test_always_fails():
+    assert False
+'''
+        passed, results = CodeGrader.validate_solution(CORRECT_SOLUTION, test_code)
+
+        assert passed is False
+        assert results['test_results']['testsRun'] == 2
+        assert results['test_results']['failures'] == 1
+
+    def test_no_tests_fails(self):
+        """A test file that defines no tests does not pass"""
+        passed, results = CodeGrader.validate_solution(CORRECT_SOLUTION, 'import unittest\n')
+
+        assert passed is False
+        assert results['test_results']['testsRun'] == 0
@@ -0,0 +1,64 @@
+"""
+Tests for the grader benchmark harness (benchmarks/grader_bench.py).
+"""
+from benchmarks.grader_bench import compare, load_cases, percentile, run_level
+
+TEST_CODE = '''
+import unittest
+from solution import answer
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+
+def _level(concurrency, p95, rate):
+    return {'concurrency': concurrency, 'latency_ms': {'p95': p95}, 'throughput_per_sec': rate}
+
+
+def test_percentile_interpolates():
+    values = [0.4, 0.1, 0.3, 0.2]
+
+    assert percentile(values, 0) == 0.1
+    assert percentile(values, 50) == 0.25
+    assert percentile(values, 100) == 0.4
+    assert percentile([], 95) == 0.0
+
+
+def test_load_cases_adds_bad_variants(tmp_path):
+    day = tmp_path / 'day01_answer'
+    day.mkdir()
+    (day / 'solution.py').write_text('def answer():\n    return 42\n')
+    (day / 'test.py').write_text(TEST_CODE)
+    (tmp_path / 'day02_no_solution').mkdir()
+
+    names = [case[0] for case in load_cases(str(tmp_path))]
+
+    assert names == ['day01_answer', 'day01_answer:syntax_error', 'day01_answer:raises', 'day01_answer:empty']
+
+
+def test_run_level_reports_latency_and_passes(tmp_path):
+    cases = [
+        ('good', 'def answer():\n    return 42\n', TEST_CODE, ''),
+        ('bad', 'def answer():\n    return 41\n', TEST_CODE, ''),
+    ]
+
+    report = run_level(cases, concurrency=1, rounds=2)
+
+    assert report['submissions'] == 4
+    assert report['passed'] == 2
+    assert report['latency_ms']['p50'] <= report['latency_ms']['p99']
+    assert report['throughput_per_sec'] > 0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {'levels': [_level(1, 100.0, 10.0), _level(2, 100.0, 20.0)]}
+    current = {'levels': [_level(1, 110.0, 9.0), _level(2, 150.0, 12.0), _level(4, 1.0, 1.0)]}
+
+    regressions = compare(current, baseline, tolerance=0.2)
+
+    assert regressions == [
+        'concurrency 2: p95 100.0ms -> 150.0ms',
+        'concurrency 2: throughput 20.0/s -> 12.0/s',
+    ]
@@ -0,0 +1,111 @@
+"""
+Tests for the pre-forked grader worker pool.
+"""
+import pytest
+from grader_pool import GraderPool
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+PASSING = '''
+def answer():
+    return 42
+'''
+
+FAILING = '''
+def answer():
+    return 41
+'''
+
+WORKER_PID = '''
+import os
+
+def answer():
+    print("pid", os.getpid())
+    return 42
+'''
+
+
+@pytest.fixture
+def pool():
+    pool = GraderPool(size=1, max_jobs_per_worker=2)
+    yield pool
+    pool.shutdown()
+
+
+def _pid(results):
+    line = [l for l in results['output'].splitlines() if l.startswith('pid ')][0]
+    return int(line.split()[1])
+
+
+class TestGraderPool:
+    """Test suite for GraderPool"""
+
+    def test_grades_in_worker(self, pool):
+        """Pool workers return the same result structure as inline grading"""
+        passed = pool.run(PASSING, TEST_CODE)
+        failed = pool.run(FAILING, TEST_CODE)
+
+        assert passed['passed'] is True
+        assert passed['test_results']['testsRun'] == 1
+        assert failed['passed'] is False
+        assert failed['test_results']['failures'] == 1
+
+    def test_worker_recycled_after_max_jobs(self, pool):
+        """A worker is replaced once it has run max_jobs_per_worker jobs"""
+        import os
+
+        pids = [_pid(pool.run(WORKER_PID, TEST_CODE)) for _ in range(3)]
+
+        assert os.getpid() not in pids
+        assert pids[0] == pids[1]
+        assert pids[2] != pids[1]
+        assert pool.stats()['recycled'] == 1
+        assert pool.stats()['jobs_total'] == 3
+
+    def test_peak_worker_rss_reported(self, pool):
+        """stats() reports the peak resident memory of any worker"""
+        assert pool.stats()['peak_rss_mb'] == 0
+
+        pool.run(PASSING, TEST_CODE)
+
+        assert pool.stats()['peak_rss_mb'] > 0
+
+    def test_infinite_loop_times_out(self, pool):
+        """A submission that never finishes is stopped with a timeout outcome"""
+        looping = 'def answer():\n    while True:\n        pass\n'
+
+        results = pool.run(looping, TEST_CODE, timeout=1)
+
+        assert results['passed'] is False
+        assert results['test_results']['outcome'] == 'timeout'
+        assert pool.stats()['timeouts'] == 1
+        # The pool keeps working with a replacement worker
+        assert pool.run(PASSING, TEST_CODE)['passed'] is True
+
+    def test_memory_limit_enforced(self):
+        """Allocations beyond the memory limit report memory_exceeded"""
+        pool = GraderPool(size=1, memory_limit_mb=256)
+        try:
+            hungry = 'big = bytearray(2 * 1024 ** 3)\n' + PASSING
+            results = pool.run(hungry, TEST_CODE)
+        finally:
+            pool.shutdown()
+
+        assert results['passed'] is False
+        assert results['test_results']['outcome'] == 'memory_exceeded'
+
+    def test_output_capped(self, pool):
+        """Huge output is truncated rather than shipped back in full"""
+        chatty = 'def answer():\n    print("x" * 10 ** 7)\n    return 42\n'
+
+        results = pool.run(chatty, TEST_CODE)
+
+        assert results['passed'] is True
+        assert results['test_results']['output_truncated'] is True
+        assert len(results['output']) < 10 ** 6
@@ -0,0 +1,72 @@
+"""
+Tests for cached, conditional challenge responses.
+"""
+import pytest
+
+from app import db, Challenge
+from http_cache import response_cache, bump_content_version, content_version, CHALLENGES
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    # Content versions restart with every test database
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def _add_challenge(day, title='Bell state'):
+    challenge = Challenge(day=day, title=title, description='# Long markdown',
+                          starter_code='qc = None', test_code='', tags=['entanglement'])
+    db.session.add(challenge)
+    db.session.commit()
+    return challenge
+
+
+class TestChallengeResponses:
+    """Test suite for the challenge endpoints' HTTP caching"""
+
+    def test_etag_and_not_modified(self, client):
+        _add_challenge(1)
+        first = client.get('/api/challenges/')
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'] == 'public, no-cache'
+        etag = first.headers['ETag']
+
+        again = client.get('/api/challenges/', headers={'If-None-Match': etag})
+        assert again.status_code == 304
+        assert again.data == b''
+
+    def test_challenge_change_invalidates(self, client):
+        """Editing a challenge bumps the version and changes the ETag"""
+        challenge = _add_challenge(1)
+        etag = client.get('/api/challenges/1').headers['ETag']
+
+        challenge.title = 'GHZ state'
+        db.session.commit()
+
+        response = client.get('/api/challenges/1', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['title'] == 'GHZ state'
+
+    def test_reseed_bump_invalidates(self, client):
+        """A version bump from another process (seed.py) is picked up"""
+        _add_challenge(1)
+        client.get('/api/challenges/')
+        # Simulate seed.py: change rows without ORM events, then bump
+        db.session.execute(Challenge.__table__.update().values(title='Reseeded'))
+        before = content_version(CHALLENGES)
+        bump_content_version(CHALLENGES)
+        db.session.commit()
+
+        assert content_version(CHALLENGES) == before + 1
+        assert client.get('/api/challenges/').get_json()[0]['title'] == 'Reseeded'
+
+    def test_summary_view_omits_bodies(self, client):
+        _add_challenge(1)
+        (summary,) = client.get('/api/challenges/?view=summary').get_json()
+        assert summary == {'id': 1, 'day': 1, 'title': 'Bell state', 'difficulty': 1,
+                           'tags': ['entanglement']}
+
+    def test_missing_challenge_is_404(self, client):
+        assert client.get('/api/challenges/7').status_code == 404
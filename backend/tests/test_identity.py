@@ -0,0 +1,49 @@
+"""
+Tests for the cached JWT user lookup.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import db, User
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class TestIdentityCache:
+    """Test suite for identity.py"""
+
+    def test_cached_user_skips_query(self, client, auth_headers):
+        assert client.get('/api/auth/me', headers=auth_headers).status_code == 200
+        with _count_queries() as statements:
+            response = client.get('/api/auth/me', headers=auth_headers)
+        assert response.get_json()['username'] == 'alice'
+        assert not [s for s in statements if 'FROM users' in s]
+
+    def test_user_update_invalidates(self, client, auth_headers):
+        client.get('/api/auth/me', headers=auth_headers)
+        user = User.query.filter_by(username='alice').first()
+        user.email = 'alice@quantum.example'
+        db.session.commit()
+
+        assert client.get('/api/auth/me', headers=auth_headers).get_json()['email'] == 'alice@quantum.example'
+
+    def test_deleted_user_is_404(self, client, auth_headers):
+        User.query.filter_by(username='alice').delete()
+        db.session.commit()
+
+        response = client.get('/api/auth/me', headers=auth_headers)
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'User not found'}
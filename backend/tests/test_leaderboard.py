@@ -0,0 +1,153 @@
+"""
+Tests for the materialized leaderboard stats.
+"""
+from datetime import datetime, timedelta
+
+from app import db, User, Challenge, Submission, FirstSolve, UserStats
+from stats import record_submission_stats, rebuild_user_stats
+
+
+def _make_user(name):
+    user = User(username=name, email=f'{name}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _make_challenges(n):
+    challenges = [
+        Challenge(day=d, title=f'Day {d}', description='', starter_code='', test_code='')
+        for d in range(1, n + 1)
+    ]
+    db.session.add_all(challenges)
+    db.session.flush()
+    return challenges
+
+
+def _submit(user, challenge, passed, submitted_at=None):
+    submission = Submission(user_id=user.id, challenge_id=challenge.id,
+                            code='pass', passed=passed, submitted_at=submitted_at)
+    db.session.add(submission)
+    newly_solved = record_submission_stats(submission)
+    db.session.commit()
+    return newly_solved
+
+
+def _snapshot():
+    return {
+        s.user_id: (s.solved, s.total_submissions)
+        for s in UserStats.query.all()
+    }
+
+
+class TestUserStats:
+    """Test suite for stats.py"""
+
+    def test_counts_distinct_days_not_repeat_passes(self):
+        """Passing the same day twice counts once"""
+        user = _make_user('alice')
+        day1, day2 = _make_challenges(2)
+
+        assert _submit(user, day1, False) is False
+        assert _submit(user, day1, True) is True
+        assert _submit(user, day1, True) is False
+        assert _submit(user, day2, True) is True
+
+        stats = db.session.get(UserStats, user.id)
+        assert stats.solved == 2
+        assert stats.total_submissions == 4
+        assert stats.first_solve_at is not None
+        assert stats.last_solve_at >= stats.first_solve_at
+
+    def test_incremental_matches_rebuild(self):
+        """Counters kept per submission equal a rebuild from submissions"""
+        alice, bob = _make_user('alice'), _make_user('bob')
+        days = _make_challenges(3)
+        for user, day, passed in [(alice, 0, True), (alice, 0, True), (alice, 1, False),
+                                  (bob, 1, True), (bob, 2, True), (bob, 2, False)]:
+            _submit(user, days[day], passed)
+
+        incremental = _snapshot()
+        rebuild_user_stats()
+        db.session.commit()
+
+        assert _snapshot() == incremental
+        assert incremental == {alice.id: (1, 3), bob.id: (2, 3)}
+
+    def test_rebuild_keeps_solve_times(self):
+        """Solve timestamps come from submitted_at on both paths"""
+        alice, bob = _make_user('alice'), _make_user('bob')
+        days = _make_challenges(2)
+        start = datetime(2024, 12, 1, 6, 0, 0)
+        for user, day, passed, minutes in [(alice, 0, False, 0), (alice, 0, True, 5), (bob, 0, True, 7),
+                                           (alice, 1, True, 30), (alice, 0, True, 40), (bob, 1, True, 45)]:
+            _submit(user, days[day], passed, start + timedelta(minutes=minutes))
+
+        def solve_times():
+            stats = {s.user_id: (s.first_solve_at, s.last_solve_at) for s in UserStats.query.all()}
+            first = {(f.user_id, f.challenge_id): (f.submission_id, f.solved_at) for f in FirstSolve.query.all()}
+            return stats, first
+
+        incremental = solve_times()
+        rebuild_user_stats()
+        db.session.commit()
+
+        assert solve_times() == incremental
+        assert incremental[0][alice.id] == (start + timedelta(minutes=5), start + timedelta(minutes=30))
+
+
+class TestLeaderboardEndpoint:
+    """Test suite for GET /api/leaderboard/"""
+
+    def test_ranks_by_days_solved(self, client):
+        """Users are ordered by distinct days solved"""
+        alice, bob = _make_user('alice'), _make_user('bob')
+        day1, day2 = _make_challenges(2)
+        for _ in range(3):
+            _submit(alice, day1, True)
+        _submit(bob, day1, True)
+        _submit(bob, day2, True)
+
+        response = client.get('/api/leaderboard/')
+        assert response.status_code == 200
+        assert response.get_json() == [
+            {'rank': 1, 'username': 'bob', 'completed': 2, 'total_submissions': 2},
+            {'rank': 2, 'username': 'alice', 'completed': 1, 'total_submissions': 3},
+        ]
+
+
+class TestDayLeaderboardEndpoint:
+    """Test suite for GET /api/leaderboard/by-day/<day>"""
+
+    def test_lists_each_user_once_in_first_solve_order(self, client):
+        """Repeat passes don't add rows; order is by first pass"""
+        alice, bob = _make_user('alice'), _make_user('bob')
+        day1, day2 = _make_challenges(2)
+        _submit(bob, day1, False)
+        _submit(alice, day1, True)
+        _submit(bob, day1, True)
+        _submit(alice, day1, True)
+        _submit(bob, day2, True)
+
+        response = client.get('/api/leaderboard/by-day/1')
+        assert response.status_code == 200
+        assert [row['username'] for row in response.get_json()] == ['alice', 'bob']
+        assert [row['rank'] for row in response.get_json()] == [1, 2]
+
+    def test_first_solves_survive_rebuild(self, client):
+        """A rebuild reproduces the same per-day ranking"""
+        alice, bob = _make_user('alice'), _make_user('bob')
+        (day1,) = _make_challenges(1)
+        _submit(bob, day1, True)
+        _submit(alice, day1, True)
+        _submit(bob, day1, True)
+
+        before = client.get('/api/leaderboard/by-day/1').get_json()
+        rebuild_user_stats()
+        db.session.commit()
+        assert FirstSolve.query.count() == 2
+        assert [r['username'] for r in client.get('/api/leaderboard/by-day/1').get_json()] == \
+            [r['username'] for r in before]
+
+    def test_unknown_day_is_empty(self, client):
+        assert client.get('/api/leaderboard/by-day/99').get_json() == []
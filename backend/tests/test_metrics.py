@@ -0,0 +1,86 @@
+"""
+Tests for the Prometheus metrics (metrics.py) and GET /metrics.
+"""
+from app import db, Challenge
+from grader import CodeGrader
+import metrics
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+
+def _sample(body, prefix):
+    """Value of the sample line starting with `prefix`, or 0 if absent."""
+    for line in body.splitlines():
+        if line.startswith(prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+class TestRegistry:
+    """Test suite for the text exposition format"""
+
+    def test_counter_and_collected_values(self):
+        registry = metrics.Registry()
+        counter = registry.counter('jobs_total', 'Jobs', ('kind',))
+        counter.inc(kind='a')
+        counter.inc(2, kind='b"q')
+        registry.collect('depth', 'Queue depth', lambda: 3)
+        registry.collect('idle', 'Nothing yet', lambda: None)
+
+        body = registry.render()
+
+        assert '# TYPE jobs_total counter' in body
+        assert 'jobs_total{kind="a"} 1' in body
+        assert 'jobs_total{kind="b\\"q"} 2' in body
+        assert 'depth 3' in body
+        assert '# TYPE idle gauge' in body
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        body = registry.render()
+
+        assert 'latency_seconds_bucket{le="0.1"} 1' in body
+        assert 'latency_seconds_bucket{le="1"} 2' in body
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in body
+        assert 'latency_seconds_count 3' in body
+        assert 'latency_seconds_sum 5.55' in body
+
+
+def test_run_inline_reports_phase_timings():
+    timings = {}
+
+    CodeGrader.run_inline('def answer():\n    return 42\n', TEST_CODE, timings=timings)
+
+    assert set(timings) == {'exec', 'define_tests', 'run_tests', 'serialize'}
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def test_metrics_endpoint(client, auth_headers):
+    db.session.add(Challenge(day=1, title='Day 1', description='', starter_code='', test_code=TEST_CODE))
+    db.session.commit()
+    graded = 'submissions_graded_total{day="1",outcome="pass"}'
+    requests = 'http_request_duration_seconds_count{method="POST",endpoint="/api/submissions/",status="200"}'
+    before = client.get('/metrics').get_data(as_text=True)
+
+    client.post('/api/submissions/', headers=auth_headers, json={'day': 1, 'code': 'def answer():\n    return 42\n'})
+    client.post('/api/submissions/', headers=auth_headers, json={'day': 1, 'code': 'def answer(:\n'})
+    response = client.get('/metrics')
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert _sample(body, graded) == _sample(before, graded) + 1
+    assert _sample(body, 'submissions_graded_total{day="1",outcome="error"}') >= 1
+    assert _sample(body, requests) == _sample(before, requests) + 2
+    assert 'grader_phase_duration_seconds_count{phase="run_tests"}' in body
+    assert '# TYPE grader_pool_workers gauge' in body
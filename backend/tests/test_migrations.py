@@ -0,0 +1,79 @@
+"""
+Tests for the schema migrations.
+"""
+import pytest
+from sqlalchemy import inspect, text
+
+from app import db, User, Challenge, Submission, UserStats, Blob
+from migrations import MIGRATIONS, applied_versions, pending_migrations, upgrade
+
+
+@pytest.fixture(autouse=True)
+def fresh_versions():
+    """schema_migrations is not part of the models, so drop_all keeps it."""
+    yield
+    db.session.rollback()
+    db.session.execute(text('DROP TABLE IF EXISTS schema_migrations'))
+    db.session.commit()
+
+
+def _index_names(table):
+    return {ix['name'] for ix in inspect(db.engine).get_indexes(table)}
+
+
+class TestMigrations:
+    """Test suite for migrations.upgrade()"""
+
+    def test_upgrade_existing_database(self):
+        """A database created before the indexes gets them and its stats backfilled"""
+        # Simulate a pre-migrations database: tables without the new indexes
+        for index in Submission.__table__.indexes:
+            index.drop(db.engine)
+        user = User(username='alice', email='alice@example.com', password_hash='x')
+        challenge = Challenge(day=1, title='Day 1', description='', starter_code='', test_code='')
+        db.session.add_all([user, challenge])
+        db.session.flush()
+        db.session.add(Submission(user_id=user.id, challenge_id=challenge.id, code='', passed=True))
+        db.session.commit()
+        assert 'ix_submissions_user_passed_challenge' not in _index_names('submissions')
+
+        applied = upgrade()
+
+        assert applied == [version for version, _ in MIGRATIONS]
+        assert {'ix_submissions_user_passed_challenge',
+                'ix_submissions_challenge_passed_submitted_at'} <= _index_names('submissions')
+        assert db.session.get(UserStats, user.id).solved == 1
+        assert pending_migrations() == []
+
+    def test_upgrade_is_idempotent(self):
+        """Applied migrations are recorded and not run again"""
+        upgrade()
+        assert upgrade() == []
+        assert applied_versions() == {version for version, _ in MIGRATIONS}
+        count = db.session.execute(text('SELECT COUNT(*) FROM schema_migrations')).scalar()
+        assert count == len(MIGRATIONS)
+
+    def test_blob_store_migration_moves_inline_columns(self):
+        """Code and results stored inline before the blob store are moved out"""
+        db.session.execute(text('DROP TABLE submissions'))
+        db.session.execute(text(
+            'CREATE TABLE submissions (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL,'
+            ' challenge_id INTEGER NOT NULL, code TEXT NOT NULL, passed BOOLEAN,'
+            ' test_results JSON, submitted_at DATETIME)'
+        ))
+        db.session.execute(text(
+            "INSERT INTO submissions (user_id, challenge_id, code, passed, test_results, submitted_at)"
+            " VALUES (1, 1, 'x = 1', 1, '{\"testsRun\": 1}', '2025-12-01 00:00:00'),"
+            " (1, 1, 'x = 1', 0, NULL, '2025-12-01 00:01:00')"
+        ))
+        db.session.commit()
+
+        upgrade()
+
+        first, second = Submission.query.order_by(Submission.id).all()
+        assert first.code == second.code == 'x = 1'
+        assert first.code_sha256 == second.code_sha256
+        assert first.legacy_code == ''
+        assert first.test_results == {'testsRun': 1}
+        assert second.test_results is None
+        assert Blob.query.count() == 2
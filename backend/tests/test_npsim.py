@@ -0,0 +1,110 @@
+"""
+Tests for the pure-NumPy statevector simulator and its grader integration.
+"""
+import numpy as np
+from qiskit import QuantumCircuit as QiskitCircuit
+from qiskit.quantum_info import Statevector
+
+import fastpath
+import npsim
+from grader import CodeGrader
+
+
+def _build(cls):
+    qc = cls(3, 3)
+    qc.h(0)
+    qc.cx(0, 2)
+    qc.ry(0.3, 1)
+    qc.cz(2, 1)
+    qc.t(2)
+    qc.swap(0, 1)
+    qc.ccx(0, 1, 2)
+    qc.rx(1.1, 0)
+    qc.cp(0.7, 1, 0)
+    return qc
+
+
+class TestNumpySimulator:
+    """Test suite for npsim"""
+
+    def test_statevector_matches_qiskit(self):
+        """Gate conventions and qubit ordering agree with Qiskit"""
+        expected = Statevector(_build(QiskitCircuit)).data
+
+        assert np.allclose(npsim.statevector(_build(npsim.QuantumCircuit)), expected)
+
+    def test_batched_initial_states(self):
+        """A batch of initial states is evolved in one pass"""
+        qc = npsim.QuantumCircuit(2)
+        qc.h(0)
+        qc.cx(0, 1)
+        batch = np.eye(4)
+
+        states, _ = npsim.simulate(qc, initial_states=batch)
+
+        assert states.shape == (4, 4)
+        for i in range(4):
+            assert np.allclose(states[i], npsim.simulate(qc, initial_states=batch[i])[0])
+
+    def test_counts_format_matches_aer(self):
+        """Counts use Aer's register formatting"""
+        q = npsim.QuantumRegister(3, 'q')
+        a = npsim.ClassicalRegister(1, 'a')
+        b = npsim.ClassicalRegister(2, 'b')
+        qc = npsim.QuantumCircuit(q, a, b)
+        qc.x(q[0])
+        qc.h(q[1])
+        qc.cx(q[1], q[2])
+        qc.measure(q[0], a[0])
+        qc.measure([q[1], q[2]], b)
+
+        counts = npsim.AerSimulator().run(qc, shots=200).result().get_counts(qc)
+
+        assert counts == {'00 1': 100, '11 1': 100}
+
+    def test_counts_match_fast_path(self):
+        """Both simulators turn the same distribution into the same counts"""
+        for mode in ('exact', 'sample'):
+            qiskit_circuit, numpy_circuit = _build(QiskitCircuit), _build(npsim.QuantumCircuit)
+            for qc in (qiskit_circuit, numpy_circuit):
+                qc.measure([0, 1, 2], [0, 1, 2])
+
+            expected = fastpath._counts_for(qiskit_circuit, 12, mode, 1000, seed=7)
+            counts = npsim.run_counts(numpy_circuit, shots=1000, seed=7, mode=mode)
+
+            assert counts == dict(expected)
+
+    def test_grader_uses_shim_when_tests_opt_in(self):
+        """Submissions import the NumPy shims when the tests carry the pragma"""
+        user_code = '''
+from qiskit import QuantumCircuit
+from qiskit_aer import AerSimulator
+
+def run_circuit():
+    qc = QuantumCircuit(1, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    return qc, AerSimulator().run(qc, shots=1000).result().get_counts()
+'''
+        test_code = '''# grader: simulator=numpy
+import unittest
+
+class TestDay(unittest.TestCase):
+    def test_counts(self):
+        qc, counts = run_circuit()
+        self.assertEqual(type(qc).__module__, 'npsim')
+        self.assertEqual(counts, {'0': 500, '1': 500})
+'''
+        results = CodeGrader.run_inline(user_code, test_code)
+
+        assert results['passed'] is True, results
+
+    def test_unsupported_qiskit_submodules_fail_cleanly(self):
+        """Imports outside the shim raise ImportError in the submission"""
+        results = CodeGrader.run_inline(
+            'from qiskit.quantum_info import Statevector\n',
+            '# grader: simulator=numpy\nimport unittest\n'
+        )
+
+        assert results['passed'] is False
+        assert 'ImportError' in results['error']
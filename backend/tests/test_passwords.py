@@ -0,0 +1,75 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+import threading
+
+import bcrypt
+import pytest
+
+import passwords
+from app import db, User
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def saturated_hasher(monkeypatch):
+    """A one-slot hasher whose only slot is held until the test ends."""
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+    release = threading.Event()
+    holder = threading.Thread(target=hasher._run, args=(release.wait,))
+    holder.start()
+    while hasher._slots._value:
+        pass
+    monkeypatch.setattr(passwords, '_hasher', hasher)
+    yield hasher
+    release.set()
+    holder.join()
+    hasher.shutdown()
+
+
+def _create_user(password_hash):
+    user = User(username='alice', email='alice@example.com', password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TestPasswordHasher:
+    """Test suite for passwords.py"""
+
+    def test_hash_and_check(self):
+        hasher = PasswordHasher(workers=1, max_pending=2, rounds=4)
+        hashed = hasher.hash('quantum123456')
+        assert hasher.check('quantum123456', hashed)
+        assert not hasher.check('wrong-password', hashed)
+        assert not hasher.needs_rehash(hashed)
+        assert PasswordHasher(rounds=5).needs_rehash(hashed)
+        hasher.shutdown()
+
+    def test_rejects_when_saturated(self, saturated_hasher):
+        with pytest.raises(PasswordHasherBusy):
+            saturated_hasher.hash('quantum123456')
+        assert saturated_hasher.rejected == 1
+
+
+class TestLogin:
+    """Test suite for login behaviour around password hashing"""
+
+    def test_rehash_on_login_when_cost_changes(self, client):
+        old_hash = bcrypt.hashpw(b'quantum123456', bcrypt.gensalt(rounds=5)).decode('utf-8')
+        user = _create_user(old_hash)
+
+        response = client.post('/api/auth/login', json={'username': 'alice', 'password': 'quantum123456'})
+
+        assert response.status_code == 200
+        new_hash = db.session.get(User, user.id).password_hash
+        assert new_hash != old_hash
+        assert not passwords.needs_rehash(new_hash)
+
+    def test_busy_hasher_returns_503(self, client, saturated_hasher):
+        _create_user(bcrypt.hashpw(b'quantum123456', bcrypt.gensalt(rounds=4)).decode('utf-8'))
+
+        response = client.post('/api/auth/login', json={'username': 'alice', 'password': 'quantum123456'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(passwords.PASSWORD_HASH_RETRY_AFTER)
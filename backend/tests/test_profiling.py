@@ -0,0 +1,111 @@
+"""
+Tests for profiled grading runs (profiling.py) and the admin-only API flag.
+"""
+import marshal
+import pstats
+
+from app import app, db, Challenge, GradeResult, Submission, UserStats
+from grader import CodeGrader
+import profiling
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+SOLUTION = '''
+def answer():
+    return sum(_slow(i) for i in range(200))
+
+def _slow(i):
+    return sum(range(2000)) * 0 + (42 if i == 0 else 0)
+'''
+
+
+class TestProfileRun:
+    """Test suite for CodeGrader.run_inline with profiling on"""
+
+    def test_attaches_hotspots_memory_and_phases(self):
+        profile = {}
+
+        results = CodeGrader.run_inline(SOLUTION, TEST_CODE, profile=profile)
+
+        assert results['passed'] is True
+        summary = results['test_results']['profile']
+        assert summary is profile['summary']
+        assert summary['peak_memory_mb'] >= 0
+        assert set(summary['phases']) == {'exec', 'define_tests', 'run_tests', 'serialize'}
+        assert 0 < len(summary['hotspots']) <= profiling.PROFILE_TOP_N
+        assert any(h['function'].startswith('<submission>:') and h['function'].endswith('(_slow)')
+                   for h in summary['hotspots'])
+        self_times = [h['self_seconds'] for h in summary['hotspots']]
+        assert self_times == sorted(self_times, reverse=True)
+
+    def test_profiles_runs_whose_tests_never_ran(self):
+        profile = {}
+
+        results = CodeGrader.run_inline('def answer(:\n', TEST_CODE, profile=profile)
+
+        assert results['passed'] is False
+        assert 'hotspots' in results['test_results']['profile']
+
+    def test_pstats_export(self, tmp_path):
+        profile = {}
+        CodeGrader.run_inline(SOLUTION, TEST_CODE, profile=profile)
+        path = tmp_path / 'run.pstats'
+
+        profiling.write_pstats(profile, str(path))
+
+        stats = pstats.Stats(str(path))
+        assert any(name == '_slow' for _, _, name in stats.stats)
+        assert marshal.loads(path.read_bytes()) == stats.stats
+
+
+def test_execute_code_profiles_on_the_pool(tmp_path):
+    path = tmp_path / 'pool.pstats'
+
+    results = CodeGrader.execute_code(SOLUTION, TEST_CODE, pstats_path=str(path))
+
+    assert results['passed'] is True
+    assert results['test_results']['profile']['hotspots']
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+class TestProfileApi:
+    """Test suite for `"profile": true` on POST /api/submissions/"""
+
+    def _add_challenge(self):
+        db.session.add(Challenge(day=1, title='Day 1', description='', starter_code='', test_code=TEST_CODE))
+        db.session.commit()
+
+    def test_rejected_for_non_admins(self, client, auth_headers, monkeypatch):
+        monkeypatch.setitem(app.config, 'ADMIN_USERNAMES', set())
+        self._add_challenge()
+
+        response = client.post('/api/submissions/', headers=auth_headers,
+                               json={'day': 1, 'code': SOLUTION, 'profile': True})
+
+        assert response.status_code == 403
+
+    def test_admin_gets_fresh_unrecorded_profiled_results(self, client, auth_headers, monkeypatch):
+        monkeypatch.setitem(app.config, 'ADMIN_USERNAMES', {'alice'})
+        self._add_challenge()
+        code = SOLUTION + '# profiled\n'
+
+        for _ in range(2):
+            response = client.post('/api/submissions/', headers=auth_headers,
+                                   json={'day': 1, 'code': code, 'profile': True})
+            body = response.get_json()
+            assert response.status_code == 200
+            assert body['cached'] is False
+            assert body['passed'] is True
+            assert body['submission_id'] is None
+            assert body['results']['test_results']['profile']['hotspots']
+
+        # Profiled runs are kept out of the grading cache and the leaderboards
+        assert GradeResult.query.count() == 0
+        assert Submission.query.count() == 0
+        assert UserStats.query.count() == 0
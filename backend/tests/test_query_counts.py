@@ -0,0 +1,154 @@
+"""
+Query budgets per endpoint and request tracing (tracing.py).
+
+The budgets are the statement counts of each endpoint today. The data set
+has several users, days and submissions, so a query issued per row (N+1)
+pushes an endpoint over its budget.
+"""
+import json
+import logging
+import re
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import app, db, User, Challenge, Submission
+from http_cache import response_cache
+import identity
+from stats import record_submission_stats
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+USERS = 4
+DAYS = 3
+
+
+@pytest.fixture
+def populated():
+    """USERS users with one failed and one passing submission per day."""
+    challenges = [
+        Challenge(day=d, title=f'Day {d}', description='', starter_code='', test_code=TEST_CODE)
+        for d in range(1, DAYS + 1)
+    ]
+    db.session.add_all(challenges)
+    users = []
+    for i in range(USERS):
+        user = User(username=f'user{i}', email=f'user{i}@example.com')
+        user.set_password('quantum123456')
+        db.session.add(user)
+        users.append(user)
+    db.session.flush()
+    for user in users:
+        for challenge in challenges:
+            for passed in (False, True):
+                submission = Submission(user_id=user.id, challenge_id=challenge.id, code='pass',
+                                        passed=passed, test_results={'passed': passed})
+                db.session.add(submission)
+                record_submission_stats(submission)
+    db.session.commit()
+    response_cache.clear()
+    identity.clear()
+    return {'Authorization': f'Bearer {create_access_token(identity=str(users[0].id))}'}
+
+
+@pytest.mark.parametrize('path, budget', [
+    ('/api/challenges/', 2),
+    ('/api/challenges/1', 2),
+    ('/api/submissions/user/user0', 2),
+    ('/api/submissions/user/user0/progress', 2),
+    ('/api/leaderboard/', 1),
+    ('/api/leaderboard/by-day/1', 2),
+])
+def test_read_endpoint_budgets(client, populated, max_queries, path, budget):
+    with max_queries(budget):
+        response = client.get(path, headers=populated)
+
+    assert response.status_code == 200
+
+
+def test_submission_detail_budget(client, populated, max_queries):
+    submission_id = db.session.query(Submission.id).first()[0]
+    db.session.remove()
+
+    with max_queries(2):
+        response = client.get(f'/api/submissions/{submission_id}', headers=populated)
+
+    assert response.status_code == 200
+
+
+def test_submit_budget(client, populated, max_queries):
+    # Code no other test submits, so grading is not served from the cache
+    code = 'def answer():\n    return 6 * 7\n'
+    with max_queries(13):
+        response = client.post('/api/submissions/', headers=populated, json={'day': 1, 'code': code})
+
+    assert response.status_code == 200
+    assert response.get_json()['passed'] is True
+
+
+def test_auth_endpoint_budgets(client, populated, max_queries):
+    with max_queries(4):
+        response = client.post('/api/auth/register', json={
+            'username': 'bob', 'email': 'bob@example.com', 'password': 'quantum123456'
+        })
+    assert response.status_code == 201
+
+    with max_queries(1):
+        response = client.post('/api/auth/login', json={'username': 'bob', 'password': 'quantum123456'})
+    assert response.status_code == 200
+    tokens = response.get_json()
+
+    identity.clear()
+    with max_queries(1):
+        response = client.post('/api/auth/refresh',
+                               headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 200
+
+    identity.clear()
+    with max_queries(1):
+        response = client.get('/api/auth/me', headers={'Authorization': f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 200
+
+
+class TestTracing:
+    """Test suite for the Server-Timing header and request log"""
+
+    def test_server_timing_reports_queries_and_grading(self, client, populated):
+        response = client.post('/api/submissions/', headers=populated,
+                               json={'day': 1, 'code': 'def answer():\n    return 42\n'})
+
+        timing = response.headers['Server-Timing']
+        assert timing.startswith('app;dur=')
+        assert re.search(r'db;desc="\d+ queries";dur=', timing)
+        assert 'grade;dur=' in timing
+
+    def test_request_log_line(self, client, populated, caplog):
+        with caplog.at_level(logging.INFO, logger='tracing'):
+            client.get('/api/leaderboard/')
+
+        (record,) = [r for r in caplog.records if r.name == 'tracing']
+        line = json.loads(record.getMessage())
+        assert record.levelno == logging.INFO
+        assert line['endpoint'] == '/api/leaderboard/'
+        assert line['status'] == 200
+        assert line['sql_count'] == 1
+        assert 'queries' not in line
+
+    def test_slow_request_dumps_queries(self, client, populated, caplog, monkeypatch):
+        monkeypatch.setitem(app.config, 'TRACE_SLOW_REQUEST_MS', 0)
+
+        with caplog.at_level(logging.INFO, logger='tracing'):
+            client.get('/api/leaderboard/')
+
+        (record,) = [r for r in caplog.records if r.name == 'tracing']
+        line = json.loads(record.getMessage())
+        assert record.levelno == logging.WARNING
+        assert line['slow'] is True
+        assert len(line['queries']) == 1
+        assert 'user_stats' in line['queries'][0]['sql']
@@ -0,0 +1,62 @@
+"""
+Tests for the bulk regrading command.
+"""
+import json
+
+from app import db, User, Challenge, Submission
+from regrade import regrade
+
+OLD_TESTS = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 41)
+'''
+
+NEW_TESTS = OLD_TESTS.replace('41', '42')
+
+
+def _setup(n_right, n_wrong):
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    challenge = Challenge(day=1, title='Day 1', description='# Day 1',
+                          starter_code='', test_code=NEW_TESTS)
+    db.session.add_all([user, challenge])
+    db.session.flush()
+    for code, count in (('def answer():\n    return 42\n', n_right),
+                        ('def answer():\n    return 41\n', n_wrong)):
+        for _ in range(count):
+            db.session.add(Submission(user_id=user.id, challenge_id=challenge.id,
+                                      code=code, passed=(code.endswith('41\n'))))
+    db.session.commit()
+
+
+class TestRegrade:
+    """Test suite for regrade()"""
+
+    def test_regrade_updates_passed_and_dedupes(self, tmp_path):
+        """Stored results are rewritten; identical code is graded once"""
+        _setup(n_right=3, n_wrong=2)
+
+        state = regrade(chunk_size=2, workers=1, state_file=str(tmp_path / 'state.json'),
+                        log=lambda msg: None)
+
+        assert state['processed'] == 5
+        assert state['changed'] == 5
+        assert state['graded'] == 2
+        passed = [s.passed for s in Submission.query.order_by(Submission.id)]
+        assert passed == [True, True, True, False, False]
+        assert not (tmp_path / 'state.json').exists()
+
+    def test_regrade_resumes_from_state_file(self, tmp_path):
+        """Submissions before the saved last_id are left alone"""
+        _setup(n_right=3, n_wrong=0)
+        first_id = Submission.query.order_by(Submission.id).first().id
+        state_file = tmp_path / 'state.json'
+        state_file.write_text(json.dumps({'day': None, 'last_id': first_id, 'processed': 1,
+                                          'changed': 0, 'graded': 0}))
+
+        state = regrade(workers=1, state_file=str(state_file), log=lambda msg: None)
+
+        assert state['processed'] == 3
+        assert [s.passed for s in Submission.query.order_by(Submission.id)] == [False, True, True]
@@ -0,0 +1,64 @@
+"""
+Tests for incremental challenge seeding.
+"""
+from app import db, Challenge, Submission, User
+from seed import discover_challenges, sync_challenges
+
+
+def _write_day(root, day, title, test='# tests\n'):
+    folder = root / f'day{day:02d}_example'
+    folder.mkdir(exist_ok=True)
+    (folder / 'challenge.md').write_text(f'# {title}\n\nSolve it.\n')
+    (folder / 'solution.py').write_text('def answer():\n    return 42\n')
+    (folder / 'test.py').write_text(test)
+
+
+def _seed(root):
+    report = sync_challenges(discover_challenges(str(root)))
+    db.session.commit()
+    return report
+
+
+class TestSeed:
+    """Test suite for seed.sync_challenges()"""
+
+    def test_unchanged_days_are_skipped(self, tmp_path):
+        _write_day(tmp_path, 1, 'Qubits')
+        _write_day(tmp_path, 2, 'Superposition')
+        assert _seed(tmp_path)['added'] == [1, 2]
+
+        report = _seed(tmp_path)
+        assert report['unchanged'] == [1, 2]
+        assert report['added'] == report['updated'] == []
+
+    def test_changed_day_updates_in_place(self, tmp_path):
+        """Challenge ids survive a change, so submissions keep their challenge"""
+        _write_day(tmp_path, 1, 'Qubits')
+        _seed(tmp_path)
+        challenge = Challenge.query.filter_by(day=1).one()
+        user = User(username='alice', email='alice@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Submission(user_id=user.id, challenge_id=challenge.id, code='', passed=True))
+        db.session.commit()
+        old_id = challenge.id
+
+        _write_day(tmp_path, 1, 'Qubits, revised', test='# new tests\n')
+        report = _seed(tmp_path)
+
+        assert report['updated'] == [1]
+        challenge = Challenge.query.filter_by(day=1).one()
+        assert challenge.id == old_id
+        assert challenge.title == 'Qubits, revised'
+        assert challenge.test_code == '# new tests\n'
+        assert Submission.query.one().challenge.day == 1
+
+    def test_days_removed_from_disk_are_kept(self, tmp_path):
+        _write_day(tmp_path, 1, 'Qubits')
+        _seed(tmp_path)
+        for path in (tmp_path / 'day01_example').iterdir():
+            path.unlink()
+        (tmp_path / 'day01_example').rmdir()
+
+        assert _seed(tmp_path)['missing'] == [1]
+        assert Challenge.query.count() == 1
@@ -0,0 +1,63 @@
+"""
+Tests for the paginated submission history and detail endpoints.
+"""
+from datetime import datetime, timedelta
+
+from app import db, User, Challenge, Submission
+
+
+def _history(n):
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    challenge = Challenge(day=1, title='Day 1', description='', starter_code='', test_code='')
+    db.session.add_all([user, challenge])
+    db.session.flush()
+    start = datetime(2025, 12, 1)
+    for i in range(n):
+        # Pairs of submissions share a timestamp to exercise the id tie-breaker
+        db.session.add(Submission(user_id=user.id, challenge_id=challenge.id, code=f'# {i}',
+                                  passed=i % 2 == 0, test_results={'run': i},
+                                  submitted_at=start + timedelta(minutes=i // 2)))
+    db.session.commit()
+    return user
+
+
+class TestSubmissionHistory:
+    """Test suite for GET /api/submissions/user/<username>"""
+
+    def test_pages_cover_history_newest_first(self, client):
+        """Following next_cursor visits every submission exactly once"""
+        _history(7)
+        seen = []
+        url = '/api/submissions/user/alice?limit=3'
+        while url:
+            body = client.get(url).get_json()
+            assert len(body['submissions']) <= 3
+            seen.extend(s['id'] for s in body['submissions'])
+            cursor = body['next_cursor']
+            url = f'/api/submissions/user/alice?limit=3&cursor={cursor}' if cursor else None
+
+        expected = [s.id for s in Submission.query.order_by(
+            Submission.submitted_at.desc(), Submission.id.desc())]
+        assert seen == expected
+
+    def test_default_fields_skip_test_results(self, client):
+        _history(1)
+        (row,) = client.get('/api/submissions/user/alice').get_json()['submissions']
+        assert set(row) == {'id', 'challenge_id', 'passed', 'submitted_at'}
+
+    def test_fields_projection(self, client):
+        _history(1)
+        body = client.get('/api/submissions/user/alice?fields=id,test_results').get_json()
+        assert body['submissions'] == [{'id': 1, 'test_results': {'run': 0}}]
+
+    def test_rejects_unknown_field_and_bad_cursor(self, client):
+        _history(1)
+        assert client.get('/api/submissions/user/alice?fields=code').status_code == 400
+        assert client.get('/api/submissions/user/alice?cursor=nope').status_code == 400
+
+    def test_detail_endpoint(self, client):
+        _history(1)
+        response = client.get('/api/submissions/1')
+        assert response.status_code == 200
+        assert response.get_json()['test_results'] == {'run': 0}
+        assert client.get('/api/submissions/999').status_code == 404
@@ -0,0 +1,71 @@
+"""
+Tests for the challenge hot-reload watcher.
+"""
+import time
+
+from app import db, Challenge
+from watcher import ChallengeWatcher
+
+
+def _write_day(root, day, title, test='# tests\n'):
+    folder = root / f'day{day:02d}_example'
+    folder.mkdir(exist_ok=True)
+    (folder / 'challenge.md').write_text(f'# {title}\n')
+    (folder / 'test.py').write_text(test)
+    return folder
+
+
+def _touch_later(path, text):
+    # Make sure the mtime moves even on coarse-grained filesystems
+    time.sleep(0.01)
+    path.write_text(text)
+
+
+class TestChallengeWatcher:
+    """Test suite for watcher.ChallengeWatcher"""
+
+    def test_detects_only_changed_folder(self, tmp_path):
+        day1 = _write_day(tmp_path, 1, 'Qubits')
+        _write_day(tmp_path, 2, 'Superposition')
+        watcher = ChallengeWatcher(str(tmp_path), use_inotify=False, log=lambda msg: None)
+        watcher._signatures = watcher._scan()
+
+        _touch_later(day1 / 'test.py', '# new tests, longer\n')
+
+        assert watcher.changed_folders() == [str(day1)]
+        assert watcher.changed_folders() == []
+
+    def test_reload_updates_only_that_challenge(self, tmp_path):
+        day1 = _write_day(tmp_path, 1, 'Qubits')
+        day2 = _write_day(tmp_path, 2, 'Superposition')
+        watcher = ChallengeWatcher(str(tmp_path), use_inotify=False, log=lambda msg: None)
+        watcher.reload([str(day1), str(day2)])
+        ids = {c.day: c.id for c in Challenge.query.all()}
+
+        (day1 / 'challenge.md').write_text('# Qubits, revised\n')
+        report = watcher.reload([str(day1)])
+
+        assert report['updated'] == [1]
+        assert report['missing'] == []
+        db.session.expire_all()
+        challenge = Challenge.query.filter_by(day=1).one()
+        assert challenge.title == 'Qubits, revised'
+        assert challenge.id == ids[1]
+        assert Challenge.query.filter_by(day=2).one().title == 'Superposition'
+
+    def test_polling_thread_reloads(self, tmp_path):
+        day1 = _write_day(tmp_path, 1, 'Qubits')
+        watcher = ChallengeWatcher(str(tmp_path), interval=0.05, use_inotify=False, log=lambda msg: None)
+        watcher.reload([str(day1)])
+        watcher.start()
+        try:
+            _touch_later(day1 / 'challenge.md', '# Qubits, live\n')
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                db.session.expire_all()
+                if Challenge.query.filter_by(day=1).one().title == 'Qubits, live':
+                    break
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+        assert Challenge.query.filter_by(day=1).one().title == 'Qubits, live'
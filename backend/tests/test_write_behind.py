@@ -0,0 +1,97 @@
+"""
+Tests for group-committed submission inserts (write_behind.py).
+"""
+import pytest
+
+from app import app, db, User, Challenge, Submission, FirstSolve, UserStats
+from write_behind import SubmissionBatcher, shutdown_submission_batcher
+
+TEST_CODE = '''
+import unittest
+
+class TestAnswer(unittest.TestCase):
+    def test_answer(self):
+        self.assertEqual(answer(), 42)
+'''
+
+
+@pytest.fixture
+def user_and_challenge():
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    challenge = Challenge(day=1, title='Day 1', description='', starter_code='', test_code=TEST_CODE)
+    db.session.add_all([user, challenge])
+    db.session.commit()
+    return user.id, challenge.id
+
+
+def test_rows_are_committed_in_batches(user_and_challenge):
+    user_id, challenge_id = user_and_challenge
+    batcher = SubmissionBatcher(max_rows=3, interval_ms=500)
+    try:
+        futures = [
+            batcher.submit(user_id, challenge_id, f'answer = {i}', i == 2, {'testsRun': 1, 'run': i})
+            for i in range(5)
+        ]
+        ids = [f.result(timeout=10) for f in futures]
+    finally:
+        batcher.shutdown()
+
+    assert batcher.stats()['batches'] == 2
+    assert batcher.stats()['rows'] == 5
+    db.session.expire_all()
+    stored = {s.id: s for s in Submission.query.all()}
+    assert sorted(stored) == sorted(ids)
+    assert stored[ids[2]].passed is True
+    assert stored[ids[4]].code == 'answer = 4'
+    assert stored[ids[4]].test_results == {'testsRun': 1, 'run': 4}
+    stats = db.session.get(UserStats, user_id)
+    assert (stats.solved, stats.total_submissions) == (1, 5)
+    assert FirstSolve.query.one().submission_id == ids[2]
+
+
+def test_shutdown_flushes_pending_rows(user_and_challenge):
+    user_id, challenge_id = user_and_challenge
+    # Long enough that only shutdown can end the batch
+    batcher = SubmissionBatcher(max_rows=100, interval_ms=60000)
+
+    futures = [batcher.submit(user_id, challenge_id, 'pass', False, None) for _ in range(2)]
+    batcher.shutdown()
+
+    assert all(f.done() for f in futures)
+    assert Submission.query.count() == 2
+    with pytest.raises(RuntimeError):
+        batcher.submit(user_id, challenge_id, 'pass', False, None)
+
+
+def test_bad_row_only_fails_its_own_request(user_and_challenge):
+    user_id, challenge_id = user_and_challenge
+    batcher = SubmissionBatcher(max_rows=2, interval_ms=500)
+    try:
+        good = batcher.submit(user_id, challenge_id, 'pass', False, None)
+        bad = batcher.submit(user_id, challenge_id, None, False, None)
+
+        assert good.result(timeout=10) is not None
+        with pytest.raises(AttributeError):
+            bad.result(timeout=10)
+    finally:
+        batcher.shutdown()
+
+    assert batcher.stats()['failed'] == 1
+    assert Submission.query.count() == 1
+
+
+def test_submit_endpoint_with_group_commit(client, auth_headers, monkeypatch):
+    db.session.add(Challenge(day=1, title='Day 1', description='', starter_code='', test_code=TEST_CODE))
+    db.session.commit()
+    monkeypatch.setitem(app.config, 'SUBMISSION_GROUP_COMMIT', True)
+    try:
+        response = client.post('/api/submissions/', headers=auth_headers,
+                               json={'day': 1, 'code': 'def answer():\n    return 42\n'})
+    finally:
+        shutdown_submission_batcher()
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['passed'] is True
+    submission = db.session.get(Submission, body['submission_id'])
+    assert submission is not None and submission.passed is True
@@ -0,0 +1,127 @@
+"""
+Per-request tracing: wall time, SQL statements and grading time
+
+Every request gets a trace that collects:
+ - the number of SQL statements it ran and their total time (SQLAlchemy
+   cursor events on the app's engine; statements run by background threads
+   are not counted)
+ - named spans timed with `timed()`, such as `grade` around grading
+
+These are returned in a `Server-Timing` header (visible in the browser's
+network panel) and logged as one JSON line per request on the `tracing`
+logger at INFO. A request slower than TRACE_SLOW_REQUEST_MS (default 1000)
+is logged at WARNING together with its SQL statements and their timings.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('tracing')
+
+# Statements kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 100
+
+
+class RequestTrace:
+    """Timings collected while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.queries = []
+        self.spans = {}
+
+    def add_query(self, statement, seconds):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if len(self.queries) < MAX_LOGGED_QUERIES:
+            self.queries.append((statement, seconds))
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value of the Server-Timing header."""
+        parts = [
+            f'app;dur={self.elapsed() * 1000:.1f}',
+            f'db;desc="{self.sql_count} queries";dur={self.sql_seconds * 1000:.1f}',
+        ]
+        parts += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.spans.items()]
+        return ', '.join(parts)
+
+
+def current_trace():
+    """The trace of the request being served in this thread, or None."""
+    if not has_request_context():
+        return None
+    return g.get('trace')
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's `name` span."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span(name, time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['trace_query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace()
+    if trace is not None:
+        trace.add_query(statement, time.perf_counter() - conn.info['trace_query_started'])
+
+
+def init_app(app, engine):
+    """Trace every request served by `app` and the statements run on `engine`."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _start_trace():
+        g.trace = RequestTrace()
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return response
+        response.headers['Server-Timing'] = trace.server_timing()
+
+        elapsed = trace.elapsed()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.url_rule.rule if request.url_rule is not None else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 1),
+            'sql_count': trace.sql_count,
+            'sql_ms': round(trace.sql_seconds * 1000, 1),
+        }
+        record.update({f'{name}_ms': round(seconds * 1000, 1) for name, seconds in trace.spans.items()})
+
+        if elapsed * 1000 >= app.config['TRACE_SLOW_REQUEST_MS']:
+            record['slow'] = True
+            record['queries'] = [
+                {'sql': statement, 'ms': round(seconds * 1000, 2)} for statement, seconds in trace.queries
+            ]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
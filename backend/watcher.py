@@ -0,0 +1,194 @@
+"""
+Hot reload of challenges while editing the `days/` folders
+
+A background thread watches the day folders and, when a file in one of
+them changes, re-reads just that folder with `seed.read_challenge` and
+upserts its row with `seed.sync_challenges`. The usual listeners then
+invalidate what depends on the row: the cached challenge responses
+(http_cache.py) and the grading results for the old tests (grade_cache.py).
+
+Changes are picked up through inotify when the optional `inotify_simple`
+package is installed (Linux), and by polling file mtimes otherwise. Bursts
+of events (an editor saving several files) are coalesced per folder.
+
+Run one watcher per database. With the development server, CHALLENGE_WATCH=1
+starts it inside `python app.py` (CHALLENGE_DAYS_DIR overrides the folder).
+Importing the app never starts it, so under gunicorn or any other
+multi-process server, where every worker would start its own watcher and
+race to upsert the same rows, run it once next to the server instead:
+
+    python watcher.py [days_dir]
+"""
+
+import os
+import sys
+import threading
+import time
+
+try:
+    import inotify_simple
+except Exception:
+    inotify_simple = None
+
+from app import app, db
+from seed import DEFAULT_DAYS_ROOT, read_challenge, sync_challenges
+
+POLL_INTERVAL = float(os.getenv('CHALLENGE_WATCH_INTERVAL', '1.0'))
+# Quiet period before a changed folder is reloaded
+DEBOUNCE_SECONDS = 0.25
+
+
+def _folder_signature(path):
+    """(name, mtime, size) of the files directly inside a day folder."""
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return None
+    signature = []
+    for entry in entries:
+        try:
+            if entry.is_file():
+                st = entry.stat()
+                signature.append((entry.name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            continue
+    return tuple(sorted(signature))
+
+
+class ChallengeWatcher:
+    """Reloads a day's challenge row when its folder changes"""
+
+    def __init__(self, days_root=DEFAULT_DAYS_ROOT, interval=POLL_INTERVAL, use_inotify=None, log=print):
+        self.days_root = os.path.abspath(days_root)
+        self.interval = interval
+        self.use_inotify = inotify_simple is not None if use_inotify is None else use_inotify
+        self.log = log
+        self._stop = threading.Event()
+        self._thread = None
+        self._signatures = {}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._signatures = self._scan()
+        target = self._run_inotify if self.use_inotify else self._run_polling
+        self._thread = threading.Thread(target=target, name='challenge-watcher', daemon=True)
+        self._thread.start()
+        self.log(f"Watching {self.days_root} for challenge changes"
+                 f" ({'inotify' if self.use_inotify else 'polling'})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _scan(self):
+        signatures = {}
+        try:
+            names = os.listdir(self.days_root)
+        except OSError:
+            return signatures
+        for name in names:
+            path = os.path.join(self.days_root, name)
+            if os.path.isdir(path):
+                signatures[path] = _folder_signature(path)
+        return signatures
+
+    def changed_folders(self):
+        """Folders whose files changed since the last call (polling)."""
+        current = self._scan()
+        changed = [path for path, sig in current.items() if self._signatures.get(path) != sig]
+        self._signatures = current
+        return sorted(changed)
+
+    def reload(self, folders):
+        """Re-read `folders` and upsert their challenges in one transaction."""
+        challenges = [c for c in (read_challenge(path) for path in folders) if c is not None]
+        if not challenges:
+            return None
+        with app.app_context():
+            try:
+                report = sync_challenges(challenges, partial=True)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        for label in ('added', 'updated'):
+            if report[label]:
+                self.log(f"Challenge watcher: {label} days {', '.join(str(d) for d in report[label])}")
+        return report
+
+    def _reload_safely(self, folders):
+        try:
+            self.reload(folders)
+        except Exception as e:
+            # Keep watching; the next save will try again
+            self.log(f"Challenge watcher: reload failed: {type(e).__name__}: {e}")
+
+    def _run_polling(self):
+        while not self._stop.wait(self.interval):
+            changed = self.changed_folders()
+            if changed:
+                # Let multi-file saves finish before reading
+                time.sleep(DEBOUNCE_SECONDS)
+                self._reload_safely(sorted(set(changed) | set(self.changed_folders())))
+
+    def _run_inotify(self):
+        flags = inotify_simple.flags
+        folder_mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+        root_mask = flags.CREATE | flags.MOVED_TO | flags.ONLYDIR
+
+        inotify = inotify_simple.INotify()
+        watches = {}
+
+        def watch(path):
+            try:
+                watches[inotify.add_watch(path, folder_mask)] = path
+            except OSError:
+                pass
+
+        root_wd = inotify.add_watch(self.days_root, root_mask)
+        for path in self._signatures:
+            watch(path)
+
+        try:
+            while not self._stop.is_set():
+                changed = set()
+                events = inotify.read(timeout=int(self.interval * 1000))
+                while events:
+                    for event in events:
+                        if event.wd == root_wd:
+                            path = os.path.join(self.days_root, event.name)
+                            if os.path.isdir(path):
+                                watch(path)
+                                changed.add(path)
+                        elif event.wd in watches:
+                            changed.add(watches[event.wd])
+                    # Collect the rest of a burst before reloading
+                    events = inotify.read(timeout=int(DEBOUNCE_SECONDS * 1000))
+                if changed:
+                    self._reload_safely(sorted(changed))
+        finally:
+            inotify.close()
+
+
+_watcher = None
+
+
+def start_watcher(days_root=None):
+    """Start the process-wide watcher (idempotent)."""
+    global _watcher
+    if _watcher is None:
+        _watcher = ChallengeWatcher(days_root or DEFAULT_DAYS_ROOT)
+        _watcher.start()
+    return _watcher
+
+
+if __name__ == '__main__':
+    watcher = start_watcher(sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
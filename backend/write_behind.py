@@ -0,0 +1,208 @@
+"""
+Group commit for graded submissions
+
+Committing every submission in its own transaction costs one fsync (and
+one turn at SQLite's write lock) per request. With
+SUBMISSION_GROUP_COMMIT=1, grade_and_record hands the graded row to a
+single writer thread instead. The writer collects rows for up to
+SUBMISSION_GROUP_COMMIT_MS milliseconds (default 10) or
+SUBMISSION_GROUP_COMMIT_ROWS rows (default 64), inserts them with their
+blobs and leaderboard stats, and commits once.
+
+Callers block until their batch has committed, so the submission id they
+get back is committed (how durable that commit is depends on the database;
+see SQLITE_SYNCHRONOUS in db_profile.py); under a burst, concurrent
+submissions share one commit. If a batch fails, its rows are retried one by one so a bad row only
+fails its own request. Pending rows are flushed when the writer is shut
+down (at interpreter exit for the process-wide writer).
+"""
+
+import atexit
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+from app import app, db, Submission
+import blobs
+import metrics
+from stats import record_submission_stats
+
+DEFAULT_MAX_ROWS = 64
+DEFAULT_INTERVAL_MS = 10
+
+PendingSubmission = namedtuple('PendingSubmission', 'user_id challenge_id code passed test_results')
+
+
+class SubmissionBatcher:
+    """Single writer thread that inserts submissions in batches"""
+
+    def __init__(self, max_rows=DEFAULT_MAX_ROWS, interval_ms=DEFAULT_INTERVAL_MS):
+        self.max_rows = max_rows
+        self.interval = interval_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batches = 0
+        self._rows = 0
+        self._failed = 0
+        self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, challenge_id, code, passed, test_results):
+        """Queue a graded submission; the Future resolves to its id once committed."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('SubmissionBatcher has been shut down')
+            self._queue.put((PendingSubmission(user_id, challenge_id, code, passed, test_results), future))
+        return future
+
+    def write(self, user_id, challenge_id, code, passed, test_results, timeout=None):
+        """Queue a graded submission and wait until it is committed; returns its id."""
+        return self.submit(user_id, challenge_id, code, passed, test_results).result(timeout)
+
+    def _next_batch(self):
+        """Block for the next batch; returns (items, stop)."""
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._flush(batch)
+            if stop:
+                break
+
+    @staticmethod
+    def _insert(pending):
+        """Add `pending` rows and their stats to the session; returns the Submissions."""
+        code_digests = blobs.put_many([p.code.encode('utf-8') for p in pending])
+        result_payloads = [blobs.encode_json(p.test_results) for p in pending if p.test_results is not None]
+        result_digests = iter(blobs.put_many(result_payloads))
+
+        submissions = []
+        for p, code_sha256 in zip(pending, code_digests):
+            submission = Submission(
+                user_id=p.user_id,
+                challenge_id=p.challenge_id,
+                passed=p.passed,
+                code_sha256=code_sha256,
+                results_sha256=None if p.test_results is None else next(result_digests)
+            )
+            db.session.add(submission)
+            record_submission_stats(submission)
+            submissions.append(submission)
+        return submissions
+
+    def _flush(self, batch):
+        with app.app_context():
+            try:
+                submissions = self._insert([pending for pending, _ in batch])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Retry row by row so only the bad submission fails
+                for pending, future in batch:
+                    self._flush_one(pending, future)
+                return
+            with self._lock:
+                self._batches += 1
+                self._rows += len(batch)
+            for (_, future), submission in zip(batch, submissions):
+                future.set_result(submission.id)
+
+    def _flush_one(self, pending, future):
+        try:
+            (submission,) = self._insert([pending])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                self._failed += 1
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._batches += 1
+            self._rows += 1
+        future.set_result(submission.id)
+
+    def stats(self):
+        """Return a snapshot of writer counters."""
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'batches': self._batches,
+                'rows': self._rows,
+                'failed': self._failed,
+            }
+
+    def shutdown(self):
+        """Commit everything already queued, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_submission_batcher():
+    """Return the process-wide batcher, or None unless SUBMISSION_GROUP_COMMIT is on."""
+    global _batcher
+    if not app.config.get('SUBMISSION_GROUP_COMMIT'):
+        return None
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = SubmissionBatcher(
+                max_rows=app.config.get('SUBMISSION_GROUP_COMMIT_ROWS', DEFAULT_MAX_ROWS),
+                interval_ms=app.config.get('SUBMISSION_GROUP_COMMIT_MS', DEFAULT_INTERVAL_MS)
+            )
+            atexit.register(shutdown_submission_batcher)
+        return _batcher
+
+
+def shutdown_submission_batcher():
+    """Flush and stop the process-wide batcher if it was started."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is not None:
+            _batcher.shutdown()
+            _batcher = None
+
+
+def _collect_stat(field):
+    def collect():
+        with _batcher_lock:
+            batcher = _batcher
+        return None if batcher is None else batcher.stats()[field]
+    return collect
+
+
+metrics.REGISTRY.collect('submission_writer_pending', 'Submissions waiting for a group commit',
+                         _collect_stat('pending'))
+metrics.REGISTRY.collect('submission_writer_batches_total', 'Group commits of submissions',
+                         _collect_stat('batches'), type='counter')
+metrics.REGISTRY.collect('submission_writer_rows_total', 'Submissions written by group commit',
+                         _collect_stat('rows'), type='counter')
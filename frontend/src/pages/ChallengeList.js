@@ -15,7 +15,7 @@ function ChallengeList() {
 
   const fetchChallenges = async () => {
     try {
-      const response = await axios.get(`${API_URL}/challenges/`);
+      const response = await axios.get(`${API_URL}/challenges/?view=summary`);
       setChallenges(response.data);
       setLoading(false);
     } catch (error) {
@@ -5,13 +5,32 @@ Checks performed:
 - Day numbers (NN) are unique.
 - If `meta.yaml` exists, it's valid YAML and `difficulty` (if present) is 1-5.
 
+With `--run`, every day's reference `solution.py` is also graded against its
+`test.py` through the backend grader (the same worker pool and limits used
+for submissions), several days at a time. This needs the backend
+requirements installed:
+
+    python scripts/validate_days.py --run --workers 4 --timeout 60 \
+        --json-report days-report.json --junit-report days-report.xml
+
+`--profile DIR` grades each solution under cProfile and tracemalloc
+instead (see backend/profiling.py): the top hotspots and peak memory of
+every day are printed and `DIR/dayNN_*.pstats` is written for
+`python -m pstats` or snakeviz. Profiled timings are inflated, so compare
+days against each other rather than against the time limit.
+
 Exit codes:
  0 on success, 1 on validation failures.
 """
+import argparse
+import json
 import os
 import re
 import sys
+import time
 import yaml
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
 
 
 def validate_days(days_root):
@@ -69,9 +88,144 @@ def validate_days(days_root):
     return 0
 
 
-if __name__ == '__main__':
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _grade_day(pool, entry_path, timeout, profile_dir=None):
+    """Grade one day's solution.py against its test.py; returns a report entry."""
+    entry = os.path.basename(entry_path)
+    report = {'day': entry, 'passed': False, 'seconds': 0.0, 'tests_run': 0, 'error': ''}
+    for name in ('solution.py', 'test.py'):
+        if not os.path.isfile(os.path.join(entry_path, name)):
+            report['error'] = f"Missing {name}"
+            return report
+
+    profile = {} if profile_dir else None
+    started = time.monotonic()
+    results = pool.run(_read(os.path.join(entry_path, 'solution.py')),
+                       _read(os.path.join(entry_path, 'test.py')),
+                       timeout=timeout, profile=profile)
+    report['seconds'] = round(time.monotonic() - started, 3)
+    if profile:
+        import profiling
+        path = os.path.join(profile_dir, f'{entry}.pstats')
+        profiling.write_pstats(profile, path)
+        report['profile'] = dict(profile['summary'], pstats=path)
+
+    test_results = results.get('test_results') or {}
+    report['passed'] = results['passed']
+    report['outcome'] = test_results.get('outcome')
+    report['tests_run'] = test_results.get('testsRun', 0)
+    if not results['passed']:
+        failures = test_results.get('failures_info', []) + test_results.get('errors_info', [])
+        report['error'] = results['error'] or '\n\n'.join(f"{case}\n{tb}" for case, tb in failures)
+        if not report['error'] and not report['tests_run']:
+            report['error'] = 'No tests found in test.py'
+    return report
+
+
+def run_solutions(days_root, workers=None, timeout=60, profile_dir=None):
+    """Grade every day's reference solution in parallel; returns report entries."""
+    backend = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+    sys.path.insert(0, backend)
+    from grader_pool import GraderPool
+
+    entries = [
+        os.path.join(days_root, entry) for entry in sorted(os.listdir(days_root))
+        if os.path.isdir(os.path.join(days_root, entry)) and re.match(r'day(\d+)', entry, re.IGNORECASE)
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(entries) or 1))
+
+    pool = GraderPool(size=workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reports = list(executor.map(lambda path: _grade_day(pool, path, timeout, profile_dir), entries))
+    finally:
+        pool.shutdown()
+
+    for report in reports:
+        status = 'PASS' if report['passed'] else 'FAIL'
+        print(f"{status} {report['day']} ({report['seconds']:.2f}s, {report['tests_run']} tests)")
+        if report['error']:
+            print('    ' + report['error'].strip().replace('\n', '\n    '))
+        if 'profile' in report:
+            _print_profile(report['profile'])
+    return reports
+
+
+def _print_profile(profile, top_n=5):
+    print(f"    peak memory {profile['peak_memory_mb']:.1f}MB, profile in {profile['pstats']}")
+    for hotspot in profile['hotspots'][:top_n]:
+        print(f"    {hotspot['self_seconds']:>9.4f}s self {hotspot['cumulative_seconds']:>9.4f}s cum"
+              f" {hotspot['calls']:>8} calls  {hotspot['function']}")
+
+
+def write_json_report(reports, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'passed': all(r['passed'] for r in reports),
+            'seconds': round(sum(r['seconds'] for r in reports), 3),
+            'days': reports,
+        }, f, indent=2)
+
+
+def write_junit_report(reports, path):
+    suite = ElementTree.Element('testsuite', {
+        'name': 'days',
+        'tests': str(len(reports)),
+        'failures': str(sum(not r['passed'] for r in reports)),
+        'time': f"{sum(r['seconds'] for r in reports):.3f}",
+    })
+    for report in reports:
+        case = ElementTree.SubElement(suite, 'testcase', {
+            'classname': 'days',
+            'name': report['day'],
+            'time': f"{report['seconds']:.3f}",
+        })
+        if not report['passed']:
+            failure = ElementTree.SubElement(case, 'failure', {'message': report.get('outcome') or 'failed'})
+            failure.text = report['error']
+    ElementTree.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate the days/ folders')
+    parser.add_argument('--run', action='store_true',
+                        help="grade each day's solution.py against its test.py")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='days graded in parallel with --run (default: one per core)')
+    parser.add_argument('--timeout', type=int, default=60,
+                        help='per-day time limit in seconds with --run (default 60)')
+    parser.add_argument('--json-report', help='write a JSON report of the --run results')
+    parser.add_argument('--junit-report', help='write a JUnit XML report of the --run results')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='with --run, profile each solution and write DIR/<day>.pstats')
+    args = parser.parse_args(argv)
+
     # days root relative to repo root
     repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     days_root = os.path.join(repo_root, 'days')
     rc = validate_days(days_root)
-    sys.exit(rc)
+    if rc or not args.run:
+        return rc
+
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    reports = run_solutions(days_root, workers=args.workers, timeout=args.timeout, profile_dir=args.profile)
+    if args.json_report:
+        write_json_report(reports, args.json_report)
+    if args.junit_report:
+        write_junit_report(reports, args.junit_report)
+
+    failed = [r['day'] for r in reports if not r['passed']]
+    if failed:
+        print(f"{len(failed)} of {len(reports)} reference solutions failed")
+        return 1
+    print(f"All {len(reports)} reference solutions passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())